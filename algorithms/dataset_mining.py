@@ -0,0 +1,192 @@
+#!/usr/bin/python3
+
+import logging
+import numpy as np
+from rdflib.namespace import RDF
+from models.encoded_graph import term_key
+from models.rule_base import RuleBase
+from models.rule_table import pack, ratio_of
+from algorithms.interestingness import evaluate_measures
+from algorithms.mining_engine import pool_of
+from algorithms.semantic_rule_learning_mp import count_rules
+
+
+"""
+Mining of semantic association rules over multiple datasets, such as one ABox per project.
+
+Every dataset is loaded, sampled, and mined on its own, as a directive would, which yields
+the rules of that dataset. The rules of all datasets together then follow from their
+counts: the members of a class, and those with the antecedent, the consequent, or both,
+add up over the datasets. Every rule is counted on the datasets which did not yield it,
+on the executor of choice, and its counts are summed; the union of the datasets is never
+built, nor mined.
+
+A subject in more than one dataset counts once per dataset. The global rules are those
+of any dataset which meet the minimal support and confidence on the summed counts; a rule
+which no dataset yields by itself is not found, even if it would be on the union.
+"""
+
+logger = logging.getLogger(__name__)
+
+def mine_datasets(program=None, dataset_of=None, datasets=[], output_path=None, parameters={}):
+    """ Mine every dataset with a directive, and merge their counts into global rules
+
+    The rules of every dataset are written next to the output path, as the directive writes
+    them. Datasets are mined one after another, each on all workers; a time budget is
+    shared equally.
+
+    :param program: a directive instance, with the run_program() of an MP directive
+    :param dataset_of: function which loads and samples the dataset of an ABox path, as the directive does, and returns it with its key in the cache
+    :param datasets: list of (name, path) tuples, one ABox per dataset
+    :param output_path: path to write the global rules to, from which the paths of the datasets derive
+    :param parameters: dictionary with the parameters of the directive
+
+    :returns: a RuleBase instance with the global rules, measured and ranked, and the datasets as metadata
+    """
+    if program is None or dataset_of is None or len(datasets) <= 0:
+        raise ValueError("Missing input values.")
+    if parameters["discretisation"] is not None:
+        # bins are fitted per dataset, so equal bin tokens may cover different values
+        raise ValueError("Mining datasets does not support discretisation")
+    if parameters["state"] is not None:
+        raise ValueError("Mining datasets does not support state")
+    if parameters["sample_rate"] is not None:
+        # counts of the sample and of the full datasets do not add up
+        raise ValueError("Mining datasets does not support sample_rate")
+
+    dataset_parameters = dict(parameters)
+    dataset_parameters["top_k"] = None
+    if parameters["time_budget"] is not None:
+        dataset_parameters["time_budget"] = parameters["time_budget"] / len(datasets)
+
+    indices = []
+    counts = []
+    coverage = {}
+    failed = []
+    complete = True
+    expired = False
+    for k, (name, path) in enumerate(datasets):
+        logger.info("Mining dataset {} ({})".format(name, path))
+        print(" Mining Data Set {}...".format(name))
+        dataset, key = dataset_of(path)
+
+        # the graph and item sets on which the rules were mined, to count other rules on
+        rule_base, (kg_i, item_sets) = program.run_program(dataset, dataset_parameters, key)
+        members = {}
+        for s, ctype in kg_i.graph.subject_objects(RDF.type):
+            members.setdefault(ctype, set()).add(s)
+        indices.append(({ctype: frozenset(es) for ctype, es in members.items()}, dict(item_sets)))
+
+        counts.append({_key_of(irule.rule): (irule.support.denominator,
+                                             irule.support.numerator,
+                                             irule.consequent_support.numerator,
+                                             irule.confidence.numerator)
+                       for irule in rule_base.stream()})
+
+        for stage, (processed, total) in rule_base.metadata["coverage"].items():
+            coverage[stage] = tuple(x + y for x, y in zip(coverage.get(stage, (0, 0)), (processed, total)))
+        failed.extend(rule_base.metadata["failed"])
+        complete = complete and rule_base.metadata["complete"]
+        expired = expired or rule_base.metadata["expired"]
+
+        rule_base.metadata["dataset"] = name
+        if parameters["top_k"] is not None:
+            rule_base.top_k(parameters["top_k"], parameters["rank_by"])
+        program.write_to_file("{}.{}".format(output_path, k), rule_base)
+
+    rules = sorted(set().union(*[c.keys() for c in counts]), key=_rule_order)
+    logger.info("Merging counts of {} rules over {} datasets".format(len(rules), len(datasets)))
+    print(" Merging counts over {} Data Sets...".format(len(datasets)))
+    for k, missing in count_datasets(indices, [[rule for rule in rules if rule not in c.keys()] for c in counts],
+                                     parameters):
+        counts[k].update(missing)
+
+    rule_base = RuleBase(table=_table_of(rules, counts, parameters))
+    evaluate_measures(rule_base, parameters["p_value_correction"])
+    if parameters["top_k"] is not None:
+        rule_base.top_k(parameters["top_k"], parameters["rank_by"])
+    else:
+        rule_base.sort(by=parameters["rank_by"])
+
+    rule_base.metadata["coverage"] = coverage
+    rule_base.metadata["failed"] = failed
+    rule_base.metadata["complete"] = complete
+    rule_base.metadata["expired"] = expired
+    rule_base.metadata["datasets"] = {"{}.{}".format(output_path, k): name for k, (name, _) in enumerate(datasets)}
+    rule_base.metadata["time_budget"] = parameters["time_budget"]
+    rule_base.metadata["bins"] = {}
+
+    print("  Found {} rules".format(rule_base.size()))
+    return rule_base
+
+def count_datasets(indices=[], rules=[], parameters={}, pool=None):
+    """ Count rules on datasets on the executor of choice
+
+    :param indices: list with per dataset a tuple of dictionaries, with the members per class and the item sets per (p, o) pair
+    :param rules: list with per dataset the list of rules to count on it, as (class, antecedent, consequent items) tuples
+    :param parameters: dictionary with the parameters of a directive, including the executor
+    :param pool: a pool of workers as returned by pool_of(), which is left open; None to start one
+
+    :returns: an iterator over (dataset number, counts) tuples, with counts as dictionary from rule to (n, a, c, ac) tuple
+    """
+    work = [(k, offset, rules[k][offset:offset+parameters["batch_size"]])
+            for k in range(len(indices))
+            for offset in range(0, len(rules[k]), parameters["batch_size"])]
+    if len(work) <= 0:
+        return
+
+    own_pool = pool is None
+    if own_pool:
+        pool = pool_of(parameters)
+
+    # the datasets are only shared for this stage, and dropped by the workers once it finished
+    failures = len(pool.failure_report())
+    pool.share(datasets=indices)
+    outputs = list(pool.imap_unordered(count_rules, work, stage="counts"))
+    failed = pool.failed("counts", failures)
+    pool.release("datasets")
+    if own_pool:
+        pool.close()
+    if len(failed) > 0:
+        # without them, the counts of the global rules would be too low
+        raise RuntimeError("Failed to count {} batches of rules".format(len(failed)))
+
+    for k, offset, counts in outputs:
+        yield (k, dict(zip(rules[k][offset:offset+len(counts)], counts)))
+
+def _table_of(rules, counts, parameters):
+    """ Pack rules with their counts summed over the datasets, and keep those which meet the minima """
+    classes = sorted({ctype for ctype, _, _ in rules}, key=term_key)
+    items = sorted({item for _, antecedent, consequent in rules for item in (antecedent,) + consequent},
+                   key=_item_key)
+    class_ids = {ctype: i for i, ctype in enumerate(classes)}
+    item_ids = {item: i for i, item in enumerate(items)}
+
+    table = pack([(class_ids[ctype], item_ids[antecedent], [item_ids[item] for item in consequent])
+                  for ctype, antecedent, consequent in rules])
+    summed = np.array([[sum(c[rule][i] for c in counts) for i in range(4)] for rule in rules],
+                      dtype=np.int64).reshape(-1, 4)
+    for i, name in enumerate(("n", "a", "c", "ac")):
+        table.records[name] = summed[:, i]
+    table.terms = classes
+    table.items = items
+
+    accepted = (ratio_of(table.records["a"], table.records["n"]) >= parameters["minimal_support"]) &\
+               (ratio_of(table.records["ac"], table.records["a"]) >= parameters["minimal_confidence"])
+
+    return table.take(np.flatnonzero(accepted))
+
+def _key_of(rule):
+    # the items of a consequent may come in another order from every dataset
+    return (rule.ctype, rule.antecedent, tuple(sorted(rule.consequent, key=_item_key)))
+
+def _item_key(pa):
+    return (term_key(pa[0]), term_key(pa[1]))
+
+def _rule_order(rule):
+    ctype, antecedent, consequent = rule
+
+    return (term_key(ctype), _item_key(antecedent), [_item_key(item) for item in consequent])
+
+if __name__ == "__main__":
+    print("Mining of semantic association rules over multiple datasets")
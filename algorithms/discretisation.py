@@ -0,0 +1,236 @@
+#!/usr/bin/python3
+
+import logging
+from decimal import Decimal
+from math import isfinite
+import numpy as np
+import rdflib
+from rdflib.namespace import RDF
+from models.knowledge_graph import KnowledgeGraph
+
+
+"""
+Discretisation of numeric literals prior to rule mining.
+
+Every distinct numeric value otherwise forms its own (p, o) item set, most of which are
+singletons. Numeric objects are therefore replaced by a token of the bin they fall in,
+with bins determined per predicate using one of the following strategies:
+
+    * equal_width: bins of equal width between the smallest and largest value
+    * equal_frequency: bins holding (about) the same number of values
+    * mdl: entropy-based binning w.r.t. the subjects' class, accepting cut points by the
+           Minimum Description Length Principle [Fayyad1993]
+
+@inproceedings{Fayyad1993,
+ author="Fayyad, Usama M. and Irani, Keki B.",
+ title="Multi-Interval Discretization of Continuous-Valued Attributes for Classification Learning",
+ booktitle="Proceedings of the 13th International Joint Conference on Artificial Intelligence",
+ year="1993",
+ pages="1022--1029",
+}
+"""
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ("equal_width", "equal_frequency", "mdl")
+
+def discretise(knowledge_graph=None, predicates=None, strategy="equal_frequency", number_of_bins=5):
+    """ Replace numeric literals by bin tokens
+
+    :param knowledge_graph: a KnowledgeGraph instance
+    :param predicates: predicates to discretise; defaults to all with more distinct numeric values than bins
+    :param strategy: binning strategy, one of STRATEGIES
+    :param number_of_bins: maximum number of bins per predicate (ignored by mdl)
+
+    :returns: a (KnowledgeGraph, bin definitions) tuple, with bin definitions as a dictionary holding
+              the list of cut points per predicate
+    """
+    if knowledge_graph is None:
+        raise ValueError("Missing input values.")
+    if strategy not in STRATEGIES:
+        raise ValueError("Unknown strategy: {}".format(strategy))
+
+    logger.info("Discretising numeric literals (strategy: {}, bins <= {})".format(strategy, number_of_bins))
+    facts = _numeric_facts(knowledge_graph, predicates)
+
+    bins = {}
+    for p, p_facts in facts.items():
+        values = np.array([v for _, v in p_facts], dtype=np.float64)
+        if predicates is None and len(np.unique(values)) <= number_of_bins:
+            continue
+
+        if strategy == "equal_width":
+            cut_points = equal_width_cut_points(values, number_of_bins)
+        elif strategy == "equal_frequency":
+            cut_points = equal_frequency_cut_points(values, number_of_bins)
+        else:
+            labels = [_label_of(knowledge_graph, s) for s, _ in p_facts]
+            cut_points = mdl_cut_points(values, labels)
+
+        bins[p] = [float(cut_point) for cut_point in cut_points]
+
+    return (apply_bins(knowledge_graph, bins), bins)
+
+def apply_bins(knowledge_graph=None, bins={}):
+    """ Replace numeric literals by tokens of given bins, such as those a model was mined with
+
+    :param knowledge_graph: a KnowledgeGraph instance
+    :param bins: dictionary holding the list of cut points per predicate, as returned by discretise()
+
+    :returns: a KnowledgeGraph instance
+    """
+    if knowledge_graph is None:
+        raise ValueError("Missing input values.")
+
+    kg = KnowledgeGraph(rdflib.Graph())
+    for s, p, o in knowledge_graph.graph:
+        if p in bins.keys() and type(o) is rdflib.Literal:
+            value = _numeric_value_of(o)
+            if value is not None:
+                o = bin_token(bins[p], value)
+
+        kg.graph.add((s, p, o))
+
+    logger.info("Discretised {} predicates".format(len(bins)))
+    for p, cut_points in bins.items():
+        logger.debug("{}: {}".format(p, cut_points))
+
+    return kg
+
+def bin_token(cut_points, value):
+    """ Return the token of the bin a value falls in
+
+    :param cut_points: sorted list of cut points
+    :param value: a number
+
+    :returns: a Literal '[lower, upper)'
+    """
+    i = int(np.searchsorted(cut_points, value, side='right'))
+    lower = cut_points[i-1] if i > 0 else float("-inf")
+    upper = cut_points[i] if i < len(cut_points) else float("inf")
+
+    # the shortest representation which reads back as the same float, so distinct cut points yield distinct tokens
+    return rdflib.Literal("[{!r}, {!r})".format(float(lower), float(upper)))
+
+def equal_width_cut_points(values, number_of_bins=5):
+    """ Determine cut points of bins of equal width
+
+    :param values: array of numbers
+    :param number_of_bins: number of bins
+
+    :returns: array of cut points
+    """
+    return np.unique(np.linspace(values.min(), values.max(), number_of_bins + 1)[1:-1])
+
+def equal_frequency_cut_points(values, number_of_bins=5):
+    """ Determine cut points of bins with about equal numbers of values
+
+    :param values: array of numbers
+    :param number_of_bins: number of bins
+
+    :returns: array of cut points
+    """
+    cut_points = np.unique(np.quantile(values, np.arange(1, number_of_bins) / number_of_bins))
+
+    # a cut point at the minimum would yield an empty bin
+    return cut_points[cut_points > values.min()]
+
+def mdl_cut_points(values, labels):
+    """ Determine cut points by recursive minimal-entropy partitioning with the MDLP stopping criterion
+
+    :param values: array of numbers
+    :param labels: list of class labels, one per value
+
+    :returns: sorted array of cut points
+    """
+    _, label_ids = np.unique(np.array([str(label) for label in labels]), return_inverse=True)
+
+    order = np.argsort(values, kind='mergesort')
+    cut_points = []
+    _mdl_partition(values[order], label_ids[order], cut_points)
+
+    return np.array(sorted(cut_points))
+
+def _mdl_partition(values, label_ids, cut_points):
+    n = len(values)
+    if n < 2:
+        return
+
+    # cumulative class counts left of every candidate cut
+    classes, label_ids = np.unique(label_ids, return_inverse=True)
+    k = len(classes)
+    one_hot = np.zeros((n, k))
+    one_hot[np.arange(n), label_ids] = 1
+    left = np.cumsum(one_hot, axis=0)[:-1]
+    right = left[-1] + one_hot[-1] - left
+
+    # only cut between distinct values
+    candidates = np.nonzero(values[1:] != values[:-1])[0]
+    if len(candidates) <= 0:
+        return
+
+    n_left = np.arange(1, n)[candidates].astype(np.float64)
+    n_right = n - n_left
+    entropy_left = _entropy(left[candidates], n_left)
+    entropy_right = _entropy(right[candidates], n_right)
+    weighted_entropy = (n_left * entropy_left + n_right * entropy_right) / n
+
+    best = int(np.argmin(weighted_entropy))
+    i = candidates[best]
+
+    entropy = _entropy((left[-1] + one_hot[-1])[np.newaxis, :], np.array([n]))[0]
+    gain = entropy - weighted_entropy[best]
+    k_left = np.count_nonzero(left[i])
+    k_right = np.count_nonzero(right[i])
+    delta = np.log2(3**k - 2) - (k * entropy - k_left * entropy_left[best] - k_right * entropy_right[best])
+    if gain <= (np.log2(n - 1) + delta) / n:
+        return
+
+    cut_points.append((values[i] + values[i+1]) / 2)
+    _mdl_partition(values[:i+1], label_ids[:i+1], cut_points)
+    _mdl_partition(values[i+1:], label_ids[i+1:], cut_points)
+
+def _entropy(class_counts, totals):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = class_counts / totals[:, np.newaxis]
+        return -np.nansum(np.where(p > 0, p * np.log2(p), 0.0), axis=1)
+
+def _numeric_facts(knowledge_graph, predicates=None):
+    """ Collect (subject, value) pairs per predicate of facts with a numeric literal as object """
+    facts = {}
+    for s, p, o in knowledge_graph.graph:
+        if type(o) is not rdflib.Literal or (predicates is not None and p not in predicates):
+            continue
+
+        value = _numeric_value_of(o)
+        if value is None:
+            continue
+
+        if p not in facts.keys():
+            facts[p] = []
+        facts[p].append((s, value))
+
+    return facts
+
+def _numeric_value_of(literal):
+    value = literal.toPython()
+    if type(value) is bool:
+        return None
+    if type(value) in (int, float, Decimal):
+        value = float(value)
+    elif literal.datatype is None:
+        try:
+            value = float(str(literal))
+        except ValueError:
+            return None
+    else:
+        return None
+
+    # NaN and infinities, such as the strings 'nan' and 'inf', fall in no bin
+    return value if isfinite(value) else None
+
+def _label_of(knowledge_graph, subject):
+    return min([str(t) for t in knowledge_graph.graph.objects(subject, RDF.type)], default="")
+
+if __name__ == "__main__":
+    print("Discretisation of numeric literals")
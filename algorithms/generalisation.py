@@ -0,0 +1,154 @@
+#!/usr/bin/python3
+
+import logging
+from rdflib.namespace import SKOS
+from rdflib.paths import SequencePath
+
+
+"""
+Taxonomy-aware generalisation of semantic item sets.
+
+Objects from a controlled vocabulary are often too specific to reach support on their own.
+Every item (p, o) with o a concept in the vocabulary is therefore complemented by items
+(p, a) for all broader concepts a of o, following SKOS broader (and inverse narrower) links.
+
+Item sets are counted once at the leaves by the regular item-set builders and rolled up along
+the precomputed concept closure, so the graph is not rescanned per level. The generalised
+facts are added to the instance graph to keep rule evaluation consistent.
+
+Cross-level redundancy is suppressed twice: generalised items which cover exactly the same
+individuals as one of their narrower items are dropped, as are common behaviour sets which
+combine an item with one of its own generalisations.
+"""
+
+logger = logging.getLogger(__name__)
+
+BROADER = (SKOS.broader, SKOS.broaderTransitive)
+NARROWER = (SKOS.narrower, SKOS.narrowerTransitive)
+
+def concept_closure(vocabulary_graph=None):
+    """ Compute all broader concepts of every concept in a vocabulary
+
+    :param vocabulary_graph: a KnowledgeGraph instance holding a SKOS vocabulary
+
+    :returns: a dictionary with concepts as key and a frozenset of all their broader concepts as value
+    """
+    if vocabulary_graph is None:
+        raise ValueError("Missing input values.")
+
+    parents = {}
+    for p in BROADER:
+        for narrower, broader in vocabulary_graph.graph.subject_objects(p):
+            parents.setdefault(narrower, set()).add(broader)
+    for p in NARROWER:
+        for broader, narrower in vocabulary_graph.graph.subject_objects(p):
+            parents.setdefault(narrower, set()).add(broader)
+
+    closure = {}
+    for concept in parents.keys():
+        closure[concept] = _ancestors_of(concept, parents, closure, set())
+
+    logger.info("Computed closure of {} concepts".format(len(closure)))
+    return closure
+
+def _ancestors_of(concept, parents, closure, visiting):
+    if concept in closure.keys():
+        return closure[concept]
+    if concept in visiting:  # cycle
+        return frozenset()
+
+    visiting.add(concept)
+    ancestors = set()
+    for parent in parents.get(concept, ()):
+        ancestors.add(parent)
+        ancestors.update(_ancestors_of(parent, parents, closure, visiting))
+    visiting.discard(concept)
+
+    ancestors.discard(concept)
+    closure[concept] = frozenset(ancestors)
+
+    return closure[concept]
+
+def generalise_item_sets(instance_graph=None, item_sets={}, closure={}):
+    """ Add generalised items (p, broader(o)) by rolling up the leaf item sets
+
+    :param instance_graph: a knowledge graph instance to add the generalised facts to
+    :param item_sets: dictionary with (p, o)-pairs as key and item sets as value
+    :param closure: concept closure as returned by concept_closure()
+
+    :updates: instance_graph
+    :returns: dictionary with (p, o)-pairs as key and item sets as value, including generalised items
+    """
+    if instance_graph is None:
+        raise ValueError("Missing input values.")
+
+    logger.info("Generalising {} Semantic Item Sets".format(len(item_sets)))
+
+    # roll up along the closure
+    generalised = {}
+    leaves = {}
+    for (p, o), subjects in item_sets.items():
+        for broader in closure.get(o, ()):
+            k = (p, broader)
+            if k not in generalised.keys():
+                generalised[k] = set(item_sets.get(k, ()))
+                leaves[k] = []
+            generalised[k].update(subjects)
+            leaves[k].append(o)
+
+    # drop generalisations which cover no more than a narrower item
+    redundant = set()
+    for (p, o) in list(item_sets.keys()) + list(generalised.keys()):
+        size = len(generalised[(p, o)]) if (p, o) in generalised.keys() else len(item_sets[(p, o)])
+        for broader in closure.get(o, ()):
+            k = (p, broader)
+            if k in generalised.keys() and len(generalised[k]) <= size:
+                redundant.add(k)
+
+    item_sets = dict(item_sets)
+    for k, subjects in generalised.items():
+        if k in redundant:
+            continue
+
+        item_sets[k] = subjects
+        _materialise(instance_graph, k, leaves[k])
+
+    logger.info("Added {} generalised Semantic Item Sets ({} redundant)".format(len(generalised) - len(redundant),
+                                                                                 len(redundant)))
+
+    return item_sets
+
+def _materialise(instance_graph, item, narrower_concepts):
+    """ Add the generalised facts of an item to the graph; for paths, to the last node on the path """
+    p, broader = item
+    if type(p) is SequencePath:
+        p = p.args[-1]
+
+    for o in narrower_concepts:
+        for s in list(instance_graph.graph.subjects(p, o)):
+            instance_graph.graph.add((s, p, broader))
+
+def suppress_cross_level(cbs_list=[], closure={}):
+    """ Remove common behaviour sets which combine an item with one of its generalisations
+
+    :param cbs_list: a list of tuples (CBS, s), with s being the similarity
+    :param closure: concept closure as returned by concept_closure()
+
+    :returns: the remaining tuples as list
+    """
+    remaining = [cbs for cbs in cbs_list if not _is_cross_level(cbs[0], closure)]
+
+    logger.info("Suppressed {} cross-level Common Behaviour Sets".format(len(cbs_list) - len(remaining)))
+    return remaining
+
+def _is_cross_level(cbs, closure):
+    items = {item for _, item in cbs}
+    for p, o in items:
+        for broader in closure.get(o, ()):
+            if (p, broader) in items:
+                return True
+
+    return False
+
+if __name__ == "__main__":
+    print("Taxonomy-aware generalisation of semantic item sets")
@@ -0,0 +1,502 @@
+#!/usr/bin/python3
+
+import importlib
+import logging
+import os
+import pickle
+import tempfile
+import rdflib
+from models.delta_index import DeltaIndex
+from models.encoded_graph import term_key
+from models.knowledge_graph import KnowledgeGraph
+from models.rule_base import RuleBase
+from models.rule_table import pack
+from algorithms.mining_engine import rank
+from algorithms.semantic_rule_learning import measures_of
+from algorithms.semantic_rule_learning_mp import rules_of_common_behaviour_set,\
+                                                 encoded_counts_of,\
+                                                 _similarity_of
+
+
+"""
+Incremental mining of semantic association rules on additions to and removals from an ABox.
+
+The miner keeps, next to an updatable index of the graph (see models.delta_index), the CBS
+found in every round and the pairs of CBS of the round before which they were found from,
+and the rules of every CBS with their counts. A CBS is a set of item IDs; as the mining
+engine may find the same CBS from several pairs, the number of times it is found is kept
+too, so that the rules come out as often as with a full run.
+
+An update only revisits what it may change:
+
+    * the similarities of the item sets, and later of the CBS, whose elements changed, with
+      those sharing an element with them (all of them if the similarity threshold is zero),
+    * the rules of the CBS which hold a changed item set, or an element whose types changed,
+    * the counts of these rules, and of the rules of the classes whose members changed.
+
+Directives which sample the ABox by a pattern keep the ABox next to the state, and sample
+the changes to it as they sample the ABox: only the individuals whose sample may change
+are sampled anew (see Sample), and the facts which enter or leave the sample update the
+miner.
+
+The results are those of a full run of the mining engine on the updated graph, up to the
+order of rules which rank equal and of their consequents. Only the item sets of all facts
+are supported, without discretisation, generalisation, context paths, or time budget.
+"""
+
+logger = logging.getLogger(__name__)
+
+class Round():
+    """ The CBS found in one round of the mining, and the pairs of CBS they were found from
+
+    Round 0 holds the item sets, as CBS of one item; round 1 the pairs of similar item sets;
+    every later round the unions of the similar CBS of the round before.
+    """
+    counts = None
+    pairs = None
+
+    def __init__(self):
+        self.counts = {}  # CBS -> number of times it was found
+        self.pairs = {}  # frozenset of two CBS of the round before -> their union, for every similar pair
+        self.pairs_of = {}  # CBS of the round before -> keys of its pairs
+        self.pairs_by_union = {}  # CBS -> keys of the pairs of which it is the union
+        self.containing = {}  # item ID -> CBS holding it
+
+    def set_count(self, cbs, count):
+        """ Set the number of times a CBS was found; zero forgets it """
+        if count > 0:
+            if cbs not in self.counts.keys():
+                for item in cbs:
+                    self.containing.setdefault(item, set()).add(cbs)
+            self.counts[cbs] = count
+        elif cbs in self.counts.keys():
+            for item in cbs:
+                self.containing[item].discard(cbs)
+            del self.counts[cbs]
+
+    def add_pair(self, key, union):
+        self.pairs[key] = union
+        for cbs in key:
+            self.pairs_of.setdefault(cbs, set()).add(key)
+        self.pairs_by_union.setdefault(union, set()).add(key)
+
+    def remove_pairs_of(self, cbs):
+        """ Forget all pairs with a CBS
+
+        :returns: the unions of the forgotten pairs
+        """
+        unions = set()
+        for key in self.pairs_of.pop(cbs, ()):
+            union = self.pairs.pop(key)
+            unions.add(union)
+            for other in key - {cbs}:
+                self.pairs_of[other].discard(key)
+            self.pairs_by_union[union].discard(key)
+            if len(self.pairs_by_union[union]) <= 0:
+                del self.pairs_by_union[union]
+
+        return unions
+
+class Sample():
+    """ Sample of an ABox by the pattern of a directive, which is updated with additions and removals of facts
+
+    The sample is the union of the facts which every individual that matches the patterns
+    contributes on its own. These facts only depend on the facts of the subjects which the
+    sampler looks up for the individual, so that a change to the facts of a subject only
+    requires to sample anew the individuals which looked it up, and the subject itself,
+    which may start or stop to match a pattern. A fact stays in the sample for as long as
+    any individual contributes it.
+    """
+    graph = None
+    sampler = None
+
+    def __init__(self, sampling=None):
+        """ Start from an empty ABox
+
+        :param sampling: a (sampler, patterns, options) tuple as returned by the sampling() of a directive; None to keep all facts
+        """
+        self.graph = rdflib.Graph()
+        self.patterns = []
+        self.options = {}
+        if sampling is not None:
+            sampler, self.patterns, self.options = sampling
+            # modules do not pickle, so the sampler is kept by name
+            self.sampler = sampler.__name__
+
+        self.facts = {}  # individual -> facts it contributes
+        self.lookups = {}  # individual -> other subjects looked up to sample it
+        self.dependents = {}  # subject -> individuals for which it was looked up
+        self.counts = {}  # fact -> number of individuals which contribute it
+
+    ### Operators ###
+
+    def update(self, added=[], removed=[]):
+        """ Add facts to and remove facts from the ABox, and sample the individuals they may affect anew
+
+        Removals go first, so that a fact which is both removed and added stays.
+
+        :param added: iterable of (s, p, o) triples
+        :param removed: iterable of (s, p, o) triples
+
+        :returns: a (added, removed) tuple with the lists of facts which entered and left the sample
+        """
+        if self.sampler is None:
+            return (list(added), list(removed))
+
+        subjects = set()
+        for s, p, o in removed:
+            self.graph.remove((s, p, o))
+            subjects.add(s)
+        for s, p, o in added:
+            self.graph.add((s, p, o))
+            subjects.add(s)
+
+        individuals = set(subjects)
+        for s in subjects:
+            individuals.update(self.dependents.get(s, ()))
+
+        before = {}  # fact -> number of individuals which contributed it before the update
+        for individual in sorted(individuals, key=term_key):
+            facts, lookups = self._sample_of(individual)
+
+            for fact in facts.symmetric_difference(self.facts.get(individual, frozenset())):
+                count = self.counts.get(fact, 0)
+                before.setdefault(fact, count)
+                count += 1 if fact in facts else -1
+                if count > 0:
+                    self.counts[fact] = count
+                else:
+                    del self.counts[fact]
+
+            for s in self.lookups.pop(individual, frozenset()) - lookups:
+                self.dependents[s].discard(individual)
+                if len(self.dependents[s]) <= 0:
+                    del self.dependents[s]
+            for s in lookups:
+                self.dependents.setdefault(s, set()).add(individual)
+
+            self.facts.pop(individual, None)
+            if len(facts) > 0:
+                self.facts[individual] = facts
+            if len(lookups) > 0:
+                self.lookups[individual] = lookups
+
+        sample_added = [fact for fact, count in before.items() if count <= 0 and fact in self.counts.keys()]
+        sample_removed = [fact for fact, count in before.items() if count > 0 and fact not in self.counts.keys()]
+        logger.info("Sampled {} individuals anew: {} facts entered and {} left the sample".format(len(individuals),
+                                                                                                len(sample_added),
+                                                                                                len(sample_removed)))
+
+        return (sample_added, sample_removed)
+
+    def _sample_of(self, individual):
+        """ Sample a single individual, as the sampler samples all that match its patterns
+
+        :returns: a (facts, lookups) tuple with the facts the individual contributes, and the other subjects looked up to sample it
+        """
+        graph = _LookupRecorder(self.graph)
+        patterns = [(individual,) + tuple(pattern[1:]) for pattern in self.patterns
+                    if pattern[0] is None or pattern[0] == individual]
+        sample = importlib.import_module(self.sampler).sample(KnowledgeGraph(graph), patterns=patterns, **self.options)
+
+        return (frozenset(sample.graph), frozenset(graph.subjects - {individual}))
+
+class IncrementalMiner():
+    """ State of a mining run which is updated with additions and removals of facts """
+    parameters = None
+    sample = None
+    index = None
+    rounds = None
+
+    def __init__(self, ontology_graph=None, parameters={}, sampling=None):
+        """ Start from an empty graph
+
+        :param ontology_graph: a KnowledgeGraph instance holding the class hierarchy
+        :param parameters: dictionary with the parameters of a directive
+        :param sampling: a (sampler, patterns, options) tuple as returned by the sampling() of a directive; None to mine all facts
+        """
+        if ontology_graph is None:
+            raise ValueError("Missing input values.")
+        for name in ("discretisation", "vocabulary", "time_budget", "sample_rate"):
+            if parameters[name] is not None:
+                raise ValueError("Incremental mining does not support {}".format(name))
+        for name in ("path_item_sets", "partition_by_class"):
+            if parameters.get(name, False):
+                raise ValueError("Incremental mining does not support {}".format(name))
+
+        self.logger = logging.getLogger(__name__)
+        self.parameters = dict(parameters)
+        self.sample = Sample(sampling)
+        self.index = DeltaIndex(ontology_graph)
+        self.rounds = [Round() for _ in range(number_of_rounds(parameters["max_cbs_size"]) + 1)]
+
+        self.rules = {}  # CBS -> rules generated from it
+        self.counts = {}  # rule -> counts
+        self.class_rules = {}  # class ID -> rules of that class
+
+    ### Accessors ###
+
+    def rule_base(self):
+        """ Return the accepted rules, as the mining engine does
+
+        :returns: a RuleBase instance with the accepted rules as pending RuleTable
+        """
+        rules = []
+        counts = []
+        for cbs in sorted(self.rules.keys(), key=self._key_of):
+            multiplicity = sum(r.counts.get(cbs, 0) for r in self.rounds[1:])
+            for rule in self.rules[cbs]:
+                support, confidence, _ = measures_of(self.counts[rule])
+                if support.value < self.parameters["minimal_support"] or\
+                   confidence.value < self.parameters["minimal_confidence"]:
+                    continue
+
+                rules.extend([rule] * multiplicity)
+                counts.extend([self.counts[rule]] * multiplicity)
+
+        table = pack(rules)
+        for k, name in enumerate(("n", "a", "c", "ac")):
+            table.records[name] = [c[k] for c in counts]
+        table.terms = self.index.terms
+        table.items = self.index.items
+
+        rule_base = RuleBase(table=table)
+        number_of_items = len(self.rounds[0].counts)
+        rule_base.metadata["coverage"] = {"common_behaviour_sets": (number_of_items, number_of_items),
+                                          "rule_generation": (len(self.rules), len(self.rules)),
+                                          "rule_evaluation": (len(self.counts), len(self.counts))}
+        rule_base.metadata["failed"] = []
+        rule_base.metadata["complete"] = True
+
+        return rule_base
+
+    ### Operators ###
+
+    def update(self, added=[], removed=[]):
+        """ Add and remove facts of the ABox, and update the CBS and rules which depend on the sample of them
+
+        :param added: iterable of (s, p, o) triples
+        :param removed: iterable of (s, p, o) triples
+
+        :returns: none
+        """
+        added, removed = self.sample.update(added, removed)
+        items, subjects, classes = self.index.update(added, removed)
+        self.logger.info("Updating {} item sets and the types of {} subjects".format(len(items), len(subjects)))
+
+        # the CBS of which the number of times found or the elements changed, round by round
+        changed = set()
+        for item in items:
+            cbs = frozenset((item,))
+            self.rounds[0].set_count(cbs, 1 if self.index.posting_size(item) > 0 else 0)
+            changed.add(cbs)
+        found = set()
+        for k in range(1, len(self.rounds)):
+            changed = self._update_round(self.rounds[k], self.rounds[k-1], changed, items)
+            found.update(changed)
+
+        # regenerate the rules of the CBS of which elements changed, or the types of elements
+        touched = set(items)
+        for s in subjects:
+            touched.update(self.index.items_of_subject(s))
+        for item in touched:
+            for r in self.rounds[1:]:
+                found.update(r.containing.get(item, ()))
+
+        evaluated = set()
+        for cbs in found:
+            self._forget_rules(cbs)
+            if sum(r.counts.get(cbs, 0) for r in self.rounds[1:]) <= 0:
+                continue
+
+            self.rules[cbs] = rules_of_common_behaviour_set(self.index,
+                                                            tuple(sorted(cbs)),
+                                                            self.parameters["minimal_local_support"])
+            for rule in self.rules[cbs]:
+                self.counts[rule] = encoded_counts_of(self.index, rule)
+                self.class_rules.setdefault(rule[0], set()).add(rule)
+                evaluated.add(rule)
+
+        # recount the other rules of the classes whose members changed
+        for ctype in classes:
+            for rule in self.class_rules.get(ctype, set()) - evaluated:
+                self.counts[rule] = encoded_counts_of(self.index, rule)
+                evaluated.add(rule)
+
+        self.logger.info("Regenerated the rules of {} CBS, and evaluated {} rules".format(len(found), len(evaluated)))
+
+    def save(self, path):
+        """ Store the state, written aside and moved in place """
+        fd, partial = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(partial, path)
+
+    def _update_round(self, current, previous, changed, items):
+        """ Update the CBS of a round after those of the round before changed
+
+        :param current: the Round instance to update
+        :param previous: the Round instance of the round before
+        :param changed: CBS of the round before which were found a different number of times, or of which the elements changed
+        :param items: IDs of the items whose item set changed
+
+        :returns: the CBS of this round which were found a different number of times, or of which the elements changed
+        """
+        threshold = self.parameters["similarity_threshold"]
+
+        # pairs with a changed CBS are found anew; a CBS found more than once pairs with itself
+        touched = set()
+        for cbs in changed:
+            touched.update(current.remove_pairs_of(cbs))
+        elements = {}
+        for cbs in changed:
+            touched.add(cbs)
+            if cbs not in previous.counts.keys():
+                continue
+
+            es_0 = self._elements_of(cbs, elements)
+            for other in self._neighbours_of(previous, es_0):
+                key = frozenset((cbs, other))
+                if other == cbs or key in current.pairs.keys():
+                    continue
+                if _similarity_of(es_0, self._elements_of(other, elements)) < threshold:
+                    continue
+
+                union = cbs | other
+                current.add_pair(key, union)
+                touched.add(union)
+
+        updated = set()
+        for cbs in touched:
+            count = 0
+            for key in current.pairs_by_union.get(cbs, ()):
+                a, b = key
+                count += previous.counts[a] * previous.counts[b]
+
+            m = previous.counts.get(cbs, 0)
+            if m >= 2:
+                es = self._elements_of(cbs, elements)
+                if _similarity_of(es, es) >= threshold:
+                    count += m * (m - 1) // 2
+
+            if count != current.counts.get(cbs, 0):
+                current.set_count(cbs, count)
+                updated.add(cbs)
+
+        for item in items:
+            updated.update(current.containing.get(item, ()))
+
+        return updated
+
+    def _neighbours_of(self, previous, es):
+        """ Return the CBS of a round which may be similar to the given elements """
+        if self.parameters["similarity_threshold"] <= 0:
+            return list(previous.counts.keys())
+
+        neighbours = set()
+        for item in {item for s in es for item in self.index.items_of_subject(s)}:
+            neighbours.update(previous.containing.get(item, ()))
+
+        return neighbours
+
+    def _elements_of(self, cbs, elements):
+        if cbs not in elements.keys():
+            if len(cbs) == 1:
+                elements[cbs] = frozenset(self.index.posting_set(next(iter(cbs))))
+            else:
+                elements[cbs] = frozenset().union(*[self.index.posting_set(item) for item in cbs])
+
+        return elements[cbs]
+
+    def _forget_rules(self, cbs):
+        for rule in self.rules.pop(cbs, ()):
+            self.counts.pop(rule, None)
+            self.class_rules[rule[0]].discard(rule)
+
+    def _key_of(self, cbs):
+        # the rules come out in an order which does not depend on the order of the updates
+        return sorted((term_key(p), term_key(o)) for p, o in (self.index.items[item] for item in cbs))
+
+
+### Independent Functions ##
+
+def number_of_rounds(max_cbs_size=2):
+    """ Return the number of rounds in which CBS are extended, as run by the mining engine """
+    rounds = 0
+    cbs_size = 2
+    while cbs_size < max_cbs_size:
+        rounds += 1
+        cbs_size *= 2
+
+    return rounds + 1
+
+def mine_incrementally(instance_graph=None, ontology_graph=None, parameters={}, state=None, sampling=None):
+    """ Mine semantic association rules, and store the state of the mining to be updated later
+
+    :param instance_graph: a knowledge graph instance holding the facts of the ABox, unsampled
+    :param ontology_graph: a knowledge graph instance holding the class hierarchy
+    :param parameters: dictionary with the parameters of a directive
+    :param state: path to store the state at, as read by load()
+    :param sampling: a (sampler, patterns, options) tuple as returned by the sampling() of a directive; None to mine all facts
+
+    :returns: a RuleBase instance with the accepted rules as pending RuleTable
+    """
+    if instance_graph is None or ontology_graph is None or state is None:
+        raise ValueError("Missing input values.")
+
+    miner = IncrementalMiner(ontology_graph, parameters, sampling)
+    miner.update(added=instance_graph.graph)
+    miner.save(state)
+
+    return miner.rule_base()
+
+def update_incrementally(state=None, added=None, removed=None):
+    """ Update the rules of an earlier run with additions and removals of facts
+
+    The state is updated in place. The changes are sampled as the ABox was, and the rules
+    are measured and ranked with the parameters of the run which stored the state.
+
+    :param state: path of the state, as stored by mine_incrementally()
+    :param added: a knowledge graph instance holding the facts to add to the ABox, or None
+    :param removed: a knowledge graph instance holding the facts to remove from the ABox, or None
+
+    :returns: a RuleBase instance with the accepted rules, measured and ranked
+    """
+    if state is None:
+        raise ValueError("Missing input values.")
+
+    miner = load(state)
+    miner.update(added=added.graph if added is not None else [],
+                 removed=removed.graph if removed is not None else [])
+    miner.save(state)
+
+    rule_base = miner.rule_base()
+    rank(rule_base, miner.parameters)
+
+    rule_base.metadata["expired"] = False
+    rule_base.metadata["time_budget"] = None
+    rule_base.metadata["bins"] = {}
+
+    return rule_base
+
+def load(path):
+    """ Read the state of an incremental mining run, as stored by IncrementalMiner.save() """
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+class _LookupRecorder():
+    """ Read-only view of an rdflib Graph which records the subjects looked up in it, as samplers look them up """
+    def __init__(self, graph):
+        self.graph = graph
+        self.subjects = set()
+
+    def triples(self, pattern):
+        self.subjects.add(pattern[0])
+        return self.graph.triples(pattern)
+
+    def objects(self, subject=None, predicate=None):
+        self.subjects.add(subject)
+        return self.graph.objects(subject, predicate)
+
+if __name__ == "__main__":
+    print("Incremental mining of semantic association rules")
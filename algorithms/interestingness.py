@@ -0,0 +1,193 @@
+#!/usr/bin/python3
+
+import logging
+import math
+from statistics import NormalDist
+import numpy as np
+from models.rule_base import IRule
+
+
+"""
+Interestingness measures and significance tests for semantic association rules.
+
+All measures are derived from the counts gathered during rule evaluation: the number of
+members of the rule's class (n), and the number of those which satisfy the antecedent (a),
+the consequent (c), and both (ac). No additional passes over the graph are needed, and the
+measures of a whole rule base are computed at once.
+
+The p-value is that of Pearson's chi-square test (one degree of freedom) on the 2x2
+contingency table of antecedent and consequent within the rule's class.
+"""
+
+logger = logging.getLogger(__name__)
+
+CORRECTIONS = ("none", "bonferroni", "holm", "fdr_bh")
+
+_erfc = np.vectorize(math.erfc, otypes=[np.float64])
+
+def evaluate_measures(rule_base, correction="holm"):
+    """ Compute lift, conviction, leverage, and p-values for all rules in a rule base
+
+    :param rule_base: a RuleBase instance whose rules carry support, confidence, and consequent support counts
+    :param correction: multiple-testing correction of the p-values, one of CORRECTIONS
+
+    :updates: rules in rule_base
+    :returns: none
+    """
+    if correction not in CORRECTIONS:
+        raise ValueError("Unknown correction: {}".format(correction))
+
+    if rule_base.is_pending():
+        # rules still in a RuleTable: keep the measures as columns until the IRules are built
+        table = rule_base.table
+        logger.info("Computing interestingness measures of {} rules (correction: {})".format(len(table), correction))
+        if len(table) <= 0:
+            return
+
+        n, a, c, ac = (table.records[name].astype(np.float64) for name in ("n", "a", "c", "ac"))
+        lift, conviction, leverage, p_values = measures_from_counts(n, a, c, ac)
+        table.measures["lift"] = tuple(np.asarray(v, dtype=np.float64) for v in lift)
+        table.measures["conviction"] = tuple(np.asarray(v, dtype=np.float64) for v in conviction)
+        table.measures["leverage"] = tuple(np.asarray(v, dtype=np.float64) for v in leverage)
+        table.measures["p_value"] = (np.asarray(adjust_p_values(p_values, correction), dtype=np.float64),)
+
+        rule_base.metadata["p_value_correction"] = correction
+        return
+
+    irules = [irule for irule in rule_base.model if _has_counts(irule)]
+    logger.info("Computing interestingness measures of {} rules (correction: {})".format(len(irules), correction))
+    if len(irules) <= 0:
+        return
+
+    n, a, c, ac = counts_to_arrays(irules)
+    lift, conviction, leverage, p_values = measures_from_counts(n, a, c, ac)
+    p_values = adjust_p_values(p_values, correction)
+
+    for i, irule in enumerate(irules):
+        irule.lift = IRule.Measure(*[float(v[i]) for v in lift])
+        irule.conviction = IRule.Measure(*[float(v[i]) for v in conviction])
+        irule.leverage = IRule.Measure(*[float(v[i]) for v in leverage])
+        irule.p_value = IRule.Measure(float(p_values[i]))
+
+    rule_base.metadata["p_value_correction"] = correction
+
+def counts_to_arrays(irules):
+    """ Collect the class, antecedent, consequent, and rule counts of evaluated rules
+
+    :param irules: a list of IRule instances
+
+    :returns: a tuple of four float arrays (n, a, c, ac)
+    """
+    counts = np.array([(irule.support.denominator,
+                        irule.support.numerator,
+                        irule.consequent_support.numerator,
+                        irule.confidence.numerator) for irule in irules], dtype=np.float64).reshape(-1, 4)
+
+    return (counts[:, 0], counts[:, 1], counts[:, 2], counts[:, 3])
+
+def measures_from_counts(n, a, c, ac):
+    """ Compute interestingness measures from arrays of counts
+
+    :param n: array with the number of class members per rule
+    :param a: array with the number of members satisfying the antecedent
+    :param c: array with the number of members satisfying the consequent
+    :param ac: array with the number of members satisfying both
+
+    :returns: a (lift, conviction, leverage, p-values) tuple; the first three as (value, numerator, denominator)
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # lift = P(AC) / (P(A) P(C))
+        lift_numerator = ac * n
+        lift_denominator = a * c
+        lift = np.where(lift_denominator > 0, lift_numerator / lift_denominator, 0.0)
+
+        # conviction = P(A) P(~C) / P(A~C)
+        conviction_numerator = a * (n - c)
+        conviction_denominator = n * (a - ac)
+        conviction = np.where(conviction_denominator > 0,
+                              conviction_numerator / conviction_denominator,
+                              np.where(conviction_numerator > 0, np.inf, 1.0))
+
+        # leverage = P(AC) - P(A) P(C)
+        leverage_numerator = ac * n - a * c
+        leverage_denominator = n * n
+        leverage = np.where(leverage_denominator > 0, leverage_numerator / leverage_denominator, 0.0)
+
+        # chi-square on the 2x2 contingency table
+        n_10 = a - ac
+        n_01 = c - ac
+        n_00 = n - a - c + ac
+        chi_denominator = a * (n - a) * c * (n - c)
+        chi_square = np.where(chi_denominator > 0,
+                              n * (ac * n_00 - n_10 * n_01) ** 2 / chi_denominator,
+                              0.0)
+
+    p_values = np.minimum(_erfc(np.sqrt(chi_square / 2.0)), 1.0)
+
+    return ((lift, lift_numerator, lift_denominator),
+            (conviction, conviction_numerator, conviction_denominator),
+            (leverage, leverage_numerator, leverage_denominator),
+            p_values)
+
+def intervals_from_counts(successes, trials, population, level=.95):
+    """ Compute confidence intervals of proportions estimated on a sample without replacement
+
+    Wilson score intervals, with the number of trials scaled up by the finite population
+    correction, so that an interval narrows to the estimate as the sample covers the population.
+
+    :param successes: array with the number of successes per proportion
+    :param trials: array with the number of sampled trials per proportion
+    :param population: array with the size of the population the trials are drawn from
+    :param level: confidence level of the intervals
+
+    :returns: a (lower, upper) tuple of arrays; (0, 1) for proportions without trials
+    """
+    z = NormalDist().inv_cdf(1.0 - (1.0 - level) / 2.0)
+    successes, trials, population = (np.asarray(v, dtype=np.float64) for v in (successes, trials, population))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = np.where(trials > 0, successes / trials, 0.0)
+        effective = np.where(population > trials, trials * (population - 1) / (population - trials), np.inf)
+
+        denominator = 1.0 + z * z / effective
+        centre = (p + z * z / (2.0 * effective)) / denominator
+        margin = z * np.sqrt(p * (1.0 - p) / effective + z * z / (4.0 * effective * effective)) / denominator
+
+    lower = np.where(trials > 0, np.clip(centre - margin, 0.0, 1.0), 0.0)
+    upper = np.where(trials > 0, np.clip(centre + margin, 0.0, 1.0), 1.0)
+
+    return (lower, upper)
+
+def adjust_p_values(p_values, correction="holm"):
+    """ Correct p-values for multiple testing
+
+    :param p_values: array of p-values
+    :param correction: one of CORRECTIONS
+
+    :returns: array of adjusted p-values
+    """
+    m = len(p_values)
+    if correction == "none" or m <= 0:
+        return p_values
+    if correction == "bonferroni":
+        return np.minimum(p_values * m, 1.0)
+
+    order = np.argsort(p_values)
+    ranked = p_values[order]
+    if correction == "holm":
+        adjusted = np.maximum.accumulate(ranked * (m - np.arange(m)))
+    else:  # Benjamini-Hochberg
+        adjusted = np.minimum.accumulate((ranked * m / np.arange(1, m+1))[::-1])[::-1]
+
+    p_adjusted = np.empty(m)
+    p_adjusted[order] = np.minimum(adjusted, 1.0)
+
+    return p_adjusted
+
+def _has_counts(irule):
+    return irule.consequent_support is not None and\
+           None not in (irule.support.numerator, irule.support.denominator,
+                        irule.confidence.numerator, irule.consequent_support.numerator)
+
+if __name__ == "__main__":
+    print("Interestingness measures for semantic association rules")
@@ -0,0 +1,523 @@
+#!/usr/bin/python3
+
+import logging
+from functools import partial
+from rdflib.paths import SequencePath
+from auxiliarly.deadline import Deadline
+from auxiliarly.worker_pool import create_pool
+from auxiliarly.resources import default_memory_budget, number_of_workers, worker_memory_of,\
+                                 ENCODED_GRAPH_BYTES_PER_FACT
+from auxiliarly.scheduler import TriangularScheduler
+from auxiliarly.pipeline import Batch, Stage
+from auxiliarly.artifact_cache import ArtifactCache, definition_of
+from readers import rdf
+from models.encoded_graph import encode, encode_facts
+from models.cbs_store import CBSStore
+from models.rule_base import RuleBase
+from algorithms.semantic_rule_learning_mp import generate_semantic_association_rules,\
+                                                 generate_common_behaviour_sets,\
+                                                 cost_of_item_sets,\
+                                                 common_behaviour_sets_of,\
+                                                 encode_common_behaviour_sets,\
+                                                 decode_common_behaviour_sets,\
+                                                 extend_common_behaviour_sets,\
+                                                 extend_encoded_common_behaviour_sets,\
+                                                 evaluate_rules,\
+                                                 accepted_rules_of,\
+                                                 rule_table_of,\
+                                                 order_by_promise,\
+                                                 coverage_of,\
+                                                 generate_semantic_item_set_shard,\
+                                                 generate_semantic_path_item_set_shard,\
+                                                 merge_semantic_item_set_shards,\
+                                                 decode_item_sets
+from algorithms.interestingness import evaluate_measures
+from algorithms.discretisation import discretise
+from algorithms.generalisation import concept_closure, generalise_item_sets, suppress_cross_level
+
+
+"""
+Mining engine for semantic association rules, which runs the SWARM stages on an executor
+of choice (see auxiliarly.worker_pool.EXECUTORS).
+
+All executors run the same functions on the same encoded graph, and the results of every
+stage are consumed in the order in which its work was handed out, so that the rules and
+their order do not depend on the executor, the number of workers, or which worker finishes
+first. Only runs which are cut short by a time budget or failing work may differ.
+
+Given an artifact cache, every stage journals its results under a key derived from the
+item sets and its parameters, so that a run which is interrupted, or repeated with other
+parameters for later stages only, replays what is journaled rather than computing it again.
+"""
+
+logger = logging.getLogger(__name__)
+
+# parameters of all MP directives, next to the sampling depth, similarity threshold, CBS size,
+# and minimal local support, support, and confidence which every directive sets itself
+DEFAULT_PARAMETERS = {
+    # anytime mode
+    "time_budget": None,
+    # ranking and interestingness
+    "rank_by": ("confidence", "support"),
+    "top_k": None,
+    "p_value_correction": "holm",
+    # item sets
+    "discretisation": None,
+    "number_of_bins": 5,
+    "vocabulary": None,
+    "path_item_sets": False,
+    # executor
+    "executor": "process",
+    "start_method": None,
+    "task_timeout": None,
+    "task_retries": 2,
+    "workers": None,
+    "memory_budget": None,
+    "batch_size": 64,
+    "pipeline_capacity": None,
+    "coordinator": None,
+    "cbs_budget": None,
+    "cache": None,
+    # modes
+    "state": None,
+    "partition_by_class": False,
+    "datasets": None,
+    "sample_rate": None,
+    "sample_seed": 0,
+    "sample_verification": False,
+    "confidence_level": .95,
+}
+
+def run_directive(dataset=None, parameters={}, cache=None, key=None, sampling=None):
+    """ Mine the dataset of a directive, as all MP directives do
+
+    Generates the semantic item sets of the dataset, of discretised literals or of context
+    paths if asked for, and generalised along a controlled vocabulary if given, and mines
+    them in the mode of choice: on a stratified sample, per class partition, or all at once.
+    Runs which keep state instead mine incrementally, and sample the ABox themselves. The
+    rules are measured and ranked.
+
+    :param dataset: tuple of the sampled ABox (unsampled with state) and the TBox as knowledge graphs, and the context paths of the sample and
+                    the individuals they start at or None
+    :param parameters: dictionary with the parameters of a directive, see DEFAULT_PARAMETERS
+    :param cache: an ArtifactCache instance to reuse and journal the stages in; None to cache nothing
+    :param key: key of the dataset in the cache
+    :param sampling: the sampling of the ABox, as returned by the sampling() of a directive; only used with state
+
+    :returns: a tuple of a RuleBase instance with the rules, measured and ranked, and the run as metadata, and a
+              (knowledge graph, item sets) tuple with the graph and item sets they were mined on, or None with state
+    """
+    # the modes build on mine(), so are imported once it is defined
+    from algorithms.incremental_mining import mine_incrementally
+    from algorithms.partitioning import mine_partitioned
+    from algorithms.sampled_mining import mine_sampled
+
+    if dataset is None:
+        raise ValueError("Missing input values.")
+
+    kg_i, kg_s, paths = dataset
+    cache = cache if cache is not None else ArtifactCache()
+
+    if parameters["state"] is not None:
+        # keep the state of the mining, and the ABox with the sampling, to update the rules
+        # with additions and removals of facts later
+        rule_base = mine_incrementally(kg_i, kg_s, parameters, parameters["state"], sampling)
+        rank(rule_base, parameters)
+        rule_base.metadata["expired"] = False
+        rule_base.metadata["time_budget"] = None
+        rule_base.metadata["bins"] = {}
+
+        return (rule_base, None)
+
+    # anytime mode: candidates get half of the budget, rule generation three quarters
+    deadline = Deadline(parameters["time_budget"])
+
+    # one pool of workers for all stages of the run, sized to the graph as it will be encoded;
+    # the encoded facts which the item sets are generated from are smaller
+    pool = pool_of(parameters, ENCODED_GRAPH_BYTES_PER_FACT * len(kg_i.graph))
+
+    # item sets are cached under the key of the dataset and the parameters they derive from
+    item_sets_key = cache.key_of("item_sets",
+                                 key,
+                                 parameters["discretisation"],
+                                 parameters["number_of_bins"],
+                                 cache.digest_of_file(parameters["vocabulary"]),
+                                 parameters["path_item_sets"],
+                                 parameters["time_budget"] is not None,
+                                 definition_of(_item_sets_of))
+    kg_i, bins, closure, item_sets = cache.computed(item_sets_key, _item_sets_of, kg_i, paths, parameters, pool)
+    mined = (kg_i, item_sets)
+
+    # mine rules on the executor of choice, which does not affect the results
+    if parameters["sample_rate"] is not None:
+        # only mine a stratified subsample of the individuals of every class
+        rule_base = mine_sampled(kg_i, kg_s, item_sets, parameters, deadline, closure, cache, item_sets_key, pool)
+    elif parameters["partition_by_class"]:
+        # only compare item sets of subjects which may share a class
+        rule_base = mine_partitioned(kg_i, kg_s, item_sets, parameters, deadline, closure, cache, item_sets_key,
+                                     pool)
+    else:
+        rule_base = mine(kg_i, kg_s, item_sets, parameters, deadline, closure, cache, item_sets_key, pool)
+    pool.close()
+
+    # runs may also be incomplete on failed work, without the budget having expired
+    rule_base.metadata["expired"] = deadline.expired()
+
+    rank(rule_base, parameters)
+    rule_base.metadata["time_budget"] = parameters["time_budget"]
+    rule_base.metadata["bins"] = bins
+
+    return (rule_base, mined)
+
+def rank(rule_base=None, parameters={}):
+    """ Measure the rules of a run, and rank them
+
+    :param rule_base: a RuleBase instance with the accepted rules as pending RuleTable
+    :param parameters: dictionary with the parameters of a directive
+
+    :updates: rule_base with the measures of its rules, in order of rank, and optionally only the best k rules
+    :returns: none
+    """
+    # interestingness measures and significance from the gathered counts
+    evaluate_measures(rule_base, parameters["p_value_correction"])
+
+    # ranking on any measure by merging the ranked rules of the workers, optionally keeping only the best k rules
+    if parameters["top_k"] is not None:
+        rule_base.top_k(parameters["top_k"], parameters["rank_by"])
+    else:
+        rule_base.sort(by=parameters["rank_by"])
+
+def pool_of(parameters={}, graph_size=0):
+    """ Start a pool of workers on the executor of choice
+
+    As many workers as the CPU quota allows and the memory budget fits, unless the number
+    of workers is given. The distributed executor needs it to be given, as its workers run
+    on other machines.
+
+    :param parameters: dictionary with the parameters of a directive, including the executor
+    :param graph_size: size in bytes of the encoded graph the workers attach to
+
+    :returns: a pool instance as returned by create_pool()
+    """
+    memory_budget = parameters["memory_budget"] or default_memory_budget()
+    workers = parameters["workers"]
+    if workers is None and parameters["executor"] != "distributed":
+        workers = number_of_workers(worker_memory_of(graph_size), memory_budget)
+
+    pool = create_pool(parameters["executor"],
+                       processes=workers,
+                       start_method=parameters["start_method"],
+                       timeout=parameters["task_timeout"],
+                       retries=parameters["task_retries"],
+                       memory_budget=memory_budget,
+                       address=parameters["coordinator"])
+    logger.info("Distributing load over {} workers ({} executor)".format(pool.processes, parameters["executor"]))
+
+    return pool
+
+def mine(instance_graph=None, ontology_graph=None, item_sets=[], parameters={}, deadline=None, closure={},
+         cache=None, key=None, pool=None):
+    """ Mine semantic association rules from semantic item sets
+
+    :param instance_graph: a knowledge graph instance holding the facts
+    :param ontology_graph: a knowledge graph instance holding the class hierarchy
+    :param item_sets: list of ((p, o), item set) tuples
+    :param parameters: dictionary with the parameters of a directive, including the executor
+    :param deadline: a Deadline instance; candidates get half of it, rule generation three quarters
+    :param closure: concept closure as returned by concept_closure(); CBS combining an item with its generalisation are suppressed
+    :param cache: an ArtifactCache instance in which every stage journals its results, to resume from; None to journal nothing
+    :param key: key of the artifact holding the item sets and closure, from which the keys of the stages derive
+    :param pool: a pool of workers as returned by pool_of(), which is left open; None to start one for this run only
+
+    :returns: a RuleBase instance with the accepted rules as pending RuleTable, and their coverage, failed work, and completeness as metadata
+    """
+    if instance_graph is None or ontology_graph is None:
+        raise ValueError("Missing input values.")
+
+    deadline = deadline if deadline is not None else Deadline(None)
+    cache = cache if cache is not None else ArtifactCache()
+    candidate_deadline = deadline.fraction(.5)
+    rule_deadline = deadline.fraction(.75)
+
+    # encoded copy of the graph and item sets, memory mapped by all workers
+    encoded_graph = encode(instance_graph, ontology_graph, item_sets)
+
+    # one pool of workers for all stages, which attach to the encoded graph on their first task
+    own_pool = pool is None
+    if own_pool:
+        pool = pool_of(parameters, encoded_graph.nbytes())
+    pool.share(encoded_graph=encoded_graph.directory)
+    workers = pool.processes
+
+    # a pool may have run other work before, whose failures are not of this run
+    failures = len(pool.failure_report())
+
+    # the stages run at the same time: common behaviour sets go to rule generation as soon
+    # as they are found, and rules to evaluation as soon as they are generated; a full queue
+    # holds back the stages before it
+    capacity = parameters["pipeline_capacity"] or 2 * workers
+
+    # the results of every stage are journaled under a key of what they derive from; work
+    # cut short by a time budget is not, as a run with more time would finish it
+    journaled = key is not None and deadline.budget is None
+    if journaled:
+        # results refer to items by their position, so the order of the item sets is part of the key
+        key = cache.key_of("encoded_graph", key, [pa for pa, _ in item_sets])
+    def journal_of(*parts):
+        return cache.journal(cache.key_of(*parts) if journaled else None)
+
+    candidates_key = cache.key_of("common_behaviour_sets", key, parameters["similarity_threshold"])
+    journals = [journal_of("common_behaviour_sets", candidates_key),
+                journal_of("rule_generation", key, parameters["minimal_local_support"]),
+                journal_of("rule_evaluation",
+                           key,
+                           parameters["minimal_support"],
+                           parameters["minimal_confidence"],
+                           parameters["rank_by"])]
+    unfinished = {"common_behaviour_sets": [], "rule_generation": [], "rule_evaluation": []}
+    accepted = []
+
+    # CBS are only kept to be extended; with a CBS budget, they are encoded and spilled to
+    # disk beyond it, and extended on a memory-mapped table of them
+    spill = parameters["cbs_budget"] is not None
+    cbs_sets_extended = CBSStore(width=2, budget=parameters["cbs_budget"]) if spill else []
+    cbs_sets_extention = []
+
+    def queue_cbs_sets(cbs_batch):
+        # generate rules from the CBS without cross-level items, the most promising first
+        if len(closure) > 0:
+            cbs_batch = suppress_cross_level(cbs_batch, closure)
+        if deadline.budget is not None:
+            cbs_batch = order_by_promise(cbs_batch)
+        generation.put(encode_common_behaviour_sets(cbs_batch, encoded_graph))
+
+        return cbs_batch
+
+    def consume_pairs(work, output):
+        pairs, remainder = output
+        unfinished["common_behaviour_sets"].extend(remainder)
+
+        cbs_batch = queue_cbs_sets(common_behaviour_sets_of(pairs, item_sets))
+        if parameters["max_cbs_size"] <= 2:
+            return
+
+        if spill:
+            cbs_sets_extended.extend(encode_common_behaviour_sets(cbs_batch, encoded_graph),
+                                     [similarity for _, similarity in cbs_batch])
+        else:
+            cbs_sets_extended.extend(cbs_batch)
+
+    def consume_extensions(work, cbs_subset):
+        if spill:
+            cbs_sets_extention.append(cbs_subset)
+            cbs_subset = decode_common_behaviour_sets(cbs_subset, item_sets)
+        else:
+            cbs_sets_extention.extend(cbs_subset)
+        queue_cbs_sets(cbs_subset)
+
+    def consume_rules(work, output):
+        rule_subset, remainder = output
+        unfinished["rule_generation"].extend(remainder)
+        evaluation.put(rule_subset)
+
+    def consume_counts(work, output):
+        # each worker ranks the rules it accepts, which are merged afterwards
+        result_subset, remainder = output
+        unfinished["rule_evaluation"].extend(remainder)
+        accepted.append(accepted_rules_of(work, result_subset, parameters["rank_by"]))
+
+    generation = Stage("rule_generation",
+                       partial(generate_semantic_association_rules,
+                               parameters["minimal_local_support"],
+                               rule_deadline),
+                       consumer=consume_rules,
+                       capacity=capacity,
+                       batch_size=parameters["batch_size"],
+                       ordered=True,
+                       journal=journals[1])
+    evaluation = Stage("rule_evaluation",
+                       partial(evaluate_rules,
+                               parameters["minimal_support"],
+                               parameters["minimal_confidence"],
+                               parameters["rank_by"],
+                               deadline),
+                       consumer=consume_counts,
+                       capacity=capacity,
+                       ordered=True,
+                       journal=journals[2])
+
+    # generate common behaviour sets, in chunks handed out on demand
+    candidates = Stage("common_behaviour_sets",
+                       partial(generate_common_behaviour_sets,
+                               parameters["similarity_threshold"],
+                               candidate_deadline),
+                       consumer=consume_pairs,
+                       scheduler=TriangularScheduler(len(item_sets), workers,
+                                                     costs=cost_of_item_sets(encoded_graph),
+                                                     deadline=candidate_deadline),
+                       ordered=True,
+                       journal=journals[0])
+
+    pool.pipeline([candidates, generation, evaluation])
+    unfinished["common_behaviour_sets"].extend(candidates.scheduler.remainder())
+    unfinished["common_behaviour_sets"].extend(pool.failed("common_behaviour_sets", failures))
+
+    # extend common behaviour sets, round by round, while rules are generated from the extensions
+    cbs_size = 2
+    while cbs_size < parameters["max_cbs_size"] and not candidate_deadline.expired():
+        journals.append(journal_of("extension", candidates_key, cbs_size, spill))
+        extension = Stage("extension",
+                          partial(extend_encoded_common_behaviour_sets if spill else extend_common_behaviour_sets,
+                                  parameters["similarity_threshold"],
+                                  candidate_deadline),
+                          consumer=consume_extensions,
+                          scheduler=TriangularScheduler(len(cbs_sets_extended), workers,
+                                                        deadline=candidate_deadline),
+                          ordered=True,
+                          journal=journals[-1])
+
+        if spill:
+            cbs_sets_extention = CBSStore(width=2 * cbs_size, budget=parameters["cbs_budget"])
+            pool.share(cbs_table=cbs_sets_extended.merge())
+        else:
+            cbs_sets_extention = []
+            pool.share(cbs_list=cbs_sets_extended)
+        pool.pipeline([extension, generation, evaluation])
+
+        if spill:
+            cbs_sets_extended.close()
+        cbs_sets_extended = cbs_sets_extention
+        cbs_size *= 2
+
+    extension_complete = cbs_size >= parameters["max_cbs_size"] and not candidate_deadline.expired() and\
+                         len(pool.failed("extension", failures)) <= 0
+    pool.release("encoded_graph", "cbs_table" if spill else "cbs_list")
+    if spill:
+        cbs_sets_extended.close()
+    unfinished["rule_generation"].extend(pool.failed("rule_generation", failures))
+    unfinished["rule_evaluation"].extend(pool.failed("rule_evaluation", failures))
+    if own_pool:
+        pool.close()
+    for journal in journals:
+        journal.close()
+
+    # rules stay packed until written or reviewed
+    rule_base = RuleBase(table=rule_table_of(accepted, encoded_graph))
+    encoded_graph.close()
+
+    coverage = {}
+    coverage["common_behaviour_sets"] = coverage_of([range(len(item_sets))],
+                                                    unfinished["common_behaviour_sets"],
+                                                    len(item_sets))
+    coverage["rule_generation"] = coverage_of([range(generation.queued)],
+                                              unfinished["rule_generation"],
+                                              generation.queued)
+    coverage["rule_evaluation"] = coverage_of([range(evaluation.queued)],
+                                              unfinished["rule_evaluation"],
+                                              evaluation.queued)
+
+    rule_base.metadata["coverage"] = coverage
+    rule_base.metadata["failed"] = pool.failure_report(failures)
+    rule_base.metadata["complete"] = extension_complete and\
+                                     False not in [processed >= total for processed, total in coverage.values()]
+
+    return rule_base
+
+def generate_item_sets(instance_graph=None, parameters={}, pool=None, paths=None):
+    """ Generate semantic item sets on the executor of choice
+
+    The facts are encoded once, and every worker generates the postings of a range of the
+    subjects from the rows of the encoded facts, to which it attaches as it does to an
+    encoded graph; the ranges are disjoint, so the posting lists of the graph are their
+    merged postings. The order of the item sets does not depend on the executor or the
+    number of workers.
+
+    Given context paths, every worker instead follows the paths from a batch of the
+    individuals they start at, and generates one (path, o) item per path of each.
+
+    :param instance_graph: a knowledge graph instance holding the facts
+    :param parameters: dictionary with the parameters of a directive, including the executor
+    :param pool: a pool of workers as returned by pool_of(), which is left open; None to start one for this run only
+    :param paths: tuple of the context paths of the sample and the individuals they start at; None for (p, o) items of all subjects
+
+    :returns: dictionary with (p, o) pairs as keys and frozenset of matching s as value, with p a SequencePath for paths
+    """
+    if instance_graph is None:
+        raise ValueError("Missing input values.")
+
+    encoded_facts = encode_facts(instance_graph)
+    own_pool = pool is None
+    if own_pool:
+        pool = pool_of(parameters, encoded_facts.nbytes())
+
+    predicates = None
+    if paths is None:
+        func = generate_semantic_item_set_shard
+        shards = encoded_facts.subject_ranges(pool.processes)
+    else:
+        context, individuals = paths
+        context = [path if type(path) is tuple else (path,) for path in context]
+        predicates = [path[0] if len(path) == 1 else SequencePath(*path) for path in context]
+        func = partial(generate_semantic_path_item_set_shard,
+                       [tuple(encoded_facts.id_of(p) for p in path) for path in context])
+
+        # individuals without facts have no paths to follow
+        seeds = sorted(i for i in (encoded_facts.id_of(s) for s in individuals) if i >= 0)
+        size = max(1, -(-len(seeds) // pool.processes))
+        shards = [Batch(start, seeds[start:start+size]) for start in range(0, len(seeds), size)]
+    logger.info("Generating Semantic Item Sets in {} shards ({} executor)".format(len(shards), parameters["executor"]))
+
+    # the encoded facts are only shared for this stage; the workers drop them once they attach to the encoded graph
+    failures = len(pool.failure_report())
+    pool.share(encoded_facts=encoded_facts.directory)
+    outputs = list(pool.imap_unordered(func, shards, stage="item_sets"))
+    failed = pool.failed("item_sets", failures)
+    pool.release("encoded_facts")
+    if own_pool:
+        pool.close()
+    if len(failed) > 0:
+        encoded_facts.close()
+        # without a shard, the item sets of its subjects would be incomplete
+        raise RuntimeError("Failed to generate the Semantic Item Sets of subjects {}".format(
+            ", ".join("{} to {}".format(work.start, work.stop) for work in failed)))
+
+    item_sets = decode_item_sets(merge_semantic_item_set_shards(outputs), encoded_facts, predicates)
+    encoded_facts.close()
+    logger.info("Generated {} Semantic Item Sets".format(len(item_sets)))
+
+    return item_sets
+
+def _item_sets_of(instance_graph, paths, parameters, pool):
+    """ Generate the semantic item sets of a directive, and the graph, bins, and closure they derive from """
+    # replace numeric literals by bin tokens
+    bins = {}
+    if parameters["discretisation"] is not None:
+        instance_graph, bins = discretise(instance_graph,
+                                          strategy=parameters["discretisation"],
+                                          number_of_bins=parameters["number_of_bins"])
+
+    if parameters["path_item_sets"]:
+        if paths is None:
+            raise ValueError("Path item sets need a directive which samples by definition")
+
+        # one (path, o) item per context path of each sampled individual, a batch of the individuals per worker
+        si_sets = generate_item_sets(instance_graph, parameters, pool, paths)
+    else:
+        # generate semantic item sets from sampled graph, a shard of the subjects per worker
+        si_sets = generate_item_sets(instance_graph, parameters, pool)
+
+    # generalise objects up the SKOS hierarchy of the controlled vocabulary
+    closure = {}
+    if parameters["vocabulary"] is not None:
+        closure = concept_closure(rdf.read(local_path=parameters["vocabulary"]))
+        si_sets = generalise_item_sets(instance_graph, si_sets, closure)
+
+    if parameters["time_budget"] is not None:
+        # most frequent item sets are most promising
+        si_sets = dict(sorted(si_sets.items(), key=lambda item: len(item[1]), reverse=True))
+    item_sets = [(pa, frozenset(es)) for pa, es in si_sets.items()]
+
+    return (instance_graph, bins, closure, item_sets)
+
+if __name__ == "__main__":
+    print("Mining engine for semantic association rules")
@@ -0,0 +1,139 @@
+#!/usr/bin/python3
+
+import logging
+from rdflib import Graph
+from rdflib.namespace import RDF
+from auxiliarly.deadline import Deadline
+from auxiliarly.artifact_cache import ArtifactCache
+from models.encoded_graph import branch_of, term_key
+from models.knowledge_graph import KnowledgeGraph
+from models.rule_base import RuleBase
+from models.rule_table import combine
+from algorithms.mining_engine import mine
+
+
+"""
+Class-partitioned mining of semantic association rules.
+
+Every rule is scoped to a class, and the class of a CBS is a class of its elements or one
+above it on their upward class hierarchy branch. Subjects are therefore partitioned on the
+roots of the branches of their classes: item sets are restricted to the subjects of one
+partition, and every partition is mined on its own, so that item sets of subjects which
+cannot share a class are never compared. The quadratic pass over all item sets becomes one
+per partition.
+
+A subject with classes on several branches takes part in the partition of each, with only
+the classes of that branch, so that every rule is counted over all members of its class.
+The rules differ from those of an unpartitioned run, in which the similarity of item sets
+also depends on subjects of other classes.
+"""
+
+logger = logging.getLogger(__name__)
+
+def partitions_of(instance_graph=None, ontology_graph=None):
+    """ Partition the subjects on the roots of the class hierarchy branches of their classes
+
+    Subjects without class can not be the element of a rule and are left out.
+
+    :param instance_graph: a knowledge graph instance holding the facts
+    :param ontology_graph: a knowledge graph instance holding the class hierarchy
+
+    :returns: dictionary with roots as keys, and lists of (subject, class) tuples as values
+    """
+    roots = {}
+    partitions = {}
+    for s, ctype in instance_graph.graph.subject_objects(RDF.type):
+        if ctype not in roots.keys():
+            roots[ctype] = branch_of(ontology_graph, ctype)[-1]
+
+        partitions.setdefault(roots[ctype], []).append((s, ctype))
+
+    logger.info("Partitioned subjects on {} class hierarchy roots".format(len(partitions)))
+    return partitions
+
+def partition_item_sets(item_sets=[], members=[]):
+    """ Restrict item sets to the subjects of a partition
+
+    :param item_sets: list of ((p, o), item set) tuples
+    :param members: list of (subject, class) tuples of the partition
+
+    :returns: list of ((p, o), item set) tuples with the non-empty item sets, in the same order
+    """
+    subjects = frozenset(s for s, _ in members)
+
+    return [(pa, es) for pa, es in ((pa, es & subjects) for pa, es in item_sets) if len(es) > 0]
+
+def mine_partitioned(instance_graph=None, ontology_graph=None, item_sets=[], parameters={}, deadline=None, closure={},
+                     cache=None, key=None, pool=None):
+    """ Mine semantic association rules per partition of the subjects, and combine them
+
+    Partitions are mined one after another, most costly first, each on all workers; a time
+    budget is shared on their cost.
+
+    :param instance_graph: a knowledge graph instance holding the facts
+    :param ontology_graph: a knowledge graph instance holding the class hierarchy
+    :param item_sets: list of ((p, o), item set) tuples
+    :param parameters: dictionary with the parameters of a directive, including the executor
+    :param deadline: a Deadline instance
+    :param closure: concept closure as returned by concept_closure()
+    :param cache: an ArtifactCache instance in which every stage journals its results, to resume from; None to journal nothing
+    :param key: key of the artifact holding the item sets and closure, from which the keys of the partitions derive
+    :param pool: a pool of workers as returned by pool_of(), on which all partitions are mined; None to start one per partition
+
+    :returns: a RuleBase instance with the accepted rules of all partitions as pending RuleTable, and their coverage, failed work, and completeness as metadata
+    """
+    if instance_graph is None or ontology_graph is None:
+        raise ValueError("Missing input values.")
+
+    deadline = deadline if deadline is not None else Deadline(None)
+    cache = cache if cache is not None else ArtifactCache()
+
+    partitions = []
+    for root, members in partitions_of(instance_graph, ontology_graph).items():
+        partition = partition_item_sets(item_sets, members)
+        if len(partition) > 1:
+            partitions.append((root, members, partition))
+    partitions.sort(key=lambda partition: (-len(partition[2]), term_key(partition[0])))
+
+    # the pairwise pass costs the square of the number of item sets
+    costs = [len(partition) ** 2 for _, _, partition in partitions]
+    remaining = sum(costs)
+
+    tables = []
+    coverage = {}
+    failed = []
+    complete = True
+    for (root, members, partition), cost in zip(partitions, costs):
+        logger.info("Mining partition of {} with {} subjects and {} item sets".format(root,
+                                                                                    len({s for s, _ in members}),
+                                                                                    len(partition)))
+
+        # only the classes of this branch, so that the members of every class are all in the partition
+        type_graph = Graph()
+        for s, ctype in members:
+            type_graph.add((s, RDF.type, ctype))
+
+        partition_deadline = deadline
+        if deadline.budget is not None:
+            partition_deadline = Deadline(deadline.remaining() * cost / max(1, remaining))
+        remaining -= cost
+
+        rule_base = mine(KnowledgeGraph(type_graph), ontology_graph, partition, parameters, partition_deadline, closure,
+                         cache, cache.key_of("partition", key, term_key(root)) if key is not None else None, pool)
+
+        tables.append(rule_base.table)
+        for stage, (processed, total) in rule_base.metadata["coverage"].items():
+            coverage[stage] = tuple(x + y for x, y in zip(coverage.get(stage, (0, 0)), (processed, total)))
+        failed.extend(rule_base.metadata["failed"])
+        complete = complete and rule_base.metadata["complete"]
+
+    rule_base = RuleBase(table=combine(tables))
+    rule_base.metadata["coverage"] = coverage
+    rule_base.metadata["failed"] = failed
+    rule_base.metadata["complete"] = complete
+    rule_base.metadata["partitions"] = len(partitions)
+
+    return rule_base
+
+if __name__ == "__main__":
+    print("Class-partitioned mining of semantic association rules")
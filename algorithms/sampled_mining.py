@@ -0,0 +1,152 @@
+#!/usr/bin/python3
+
+import logging
+import numpy as np
+from rdflib import Graph
+from rdflib.namespace import RDF
+from auxiliarly.artifact_cache import ArtifactCache
+from models.knowledge_graph import KnowledgeGraph
+from models.rule_table import ratio_of
+from samplers import stratified
+from algorithms.mining_engine import mine
+from algorithms.partitioning import partition_item_sets
+from algorithms.dataset_mining import count_datasets
+from algorithms.interestingness import intervals_from_counts
+
+
+"""
+Mining of semantic association rules on a stratified subsample of the individuals.
+
+A fraction of the individuals of every class is drawn (see samplers.stratified), the item
+sets are restricted to them, and only these are mined, so that a directive can be tried
+in a fraction of the time. The counts of the rules are those of the sample: their support
+and confidence are estimates, which carry confidence intervals for the proportions in the
+full graph. The class members in the full graph are known, so the intervals account for
+drawing without replacement; those of the confidence, whose population is the unknown
+number of members with the antecedent, take the estimate of that number.
+
+Optionally, the rules which survive on the sample are counted again on the full graph,
+all in one batched pass on the executor, after which their counts are exact and the
+minimal support and confidence are applied to these. Rules which only fall short on the
+sample are not found either way.
+"""
+
+logger = logging.getLogger(__name__)
+
+def mine_sampled(instance_graph=None, ontology_graph=None, item_sets=[], parameters={}, deadline=None, closure={},
+                 cache=None, key=None, pool=None):
+    """ Mine semantic association rules on a stratified subsample of the individuals of every class
+
+    :param instance_graph: a knowledge graph instance holding the facts
+    :param ontology_graph: a knowledge graph instance holding the class hierarchy
+    :param item_sets: list of ((p, o), item set) tuples of the full graph
+    :param parameters: dictionary with the parameters of a directive, including the sample rate and seed
+    :param deadline: a Deadline instance
+    :param closure: concept closure as returned by concept_closure()
+    :param cache: an ArtifactCache instance in which every stage journals its results, to resume from; None to journal nothing
+    :param key: key of the artifact holding the item sets and closure, from which the key of the sample derives
+    :param pool: a pool of workers as returned by pool_of(), on which the sample is mined and verified; None to start one per stage
+
+    :returns: a RuleBase instance with the accepted rules as pending RuleTable, with intervals or counted on the full graph, and the sample as metadata
+    """
+    if instance_graph is None or ontology_graph is None:
+        raise ValueError("Missing input values.")
+    if parameters["partition_by_class"]:
+        raise ValueError("Sampled mining does not support partition_by_class")
+
+    cache = cache if cache is not None else ArtifactCache()
+
+    sample = instance_graph.sample(stratified, rate=parameters["sample_rate"], seed=parameters["sample_seed"])
+    members = list(sample.graph.subject_objects(RDF.type))
+    sampled_item_sets = partition_item_sets(item_sets, members)
+    logger.info("Mining sample of {} individuals and {} item sets".format(len({s for s, _ in members}),
+                                                                        len(sampled_item_sets)))
+
+    type_graph = Graph()
+    for s, ctype in members:
+        type_graph.add((s, RDF.type, ctype))
+
+    rule_base = mine(KnowledgeGraph(type_graph), ontology_graph, sampled_item_sets, parameters, deadline, closure,
+                     cache, cache.key_of("sample", key, parameters["sample_rate"], parameters["sample_seed"])
+                            if key is not None else None, pool)
+
+    population = {}
+    for s, ctype in instance_graph.graph.subject_objects(RDF.type):
+        population.setdefault(ctype, set()).add(s)
+
+    table = rule_base.table
+    if parameters["sample_verification"]:
+        table = verified(table, population, item_sets, parameters, pool)
+    else:
+        estimate(table, population, parameters["confidence_level"])
+    rule_base.table = table
+
+    rule_base.metadata["sample"] = {"rate": parameters["sample_rate"],
+                                    "seed": parameters["sample_seed"],
+                                    "individuals": len({s for s, _ in members}),
+                                    "verified": parameters["sample_verification"],
+                                    "confidence_level": None if parameters["sample_verification"]
+                                                        else parameters["confidence_level"]}
+
+    return rule_base
+
+def estimate(table, population={}, level=.95):
+    """ Add confidence intervals to the support and confidence of rules counted on a sample
+
+    :param table: a RuleTable instance with the counts of the sample
+    :param population: dictionary with the members of every class in the full graph
+    :param level: confidence level of the intervals
+
+    :updates: the support and confidence measures of table
+    :returns: none
+    """
+    n, a, ac = (table.records[name] for name in ("n", "a", "ac"))
+    members = np.array([len(population.get(table.terms[ctype], ())) for ctype in table.records["ctype"].tolist()],
+                       dtype=np.float64)
+
+    # the members with the antecedent in the full graph, as estimated from the sample
+    antecedent_members = np.maximum(a, np.round(members * ratio_of(a, n)))
+
+    table.measures["support"] = (ratio_of(a, n), a, n) + intervals_from_counts(a, n, members, level)
+    table.measures["confidence"] = (ratio_of(ac, a), ac, a) + intervals_from_counts(ac, a, antecedent_members, level)
+
+def verified(table, population={}, item_sets=[], parameters={}, pool=None):
+    """ Count rules again on the full graph, and keep those which meet the minima
+
+    :param table: a RuleTable instance with the counts of the sample
+    :param population: dictionary with the members of every class in the full graph
+    :param item_sets: list of ((p, o), item set) tuples of the full graph
+    :param parameters: dictionary with the parameters of a directive, including the executor
+    :param pool: a pool of workers as returned by pool_of(), which is left open; None to start one
+
+    :returns: a RuleTable instance with the counts of the full graph
+    """
+    # rules which rank equal on the full graph keep their rank on the sample, which, unlike the
+    # order of the runs of ranked rules of the workers, does not depend on how the work was batched
+    table = table.ranked(parameters["rank_by"])
+
+    rules = []
+    consequents = table.consequents.tolist()
+    for ctype, antecedent, offset, length in table.records[["ctype", "antecedent",
+                                                            "consequent_offset", "consequent_length"]].tolist():
+        rules.append((table.terms[ctype],
+                      table.items[antecedent],
+                      tuple(table.items[item] for item in consequents[offset:offset+length])))
+    logger.info("Verifying {} rules on the full graph".format(len(rules)))
+
+    index = ({ctype: frozenset(es) for ctype, es in population.items()}, dict(item_sets))
+    counts = {}
+    for _, dataset_counts in count_datasets([index], [rules], parameters, pool):
+        counts.update(dataset_counts)
+
+    full = np.array([counts[rule] for rule in rules], dtype=np.int64).reshape(-1, 4)
+    for i, name in enumerate(("n", "a", "c", "ac")):
+        table.records[name] = full[:, i]
+
+    accepted = (ratio_of(table.records["a"], table.records["n"]) >= parameters["minimal_support"]) &\
+               (ratio_of(table.records["ac"], table.records["a"]) >= parameters["minimal_confidence"])
+
+    return table.take(np.flatnonzero(accepted))
+
+if __name__ == "__main__":
+    print("Mining of semantic association rules on a stratified subsample")
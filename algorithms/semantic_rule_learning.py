@@ -53,9 +53,9 @@ def generate_semantic_association_rules(instance_graph=None, ontology_graph=None
             cbs_list = list(cbs)
             for i in range(len(cbs_list)):
                 rule = Rule(ctype, cbs_list[i][1], [pa for _, pa in cbs_list[:i]+cbs_list[i+1:]])
-                rules.add(IRule(rule, support_of(instance_graph, rule), confidence_of(instance_graph, rule)))
+                rules.add(IRule(rule, *measures_of(counts_of(instance_graph, rule))))
 
-    logger.info("Generated {} Semantic Association Rules".format(len(rules)))
+    logger.info("Generated {} Semantic Association Rules".format(rules.size()))
 
     return rules
 
@@ -315,7 +315,8 @@ def confidence_of(instance_graph, rule):
             if (s, p_1, o_1) not in instance_graph.graph:
                 break
 
-        number_of_rule_supporting_facts += 1
+        else:
+            number_of_rule_supporting_facts += 1
 
     if number_of_antecedent_supporting_facts > 0:
         confidence = number_of_rule_supporting_facts / number_of_antecedent_supporting_facts
@@ -324,5 +325,82 @@ def confidence_of(instance_graph, rule):
 
     return IRule.Measure(confidence, number_of_rule_supporting_facts, number_of_antecedent_supporting_facts)
 
+def counts_of(instance_graph, rule):
+    """ Count the facts supporting rule r given knowledge graph G in a single pass
+
+    :param instance_graph: a knowledge graph instance
+    :param rule: a semantic association rule as tuple (type, antecedent, consequent(s))
+
+    :returns: a (class, antecedent, consequent, rule) tuple with the number of supporting elements
+    """
+    p_0, o_0 = rule.antecedent  # antecedent
+
+    logger.debug("Counting rule support")
+    number_of_antecedent_supporting_facts = 0
+    number_of_consequent_supporting_facts = 0
+    number_of_rule_supporting_facts = 0
+    elements_of_type = frozenset(instance_graph.graph.subjects(RDF.type, rule.ctype))
+    for s in elements_of_type:
+        antecedent_holds = (s, p_0, o_0) in instance_graph.graph
+        if antecedent_holds:
+            number_of_antecedent_supporting_facts += 1
+
+        for p_1, o_1 in rule.consequent:  # consequent
+            if (s, p_1, o_1) not in instance_graph.graph:
+                break
+
+        else:
+            number_of_consequent_supporting_facts += 1
+            if antecedent_holds:
+                number_of_rule_supporting_facts += 1
+
+    return (len(elements_of_type),
+            number_of_antecedent_supporting_facts,
+            number_of_consequent_supporting_facts,
+            number_of_rule_supporting_facts)
+
+def evaluate_rules(instance_graph=None, rules=[], minimal_support=.0, minimal_confidence=.0):
+    """ Evaluate suggested rules given knowledge graph G on support and confidence
+
+    :param instance_graph: a knowledge graph instance
+    :param rules: iterable of Rule or IRule instances
+    :param minimal_support: only accept rules with a higher support
+    :param minimal_confidence: only accept rules with a higher confidence
+
+    :returns: a RuleBase instance with the accepted rules as IRules, counted in a single pass each
+    """
+    if instance_graph is None:
+        raise ValueError('Missing input values.')
+
+    logger.info("Starting rule evaluation (sup >= {}, conf >= {})".format(minimal_support,
+                                                                          minimal_confidence))
+    final_rule_set = RuleBase()
+    number_of_evaluated_rules = 0
+    for rule in rules:
+        rule = rule.rule if isinstance(rule, IRule) else rule
+        support, confidence, consequent_support = measures_of(counts_of(instance_graph, rule))
+        number_of_evaluated_rules += 1
+
+        if support.value >= minimal_support and\
+           confidence.value >= minimal_confidence:
+            final_rule_set.add(IRule(rule, support, confidence, consequent_support))
+
+    logger.info("Accepted {} of {} rules".format(final_rule_set.size(), number_of_evaluated_rules))
+
+    return final_rule_set
+
+def measures_of(counts):
+    """ Derive the support, confidence, and consequent support from rule counts
+
+    :param counts: a (class, antecedent, consequent, rule) tuple as returned by counts_of()
+
+    :returns: a (support, confidence, consequent support) tuple of measures
+    """
+    n, a, c, ac = counts
+
+    return (IRule.Measure(None, a, n),
+            IRule.Measure(None, ac, a),
+            IRule.Measure(None, c, n))
+
 if __name__ == "__main__":
     print("Functions for Semantic Rule Learning")
@@ -2,8 +2,14 @@
 
 import logging
 import multiprocessing
-from rdflib.namespace import RDF, RDFS
-from models.rule_base import IRule, Rule
+import numpy as np
+from models.encoded_graph import attach, attach_facts
+from models.cbs_store import items_of, row_type, table_of
+from models.rule_table import COUNTS, concatenate, pack, rank_keys, ratio_of
+from algorithms.interestingness import measures_from_counts
+from algorithms.semantic_rule_learning import measures_of
+from auxiliarly.worker_pool import resident
+from auxiliarly.pipeline import Batch
 
 
 """
@@ -15,6 +21,7 @@ Alterations:
     * LLC with broadest coverage is prefered.
     * Rules with more-than-one LLC are split.
     * Added all permutations of a CBS to form a rule, e.g. A -> B /\ C, B -> A /\ C, and C -> A /\ B.
+    * Optionally, context paths are collapsed into single (path, o) items of the sampled individuals.
 
 @Inbook{Barati2016,
  author="Barati, Molood and Bai, Quan and Liu, Qing",
@@ -32,112 +39,274 @@ Alterations:
 
 logger = logging.getLogger(__name__)
 
-def generate_semantic_association_rules(instance_graph, ontology_graph, cbs_sets, queue, rules, minimal_local_support=1.0):
+# encoded graph or facts this worker is attached to, by directory
+_attached = {}
+
+def attached_encoded_graph():
+    """ Return the encoded graph shared with the workers, attached to on first use
+
+    The directory of the encoded graph is read from the worker's resident inputs
+    ('encoded_graph'); a worker only stays attached to the graph of the latest run.
+
+    :returns: an EncodedGraph instance
+    """
+    return _attached_to(resident("encoded_graph"), attach)
+
+def attached_encoded_facts():
+    """ Return the encoded facts shared with the workers, attached to on first use
+
+    The directory of the encoded facts is read from the worker's resident inputs
+    ('encoded_facts'); attaching to an encoded graph later drops them.
+
+    :returns: an EncodedFacts instance
+    """
+    return _attached_to(resident("encoded_facts"), attach_facts)
+
+def _attached_to(directory, attach_to):
+    encoded = _attached.get(directory)
+    if encoded is None:
+        encoded = attach_to(directory)
+        _attached.clear()
+        _attached[directory] = encoded
+
+    return encoded
+
+def generate_semantic_association_rules(minimal_local_support=1.0, deadline=None, work=None):
     """ Generate semantic association rules from CBS
 
-    :param instance_graph: a knowledge graph instance
-    :param ontology_graph: a knowledge graph instance
-    :param cbs_sets: shared list of (CBS, similarity) tuples
-    :param queue: shared queue with slices from cbs_sets
-    :param rules: shared list of rules as tuples (class type, antecedent, consequent [with conjunctions])
+    Reads the encoded graph shared with the worker (see attached_encoded_graph()).
+
     :param minimal_local_support: skip rules that do not meet the minimal local support
+    :param deadline: a Deadline instance; the unfinished part of the work is returned once it has expired
+    :param work: a Batch of encoded CBS, as tuples of item IDs
 
-    :returns: None
+    :returns: a (rules, unfinished work) tuple, with the rules packed in a RuleTable without counts
     """
+    encoded_graph = attached_encoded_graph()
 
     pid = multiprocessing.current_process()
     logger.info("{} - Generating Semantic Association Rules (LS >= {})".format(pid, minimal_local_support))
-    while True:
-        work = queue.get()
-        if work is None:
-            break
-
-        for cbs, _ in cbs_sets[work]:
-            for ctype, (coverage, local_support) in _lowest_level_class(instance_graph, ontology_graph, cbs).items():
-                if local_support < minimal_local_support:
-                    continue
+    rules = []
+    for j, cbs in enumerate(work.items):
+        if deadline is not None and deadline.expired():
+            return (pack(rules), _remainder_of(work, j))
 
-                cbs_list = list(cbs)
-                for i in range(len(cbs_list)):
-                    rules.append(Rule(ctype, cbs_list[i][1], [pa for _, pa in cbs_list[:i]+cbs_list[i+1:]]))
+        rules.extend(rules_of_common_behaviour_set(encoded_graph, cbs, minimal_local_support))
 
     logger.info("{} - Generated {} Semantic Association Rules".format(pid, len(rules)))
+    return (pack(rules), [])
+
+def rules_of_common_behaviour_set(encoded_graph, cbs, minimal_local_support=1.0):
+    """ Generate the semantic association rules of one CBS
 
-def generate_semantic_item_sets(instance_graph):
-    """ Generate semantic item sets from a knowledge graph
+    :param encoded_graph: an EncodedGraph instance, or any index with the same accessors
+    :param cbs: a CBS as tuple of item IDs
+    :param minimal_local_support: skip rules that do not meet the minimal local support
+
+    :returns: list of (class ID, antecedent ID, consequent IDs) tuples
+    """
+    rules = []
+    for ctype, (coverage, local_support) in _lowest_level_class(encoded_graph, cbs).items():
+        if local_support < minimal_local_support:
+            continue
+
+        for i in range(len(cbs)):
+            rules.append((ctype, cbs[i], cbs[:i]+cbs[i+1:]))
+
+    return rules
+
+def generate_semantic_item_set_shard(work=None):
+    """ Generate the postings of the semantic item sets of a range of subjects
+
+    Reads the encoded facts shared with the worker (see attached_encoded_facts()), of which
+    only the rows of the subjects in the range are touched.
 
-    :param instance_graph: shared knowledge graph instance as list
+    :param work: range of subject IDs
 
-    :returns: dictionary with (p, o) pairs as keys and set of matching s as value
+    :returns: postings as (predicate IDs, object IDs, subject IDs) tuple of arrays, sorted on all three
     """
+    encoded_facts = attached_encoded_facts()
 
     pid = multiprocessing.current_process()
-    logger.info("{} - Generating Semantic Item Set".format(pid))
-    d = {}
-    for s, p, o in instance_graph:
-        k = (p, o)
+    logger.info("{} - Generating Semantic Item Sets of subjects {} to {}".format(pid, work.start, work.stop))
+    positions, predicates, objects = encoded_facts.facts_of(np.arange(work.start, work.stop))
+    subjects = positions + work.start
 
-        if k in d.keys():
-            d[k].add(s)
-            continue
+    order = np.lexsort((subjects, objects, predicates))
+    logger.info("{} - Generated the postings of {} facts".format(pid, len(order)))
+    return (predicates[order], objects[order], subjects[order])
+
+def generate_semantic_path_item_set_shard(paths=[], work=None):
+    """ Generate the postings of the semantic item sets over context paths of a batch of individuals
+
+    Reads the encoded facts shared with the worker (see attached_encoded_facts()). Every
+    path (p_0, ..., p_n) is followed from the rows of the individuals to those of the nodes
+    on it, and collapsed into a single item (path, o_n) of the individual it starts at. No
+    items are generated for the intermediate nodes, unless they are individuals themselves.
+
+    :param paths: context paths as tuples of predicate IDs
+    :param work: a Batch of the subject IDs of individuals
+
+    :returns: postings as (path positions, object IDs, subject IDs) tuple of arrays, sorted on all three
+    """
+    encoded_facts = attached_encoded_facts()
+    n = encoded_facts.number_of_terms()
+
+    pid = multiprocessing.current_process()
+    logger.info("{} - Generating Semantic Item Sets over {} paths of {} individuals".format(pid, len(paths), len(work)))
+    individuals = np.array(work.items, dtype=np.int64)
+    postings = []
+    for i, path in enumerate(paths):
+        origins, nodes = np.arange(len(individuals)), individuals
+        for p in path:
+            positions, predicates, objects = encoded_facts.facts_of(nodes)
+            matches = predicates == p
+
+            # a node counts once per individual, however many ways lead to it
+            pairs = np.unique(origins[positions[matches]] * n + objects[matches])
+            origins, nodes = pairs // n, pairs % n
+
+        postings.append((np.full(len(nodes), i, dtype=np.int64), nodes, individuals[origins]))
+
+    predicates, objects, subjects = (np.concatenate([posting[k] for posting in postings] +
+                                                    [np.zeros(0, dtype=np.int64)]) for k in range(3))
+    order = np.lexsort((subjects, objects, predicates))
+    logger.info("{} - Generated the postings of {} paths".format(pid, len(order)))
+    return (predicates[order], objects[order], subjects[order])
+
+def merge_semantic_item_set_shards(shards):
+    """ Merge the postings of disjoint shards of subjects into posting lists
+
+    :param shards: postings as (predicate IDs or path positions, object IDs, subject IDs) tuples of arrays, one per shard
+
+    :returns: a (items, offsets, subjects) tuple of arrays, with the (predicate ID or path position, object ID) of
+              every item in sorted order, and the sorted subject IDs of item i at subjects[offsets[i]:offsets[i+1]]
+    """
+    predicates, objects, subjects = (np.concatenate([shard[k] for shard in shards] + [np.zeros(0, dtype=np.int64)])
+                                     for k in range(3))
+    order = np.lexsort((subjects, objects, predicates))
+    predicates, objects, subjects = predicates[order], objects[order], subjects[order]
+
+    # every item starts where its predicate or object differs from that of the posting before
+    starts = np.flatnonzero(np.diff(predicates, prepend=-1) | np.diff(objects, prepend=-1))
+    offsets = np.append(starts, len(subjects))
+
+    return (np.stack([predicates[starts], objects[starts]], axis=1), offsets, subjects)
+
+def decode_item_sets(posting_lists, encoded_facts, predicates=None):
+    """ Decode posting lists into semantic item sets
 
-        d[k] = {s}
+    :param posting_lists: a (items, offsets, subjects) tuple as returned by merge_semantic_item_set_shards()
+    :param encoded_facts: the EncodedFacts instance holding the term dictionary
+    :param predicates: the predicate or SequencePath of every path position, for items over paths; None otherwise
 
-    logger.info("{} - Generated {} Semantic Item Sets".format(pid, len(d)))
-    return d
+    :returns: dictionary with (p, o) pairs as keys and frozenset of matching s as value, in the order of the lists
+    """
+    items, offsets, subjects = posting_lists
+    predicate_of = encoded_facts.term_of if predicates is None else predicates.__getitem__
+    subjects = [encoded_facts.term_of(s) for s in subjects.tolist()]
+    offsets = offsets.tolist()
+
+    return {(predicate_of(p), encoded_facts.term_of(o)): frozenset(subjects[offsets[i]:offsets[i+1]])
+            for i, (p, o) in enumerate(items.tolist())}
 
-def generate_common_behaviour_sets(item_sets, cb_sets, queue, similarity_threshold=.75):
+def generate_common_behaviour_sets(similarity_threshold=.75, deadline=None, work=None):
     """ Generate Common Behaviour Sets (CBS) from Semantic Item Sets
 
-    :param item_sets: shared dictionary with (p, o)-pairs as key and item sets as value
-    :param cb_sets: shared list of tuples (CBS, s), with s being the similarity
-    :param queue: shared queue with slices from item_sets
+    Reads the encoded graph shared with the worker (see attached_encoded_graph()). The
+    intersections of an item set with all later item sets are counted at once from the
+    items of its elements, rather than pair by pair.
+
     :param similarity_threshold: only generalize if the similarity exceeds this value
+    :param deadline: a Deadline instance; the unfinished part of the work is returned once it has expired
+    :param work: range of item IDs to focus on
 
-    :returns: None
+    :returns: a (pairs, unfinished work) tuple, with pairs as (item ID, item ID, similarity) tuples
     """
+    encoded_graph = attached_encoded_graph()
 
     pid = multiprocessing.current_process()
     logger.info("{} - Generating Common Behaviour Sets (sim >= {})".format(pid, similarity_threshold))
 
-    while True:
-        work = queue.get()
-        if work is None:
+    # if similarity_threshold <= 0, then (n*(n-1))/2 cb sets are generated
+    pairs = []
+    n = encoded_graph.number_of_items()
+    sizes = encoded_graph.posting_sizes()
+    for j, i in enumerate(work):
+        if i >= n:
             break
+        if deadline is not None and deadline.expired():
+            return (pairs, _remainder_of(work, j))
 
-        # if similarity_threshold <= 0, then (n*(n-1))/2 cb sets are generated
-        keys = list(item_sets.keys())
-        n = len(keys)
-        for i in work:
-            if i >= n:
-                break
-
-            pa_0 = keys[i]
-            es_0 = frozenset(item_sets[pa_0])
-            for pa_1 in keys[i+1:]:
-                es_1 = frozenset(item_sets[pa_1])
-                similarity = _similarity_of(es_0, es_1)
-                if similarity < similarity_threshold:
-                    continue
+        co_items = encoded_graph.items_of(encoded_graph.postings(i))
+        intersections = np.bincount(co_items[co_items > i] - (i+1), minlength=n-i-1)
+        unions = sizes[i] + sizes[i+1:] - intersections
+        similarities = np.divide(intersections, unions, out=np.zeros(n-i-1), where=unions > 0)
+        for k in np.nonzero(similarities >= similarity_threshold)[0]:
+            pairs.append((i, i+1+int(k), float(similarities[k])))
+
+    logger.info("{} - Generated {} Common Behaviour Sets".format(pid, len(pairs)))
+    return (pairs, [])
+
+def cost_of_item_sets(encoded_graph):
+    """ Estimate the cost of generating the CBS of each item set, for scheduling
+
+    :param encoded_graph: an EncodedGraph instance
+
+    :returns: an array with the number of co-occurring items to count plus the number of later item sets
+    """
+    n = encoded_graph.number_of_items()
+
+    return encoded_graph.co_item_counts() + (n - np.arange(n) - 1)
 
-                cb_sets.append((frozenset({
-                                        (es_0, pa_0),
-                                        (es_1, pa_1)}),
-                                similarity))
+def common_behaviour_sets_of(pairs, item_sets):
+    """ Build CBS from pairs of item IDs
 
+    :param pairs: list of (item ID, item ID, similarity) tuples
+    :param item_sets: list of ((p, o), item set) tuples the IDs refer to
 
-    logger.info("{} - Generated {} Common Behaviour Sets".format(pid, len(cb_sets)))
+    :returns: a list of tuples (CBS, s), with s being the similarity
+    """
+    return [(frozenset({(item_sets[i][1], item_sets[i][0]),
+                        (item_sets[j][1], item_sets[j][0])}),
+             similarity) for i, j, similarity in pairs]
+
+def decode_common_behaviour_sets(rows, item_sets):
+    """ Build CBS from encoded rows, as kept by a CBSStore
+
+    :param rows: array of encoded CBS
+    :param item_sets: list of ((p, o), item set) tuples the IDs refer to
+
+    :returns: a list of tuples (CBS, s), with s being the similarity
+    """
+    return [(frozenset((item_sets[i][1], item_sets[i][0]) for i in items if i >= 0), similarity)
+            for items, similarity in zip(rows["items"].tolist(), rows["similarity"].tolist())]
+
+def encode_common_behaviour_sets(cbs_sets, encoded_graph):
+    """ Encode CBS as tuples of item IDs
+
+    The IDs are sorted, rather than in the order in which the frozenset of a CBS happens to
+    iterate, so that the rules generated from it do not depend on the process.
+
+    :param cbs_sets: a list of tuples (CBS, s), with s being the similarity
+    :param encoded_graph: the EncodedGraph instance holding the item sets
 
-def extend_common_behaviour_sets(cbs_list, similarity_threshold=.75, work=None):
+    :returns: a list of tuples of item IDs
+    """
+    return [tuple(sorted(encoded_graph.ids_of_items(pa for _, pa in cbs))) for cbs, _ in cbs_sets]
+
+def extend_common_behaviour_sets(similarity_threshold=.75, deadline=None, work=None):
     """ Recursively extend Common Behaviour Sets (CBS)
 
-    :param cbs_list: shared list of tuples tuples (CBS, s), with s being the similarity
+    Reads the list of (CBS, similarity) tuples to extend from the worker's resident inputs ('cbs_list').
+
     :param similarity_threshold: only generalize if the similarity exceeds this value
+    :param deadline: a Deadline instance; stop extending once it has expired
     :param work: range of cbs_list to focus on
 
     :returns: list of additions CB sets
     """
-
+    cbs_list = resident("cbs_list")
     if len(cbs_list) <= 1:
         return []
 
@@ -148,6 +317,8 @@ def extend_common_behaviour_sets(cbs_list, similarity_threshold=.75, work=None):
     for i in work:
         if i >= n:
             break
+        if deadline is not None and deadline.expired():
+            break
 
         cbs_0, _ = cbs_list[i]
         es_0 = frozenset.union(*[es for es, _ in cbs_0])
@@ -162,6 +333,111 @@ def extend_common_behaviour_sets(cbs_list, similarity_threshold=.75, work=None):
     logger.info("{} - Extended with {} Common Behaviour Sets".format(pid, len(extended_cbs_list)))
     return extended_cbs_list
 
+def extend_encoded_common_behaviour_sets(similarity_threshold=.75, deadline=None, work=None):
+    """ Recursively extend encoded Common Behaviour Sets (CBS)
+
+    As extend_common_behaviour_sets(), but on the memory-mapped table of a CBSStore, whose
+    directory is read from the worker's resident inputs ('cbs_table'), next to the encoded
+    graph. The table is read a block at a time, so it need not fit in memory.
+
+    :param similarity_threshold: only generalize if the similarity exceeds this value
+    :param deadline: a Deadline instance; stop extending once it has expired
+    :param work: range of table rows to focus on
+
+    :returns: array of encoded additional CBS, twice as wide as the rows of the table
+    """
+    encoded_graph = attached_encoded_graph()
+    table = table_of(resident("cbs_table"))
+    width = table.dtype["items"].shape[0]
+    if len(table) <= 1:
+        return np.zeros(0, dtype=row_type(2 * width))
+
+    pid = multiprocessing.current_process()
+    logger.info("{} - Extending Common Behaviour Sets (sim >= {})".format(pid, similarity_threshold))
+    extended_cbs_list = []
+    n = len(table)
+    block_size = max(1, 2**20 // table.dtype.itemsize)
+    in_es_0 = np.zeros(encoded_graph.number_of_terms(), dtype=bool)
+    for i in work:
+        if i >= n:
+            break
+        if deadline is not None and deadline.expired():
+            break
+
+        items_0 = items_of(table[i])
+        es_0 = np.unique(encoded_graph.postings_of(items_0))
+        in_es_0[es_0] = True
+        for start in range(i+1, n, block_size):
+            block = table[start:start+block_size]
+            for items_1 in block["items"]:
+                items_1 = items_1[items_1 >= 0]
+                es_1 = np.unique(encoded_graph.postings_of(items_1))
+                intersection = np.count_nonzero(in_es_0[es_1])
+                union = len(es_0) + len(es_1) - intersection
+                similarity = intersection / union if union > 0 else 0.0
+                if similarity < similarity_threshold:
+                    continue
+
+                extended_cbs_list.append((np.union1d(items_0, items_1), similarity))
+        in_es_0[es_0] = False
+
+    rows = np.zeros(len(extended_cbs_list), dtype=row_type(2 * width))
+    rows["items"] = -1
+    for k, (items, similarity) in enumerate(extended_cbs_list):
+        rows["items"][k, :len(items)] = items
+        rows["similarity"][k] = similarity
+
+    logger.info("{} - Extended with {} Common Behaviour Sets".format(pid, len(rows)))
+    return rows
+
+def order_by_promise(cbs_sets):
+    """ Order CBS on how promising they are to yield strong rules
+
+    :param cbs_sets: list of (CBS, similarity) tuples
+
+    :returns: a new list ordered by decreasing similarity and number of elements
+    """
+    return sorted(cbs_sets,
+                  key=lambda cbs_tuple: (cbs_tuple[1], len(frozenset.union(*[es for es, _ in cbs_tuple[0]]))),
+                  reverse=True)
+
+def coverage_of(slices, unfinished, n):
+    """ Determine how much of the planned work has been processed
+
+    :param slices: list of planned slices or ranges
+    :param unfinished: list of unfinished slices or ranges
+    :param n: number of items that were sliced
+
+    :returns: a (processed, total) tuple
+    """
+    total = sum(_size_of(work, n) for work in slices)
+    remaining = sum(_size_of(work, n) for work in unfinished)
+
+    return (total - remaining, total)
+
+def _size_of(work, n):
+    if type(work) is slice:
+        return len(range(*work.indices(n)))
+    if type(work) is Batch:
+        return len(work)
+
+    return len(range(max(0, min(work.start, n)), max(0, min(work.stop, n))))
+
+def _remainder_of(work, offset=0):
+    """ Return the unfinished part of the work
+
+    :param work: the slice, range, or Batch currently being processed
+    :param offset: number of items of work already processed
+
+    :returns: a list holding the remaining slice, range, or Batch
+    """
+    if type(work) is slice:
+        return [slice(work.start + offset, work.stop)]
+    if type(work) is Batch:
+        return [work.rest(offset)]
+
+    return [range(work.start + offset, work.stop)]
+
 def _similarity_of(*list_of_element_sets):
     """ Calculate similarity between element sets
 
@@ -176,39 +452,31 @@ def _similarity_of(*list_of_element_sets):
     else:
         return 0.0
 
-def _class_hierarchy_branches(instance_graph, ontology_graph, cbs):
+def _class_hierarchy_branches(encoded_graph, cbs):
     """ Generate class hierarchy branch of all ESs in a CBS
 
-    :param instance_graph: a knowledge graph instance
-    :param ontology_graph: a knowledge graph instance
-    :param cbs: a CBS as a set
+    :param encoded_graph: an EncodedGraph instance
+    :param cbs: a CBS as tuple of item IDs
 
-    :returns: a dictionary with elements as keys and branches as (nested) lists
+    :returns: a dictionary with elements as keys and lists of branches (as sets) as values
     """
     pid = multiprocessing.current_process()
     logger.debug("{} - Determining class hierarchy branches".format(pid))
     element_branches = {}
-    for es, _ in cbs:
-        for e in es:
+    for item in cbs:
+        for e in encoded_graph.postings(item).tolist():
             if e in element_branches.keys():
                 continue
 
-            branch = []
-            for t in instance_graph.graph.objects(e, RDF.type):
-                subbranch = [t]
-                _branch_traversal(ontology_graph, t, subbranch)
-
-                branch.append(subbranch)
-
-            element_branches[e] = branch
+            element_branches[e] = [encoded_graph.branch_of(t) for t in encoded_graph.types_of(e).tolist()]
 
     return element_branches
 
-def _coverage_per_class(instance_graph, element_branches):
+def _coverage_per_class(encoded_graph, element_branches):
     """ Determine instance coverage of class types
 
-    :param instance_graph: a knowledge graph instance
-    :param cbs: a dictionary with elements as keys and branches as (nested) lists
+    :param encoded_graph: an EncodedGraph instance
+    :param element_branches: a dictionary with elements as keys and lists of branches as values
 
     :returns: a dictionary with class types as keys and (instances, local coverage) tuples as items
     """
@@ -216,12 +484,12 @@ def _coverage_per_class(instance_graph, element_branches):
     logger.debug("{} - Determining coverage per class".format(pid))
     coverage = {}
     for e in element_branches.keys():
-        for ctype in instance_graph.graph.objects(e, RDF.type):
+        for ctype in encoded_graph.types_of(e).tolist():
             if ctype in coverage.keys():
                 continue
             coverage[ctype] = ({e}, 0.0)
             for f in element_branches.keys():
-                if e is f:
+                if e == f:
                     continue
                 for branch in element_branches[f]:
                     if ctype in branch:  # ignore multiple inheritence
@@ -230,28 +498,28 @@ def _coverage_per_class(instance_graph, element_branches):
 
     return coverage
 
-def _lowest_level_class(instance_graph=None, ontology_graph=None, cbs=frozenset()):
+def _lowest_level_class(encoded_graph=None, cbs=()):
     """ Determine the Lower Level Classes of the SE's in CBS
 
-    :param instance_graph: a knowledge graph instance
-    :param ontology_graph: a knowledge graph instance
-    :param cbs: a CBS (set of (es, pa) sets)
+    :param encoded_graph: an EncodedGraph instance
+    :param cbs: a CBS as tuple of item IDs
 
     :returns: a dictionary holding class:({covered elements}, coverage support) items
     """
     # determing class hierarchy for elements in cbs
-    element_branches = _class_hierarchy_branches(instance_graph, ontology_graph, cbs)
+    element_branches = _class_hierarchy_branches(encoded_graph, cbs)
     number_of_elements = len(element_branches)
 
     # determine coverage per class
-    coverage = _coverage_per_class(instance_graph, element_branches)
+    coverage = _coverage_per_class(encoded_graph, element_branches)
 
     pid = multiprocessing.current_process()
     logger.debug("{} - Filtering LLC coverage".format(pid))
-    sorted_keys = sorted(coverage, key=lambda k: len(coverage[k][0]), reverse=True)
+    # ties go to the class which comes first, rather than the one which happened to be met first
+    sorted_keys = sorted(coverage, key=lambda k: (-len(coverage[k][0]), encoded_graph.order_of(k)))
     for i in range(1, len(sorted_keys)):
         # prever broader coverage
-        coverage[sorted_keys[i]][0].difference_update(*[coverage[sorted_keys[j]][0] for j in range(i)])
+        coverage[sorted_keys[i]][0].difference_update(*[coverage[k][0] for k in sorted_keys[:i] if k in coverage.keys()])
         if len(coverage[sorted_keys[i]][0]) <= 0:
             del coverage[sorted_keys[i]]
             continue
@@ -264,114 +532,143 @@ def _lowest_level_class(instance_graph=None, ontology_graph=None, cbs=frozenset(
 
     return coverage
 
-def _branch_traversal(ontology_graph, ctype, branch):
-    """ Determine the upward class hierarchy branch for each class
-
-    :param ontology_graph: a knowledge graph instance
-    :param ctype: the class type to start from
-    :param branch: a list representing the branch, multiple inheritence results in nested lists
-
-    :updates: branch
-    :returns: none
-    """
-    sclasses = list(ontology_graph.graph.objects(ctype, RDFS.subClassOf))
-    if len(sclasses) == 1:
-        sclass = sclasses[0]
-        branch.append(sclass)
-        _branch_traversal(ontology_graph, sclass, branch)
-    elif len(sclasses) >= 2:
-        for sclass in sclasses:
-            subbranch = [sclass]
-            _branch_traversal(ontology_graph, sclass, subbranch)
-            branch.append(subbranch)
-
-def evaluate_rules(instance_graph, rules, queue, final_rule_set, minimal_support, minimal_confidence):
+def evaluate_rules(minimal_support, minimal_confidence, rank_by=None, deadline=None, work=None):
     """ Evaluate suggested rule r given knowledge graph G on support and confidence
 
-    :param instance_graph: a knowledge graph instance
-    :param rules: shared list of semantic association rules as tuple (type, antecedent, consequent(s))
-    :param queue: slice of rules to focus on
-    :param final_rule_set: shared list of accepted rules
+    Reads the encoded graph shared with the worker (see attached_encoded_graph()). Counts are
+    taken from the item sets and class members.
+
     :param minimal_support: only accept rules with a higher support
     :param minimal_confidence: only accept rules with a higher confidence
+    :param rank_by: measures to rank the accepted rules on, best first, so that the parent only has to merge them
+    :param deadline: a Deadline instance; the unfinished part of the work is returned once it has expired
+    :param work: a Batch holding a RuleTable without counts
 
-    :returns: none
+    :returns: a (accepted rules, unfinished work) tuple, with the rules as COUNTS array of their index in the batch and counts
     """
+    encoded_graph = attached_encoded_graph()
+    rules = work.items
+
     pid = multiprocessing.current_process()
     logger.info("{} - Starting rule evaluation (sup >= {}, conf >= {}".format(pid, 
                                                                               minimal_support,
                                                                               minimal_confidence))
-    while True:
-        work = queue.get()
-        if work is None:
-            break
+    final_rule_set = []
+    for k in range(len(rules)):
+        if deadline is not None and deadline.expired():
+            return (_ranked(final_rule_set, rank_by), _remainder_of(work, k))
+
+        counts = encoded_counts_of(encoded_graph, rules.rule_of(k))
+        support, confidence, _ = measures_of(counts)
 
-        for rule in rules[work]:
-            support = support_of(instance_graph, rule)
-            confidence = confidence_of(instance_graph, rule)
+        if support.value >= minimal_support and\
+           confidence.value >= minimal_confidence:
+            final_rule_set.append((k,) + counts)
 
-            if support.value >= minimal_support and\
-               confidence.value >= minimal_confidence:
-                final_rule_set.append(IRule(rule, support, confidence))
+    return (_ranked(final_rule_set, rank_by), [])
 
-def support_of(instance_graph, rule):
-    """ Calculate the support for rule r given knowledge graph G
+def _ranked(accepted, rank_by=None):
+    """ Pack accepted rules and rank them on the given measures, best first
 
-    :param instance_graph: a knowledge graph instance
-    :param rule: a semantic association rule as tuple (type, antecedent, consequent(s))
+    P-values are ranked before correction for multiple testing, which all corrections
+    leave in the same order.
 
-    :returns: support value between 0 and 1
+    :param accepted: list of (rule index, counts) tuples
+    :param rank_by: measure name or tuple of names; None to keep the rules in order
+
+    :returns: a COUNTS array
     """
-    p, o = rule.antecedent  # antecedent
+    accepted = np.array(accepted, dtype=COUNTS)
+    if rank_by is None or len(accepted) <= 0:
+        return accepted
 
-    pid = multiprocessing.current_process()
-    logger.debug("{} - Calculating support".format(pid))
-    number_of_supporting_facts = 0
-    elements_of_type = frozenset(instance_graph.graph.subjects(RDF.type, rule.ctype))
-    for s in elements_of_type:
-        if (s, p, o) in instance_graph.graph:
-            number_of_supporting_facts += 1
-
-    if len(elements_of_type) > 0:
-        support = number_of_supporting_facts / len(elements_of_type)
-    else:
-        support = 0.0
+    n, a, c, ac = (accepted[name].astype(np.float64) for name in ("n", "a", "c", "ac"))
+    lift, conviction, leverage, p_values = measures_from_counts(n, a, c, ac)
+    values = {"support": ratio_of(accepted["a"], accepted["n"]),
+              "confidence": ratio_of(accepted["ac"], accepted["a"]),
+              "lift": lift[0],
+              "conviction": conviction[0],
+              "leverage": leverage[0],
+              "p_value": p_values}
 
-    return IRule.Measure(support, number_of_supporting_facts, len(elements_of_type))
+    keys = rank_keys(values.get, rank_by)
+    return accepted[np.lexsort(keys[::-1])]
 
-def confidence_of(instance_graph, rule):
-    """ Calculate the confidence for rule r given knowledge graph G
+def encoded_counts_of(encoded_graph, rule):
+    """ Count the elements supporting an encoded rule
 
-    :param instance_graph: a knowledge graph instance
-    :param rule: a semantic association rule as tuple (type, antecedent, consequent(s))
+    :param encoded_graph: an EncodedGraph instance
+    :param rule: an encoded rule as (class ID, antecedent ID, consequent IDs)
 
-    :returns: confidence value between 0 and 1
+    :returns: a (class, antecedent, consequent, rule) tuple with the number of supporting elements
     """
-    p_0, o_0 = rule.antecedent  # antecedent
+    ctype, antecedent, consequent = rule
 
-    pid = multiprocessing.current_process()
-    logger.debug("{} - Calculating confidence".format(pid))
-    number_of_antecedent_supporting_facts = 0
-    number_of_rule_supporting_facts = 0
-    elements_of_type = frozenset(instance_graph.graph.subjects(RDF.type, rule.ctype))
-    for s in elements_of_type:
-        if (s, p_0, o_0) not in instance_graph.graph:
-            continue
+    elements_of_type = encoded_graph.members_of(ctype)
+    antecedent_elements = np.intersect1d(elements_of_type, encoded_graph.postings(antecedent), assume_unique=True)
+    consequent_elements = elements_of_type
+    for item in consequent:
+        consequent_elements = np.intersect1d(consequent_elements, encoded_graph.postings(item), assume_unique=True)
+    rule_elements = np.intersect1d(antecedent_elements, consequent_elements, assume_unique=True)
 
-        number_of_antecedent_supporting_facts += 1
-        for p_1, o_1 in rule.consequent:  # consequent
-            if (s, p_1, o_1) not in instance_graph.graph:
-                break
+    return (len(elements_of_type),
+            len(antecedent_elements),
+            len(consequent_elements),
+            len(rule_elements))
 
-        else:
-            number_of_rule_supporting_facts += 1
+def count_rules(work=None):
+    """ Count the elements supporting rules on one of the resident datasets
 
-    if number_of_antecedent_supporting_facts > 0:
-        confidence = number_of_rule_supporting_facts / number_of_antecedent_supporting_facts
-    else:
-        confidence = 0.0
+    Reads the datasets from the worker's resident inputs ('datasets'), each as a tuple of
+    dictionaries with the members per class, and the item sets per (p, o) pair. Counts are
+    taken as encoded_counts_of() takes them.
+
+    :param work: a (dataset number, offset, rules) tuple, with rules as (class, antecedent, consequent items) tuples
+
+    :returns: a (dataset number, offset, counts) tuple, with a (class, antecedent, consequent, rule) tuple per rule
+    """
+    k, offset, rules = work
+    members, item_sets = resident("datasets")[k]
+
+    counts = []
+    for ctype, antecedent, consequent in rules:
+        elements_of_type = members.get(ctype, frozenset())
+        antecedent_elements = elements_of_type & item_sets.get(antecedent, frozenset())
+        consequent_elements = elements_of_type
+        for item in consequent:
+            consequent_elements = consequent_elements & item_sets.get(item, frozenset())
+
+        counts.append((len(elements_of_type),
+                       len(antecedent_elements),
+                       len(consequent_elements),
+                       len(antecedent_elements & consequent_elements)))
+
+    return (k, offset, counts)
+
+def accepted_rules_of(batch, counts, ranked_by=None):
+    """ Keep the accepted rules of an evaluated batch
+
+    :param batch: the Batch of rules as passed to evaluate_rules()
+    :param counts: the COUNTS array returned for it
+    :param ranked_by: measures on which evaluate_rules() ranked the counts, if any
+
+    :returns: a RuleTable instance with only the accepted rules and their counts
+    """
+    return batch.items.with_counts([counts], ranked_by)
+
+def rule_table_of(tables, encoded_graph):
+    """ Assemble the accepted rules of all batches into one RuleTable
+
+    :param tables: list of RuleTable instances as returned by accepted_rules_of()
+    :param encoded_graph: the EncodedGraph instance holding the term dictionary
+
+    :returns: a RuleTable instance with the accepted rules, from which IRules can be built
+    """
+    table = concatenate(tables)
+    table.terms = encoded_graph.terms
+    table.items = encoded_graph.items
 
-    return IRule.Measure(confidence, number_of_rule_supporting_facts, number_of_antecedent_supporting_facts)
+    return table
 
 if __name__ == "__main__":
     print("Functions for Semantic Rule Learning")
@@ -0,0 +1,164 @@
+#!/usr/bin/python3
+
+import logging
+from collections import OrderedDict
+from rdflib.namespace import RDF
+from auxiliarly.lossy_counter import LossyCounter
+from models.encoded_graph import term_key
+from models.rule_base import RuleBase
+from models.rule_table import pack
+
+
+"""
+Approximate mining of semantic association rules from an unbounded stream of facts, without
+holding the graph.
+
+The facts of a subject make up its transaction: the (p, o) items it has, and the classes
+it is a member of. Only a window of the most recently seen subjects is kept open; once a
+subject falls out of the window, its transaction is counted, per class of the subject, as
+occurrences of its items and of every pair of its items. A subject whose facts come back
+after it fell out of the window starts a new transaction, so the stream should be grouped
+by subject within the window, as dumps usually are.
+
+Items and pairs are counted by lossy counting, so that memory stays bounded however long
+the stream runs; class members are counted exactly. Every pair of items yields the rules
+(C, a -> [b]) and (C, b -> [a]), with counts as the mining engine gathers them. These
+counts are at most error * N below the true counts after N transactions; a rule is kept
+if it may meet the minimal support and confidence within that bound, so no rule which
+meets them and occurs in more than error * N transactions is missed.
+
+Unlike the mining engine, rules are not restricted to the lowest-level class of similar
+item sets, and consequents hold a single item.
+"""
+
+class StreamMiner():
+    """ Approximate rule miner which takes facts one at a time """
+    error = None
+    window = None
+
+    def __init__(self, error=.001, window=1000, minimal_support=0.0, minimal_confidence=0.0, interval=None,
+                 emit=None):
+        """ Start mining an empty stream
+
+        :param error: the largest undercount of items and pairs, as fraction of the number of transactions
+        :param window: number of subjects whose transactions are kept open
+        :param minimal_support: only emit rules which may have a higher support
+        :param minimal_confidence: only emit rules which may have a higher confidence
+        :param interval: number of transactions after which the rules are emitted; None for only at the end
+        :param emit: function to call with a RuleBase instance every interval
+        """
+        self.logger = logging.getLogger(__name__)
+        self.error = error
+        self.window = window
+        self.minimal_support = minimal_support
+        self.minimal_confidence = minimal_confidence
+        self.interval = interval
+        self.emit = emit
+        self.emitted = None  # number of transactions at the last emission
+
+        self.transactions = OrderedDict()  # subject -> (items, classes), least recently seen first
+        self.members = {}  # class -> number of members
+        self.items = LossyCounter(error)  # (class, item) -> number of members with item
+        self.pairs = LossyCounter(error)  # (class, item, item) -> number of members with both items
+
+    ### Accessors ###
+
+    def number_of_transactions(self):
+        return self.items.n
+
+    def rule_base(self):
+        """ Return the rules of all closed transactions
+
+        :returns: a RuleBase instance with the rules as pending RuleTable, and the error bound as metadata
+        """
+        bound = self.items.bound()
+        classes = sorted(self.members.keys(), key=term_key)
+        items = sorted({item for _, a, b in self.pairs.keys() for item in (a, b)},
+                       key=lambda item: (term_key(item[0]), term_key(item[1])))
+        class_ids = {ctype: i for i, ctype in enumerate(classes)}
+        item_ids = {item: i for i, item in enumerate(items)}
+
+        rules = []
+        counts = []
+        for ctype, a, b in sorted(self.pairs.keys(), key=lambda key: (class_ids[key[0]],
+                                                                       item_ids[key[1]],
+                                                                       item_ids[key[2]])):
+            n = self.members[ctype]
+            ac = self.pairs.count_of((ctype, a, b))
+            for antecedent, consequent in ((a, b), (b, a)):
+                # lossy counts of items and pairs are taken at different times, so may disagree
+                a_count = min(n, max(ac, self.items.count_of((ctype, antecedent))))
+                c_count = min(n, max(ac, self.items.count_of((ctype, consequent))))
+                if n <= 0 or (a_count + bound) / n < self.minimal_support or\
+                   (ac + bound) / max(1, a_count) < self.minimal_confidence:
+                    continue
+
+                rules.append((class_ids[ctype], item_ids[antecedent], (item_ids[consequent],)))
+                counts.append((n, a_count, c_count, ac))
+
+        table = pack(rules)
+        for k, name in enumerate(("n", "a", "c", "ac")):
+            table.records[name] = [c[k] for c in counts]
+        table.terms = classes
+        table.items = items
+
+        rule_base = RuleBase(table=table)
+        rule_base.metadata["transactions"] = self.number_of_transactions()
+        rule_base.metadata["open_transactions"] = len(self.transactions)
+        rule_base.metadata["error"] = self.error
+        rule_base.metadata["error_bound"] = bound
+        rule_base.metadata["complete"] = False
+
+        return rule_base
+
+    ### Operators ###
+
+    def triple(self, s, p, o):
+        """ Take a fact, as sink of readers.rdf.stream() """
+        self.add(s, p, o)
+
+    def add(self, s, p, o):
+        """ Take a fact, and count the transaction which falls out of the window, if any
+
+        :returns: none
+        """
+        if s in self.transactions.keys():
+            self.transactions.move_to_end(s)
+        else:
+            while len(self.transactions) >= self.window:
+                self._close(*self.transactions.popitem(last=False))
+            self.transactions[s] = (set(), set())
+
+        items, classes = self.transactions[s]
+        items.add((p, o))
+        if p == RDF.type:
+            classes.add(o)
+
+    def flush(self):
+        """ Count all open transactions, as at the end of the stream
+
+        :returns: none
+        """
+        while len(self.transactions) > 0:
+            self._close(*self.transactions.popitem(last=False))
+
+    def _close(self, s, transaction):
+        items, classes = transaction
+        items = sorted(items, key=lambda item: (term_key(item[0]), term_key(item[1])))
+        for ctype in classes:
+            self.members[ctype] = self.members.get(ctype, 0) + 1
+
+        self.items.add([(ctype, item) for ctype in classes for item in items])
+        self.pairs.add([(ctype, items[i], items[j]) for ctype in classes
+                                                    for i in range(len(items))
+                                                    for j in range(i+1, len(items))])
+
+        if self.interval is not None and self.emit is not None and\
+           self.number_of_transactions() % self.interval == 0:
+            self.logger.info("Emitting rules after {} transactions ({} items and {} pairs kept)".format(
+                self.number_of_transactions(), len(self.items), len(self.pairs)))
+            self.emit(self.rule_base())
+            self.emitted = self.number_of_transactions()
+
+if __name__ == "__main__":
+    print("Approximate mining of semantic association rules from a stream of facts")
@@ -8,7 +8,7 @@ from auxiliarly import data_quality_analyser
 
 def run(args, time):
     dqa = data_quality_analyser.Inspector(time)
-    dqa.run(args.abox, args.model, args.output, args.interactive)
+    dqa.run(args.abox, args.model, args.output, args.interactive, args.discretise)
 
 def print_header():
     header = 'An Experimental Pipeline for Data Mining on Linked Archaeological Data'
@@ -29,6 +29,8 @@ if __name__ == "__main__":
 
     parser = argparse.ArgumentParser()
     parser.add_argument("-a", "--abox", help="ABox graph", default=None)
+    parser.add_argument("--discretise", help="Discretise numeric literals with the bins of the model, from its .meta file",
+                        action="store_true")
     parser.add_argument("-i", "--interactive", help="Interactive mode", action="store_true")
     parser.add_argument("-m", "--model", help="Rule-based model", default=None)
     parser.add_argument("-o", "--output", help="output path", default="./of/output-{}".format(time))
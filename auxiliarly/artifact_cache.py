@@ -0,0 +1,256 @@
+#!/usr/bin/python3
+
+import logging
+import hashlib
+import inspect
+import os
+import pickle
+import tempfile
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+# part of every key; raise it when a stage changes what it computes, to leave stale artifacts be
+VERSION = 2
+
+class ArtifactCache():
+    """ Store of the outputs of the stages of a run, addressed by what they derive from
+
+    The key of an artifact is a digest of the name of its stage, the keys of the artifacts
+    it is computed from, the contents of any input files, and the parameters of the stage.
+    A run which only changes a parameter of a later stage thus finds the artifacts of all
+    earlier stages under the same keys, and reuses them.
+
+    Stages which run in slices keep a Journal instead, so that an interrupted run resumes
+    from the last finished slice. Without a directory, nothing is stored or reused.
+    """
+    directory = None
+
+    def __init__(self, directory=None):
+        """ Open a cache
+
+        :param directory: directory to keep the artifacts in, created if needed; None to disable caching
+        """
+        self.logger = logging.getLogger(__name__)
+        self.directory = directory
+        if directory is not None:
+            os.makedirs(os.path.join(directory, "artifacts"), exist_ok=True)
+            os.makedirs(os.path.join(directory, "journals"), exist_ok=True)
+
+        self._file_digests = {}
+
+    def enabled(self):
+        return self.directory is not None
+
+    ### Accessors ###
+
+    def key_of(self, *parts):
+        """ Return the key of an artifact
+
+        :param parts: stage name, keys of the artifacts it derives from, and parameters
+
+        :returns: a hexadecimal digest; None if caching is disabled
+        """
+        if not self.enabled():
+            return None
+
+        return digest_of((VERSION,) + parts)
+
+    def digest_of_file(self, path):
+        """ Return the digest of the contents of a file, or None if there is no file """
+        if not self.enabled() or path is None:
+            return None
+
+        if path not in self._file_digests.keys():
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(2**20), b''):
+                    digest.update(chunk)
+            self._file_digests[path] = digest.hexdigest()
+
+        return self._file_digests[path]
+
+    ### Operators ###
+
+    def computed(self, key, func, *args):
+        """ Return a stored artifact, or compute and store it
+
+        :param key: key of the artifact as returned by key_of(); None to compute without storing
+        :param func: function which computes the artifact
+        :param args: arguments of func
+
+        :returns: the artifact
+        """
+        if key is None:
+            return func(*args)
+
+        path = os.path.join(self.directory, "artifacts", key + ".pickle")
+        if os.path.exists(path):
+            self.logger.info("Reusing artifact {}".format(key))
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+
+        artifact = func(*args)
+
+        # write aside and move in place, so that an interrupted write leaves no artifact
+        fd, partial = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(partial, path)
+        self.logger.info("Stored artifact {}".format(key))
+
+        return artifact
+
+    def journal(self, key):
+        """ Open the journal of a stage which runs in slices
+
+        :param key: key of the stage as returned by key_of(); None for a journal which records nothing
+
+        :returns: a Journal instance
+        """
+        if key is None:
+            return Journal()
+
+        return Journal(os.path.join(self.directory, "journals", key + ".journal"))
+
+class Journal():
+    """ Append-only record of the finished work of a stage and its results
+
+    Every result is appended as it is consumed, and flushed at once, so that the journal
+    survives a crash of the run; a record torn by the crash is dropped on reopening. Work
+    from a queue is found back by the digest of its items, the ranges of rows handed out by
+    a scheduler by their first row. Recorded results are handed out once, then forgotten.
+    """
+    path = None
+
+    def __init__(self, path=None):
+        """ Open a journal, and read the results it holds
+
+        :param path: file of the journal; None for a journal which records nothing
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.outputs = {}  # digest of work -> output
+        self.ranges = {}  # first row -> (range, output)
+        self.recorded = set()  # digests of all work in the journal
+
+        self._file = None
+        if path is None:
+            return
+
+        if os.path.exists(path):
+            end = 0
+            with open(path, 'rb') as f:
+                while True:
+                    try:
+                        digest, rows, output = pickle.load(f)
+                    except (EOFError, pickle.UnpicklingError, ValueError, AttributeError, IndexError):
+                        break
+                    end = f.tell()
+
+                    self.recorded.add(digest)
+                    if rows is not None:
+                        self.ranges[rows.start] = (rows, output)
+                    else:
+                        self.outputs[digest] = output
+
+            if os.path.getsize(path) > end:
+                self.logger.warning("Dropping torn record at the end of journal {}".format(path))
+                os.truncate(path, end)
+            self.logger.info("Resuming from {} results in journal {}".format(len(self.recorded), path))
+
+        self._file = open(path, 'ab')
+
+    def __len__(self):
+        return len(self.outputs) + len(self.ranges)
+
+    ### Accessors ###
+
+    def output_of(self, work):
+        """ Return and forget the recorded output of work from a queue, or None if there is none """
+        if len(self.outputs) <= 0:
+            return None
+
+        return self.outputs.pop(digest_of(work), None)
+
+    def output_at(self, row):
+        """ Return and forget the recorded (range, output) tuple of the rows from a row on, or None if there is none """
+        return self.ranges.pop(row, None)
+
+    ### Operators ###
+
+    def record(self, work, output):
+        """ Append the result of work, unless it is recorded already """
+        if self._file is None:
+            return
+
+        digest = digest_of(work)
+        if digest in self.recorded:
+            return
+
+        # ranges are recorded in full, queued work by its digest only
+        rows = work if isinstance(work, range) else None
+        pickle.dump((digest, rows, output), self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._file.flush()
+        self.recorded.add(digest)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.outputs = {}
+        self.ranges = {}
+
+
+### Independent Functions ##
+
+def digest_of(value):
+    """ Return a digest of a value which does not depend on the process it is computed in
+
+    Sets and dictionaries are taken in sorted order, arrays by their bytes, and other
+    objects by their attributes.
+
+    :param value: a value of built-in type, an array, or an object of such values
+
+    :returns: a hexadecimal digest
+    """
+    digest = hashlib.sha256()
+    _update(digest, value)
+
+    return digest.hexdigest()
+
+def definition_of(func):
+    """ Return a digest of the source code of a function, such as the sampling of a directive """
+    return digest_of((func.__qualname__, inspect.getsource(func)))
+
+def _update(digest, value):
+    if value is None or isinstance(value, (bool, int, float, complex, str, bytes)):
+        digest.update(repr(value).encode())
+    elif isinstance(value, (tuple, list)):
+        digest.update(b"(")
+        for v in value:
+            _update(digest, v)
+            digest.update(b",")
+        digest.update(b")")
+    elif isinstance(value, (set, frozenset, dict)):
+        items = value.items() if isinstance(value, dict) else value
+        digest.update(b"{")
+        for v in sorted(digest_of(v) for v in items):
+            digest.update(v.encode())
+        digest.update(b"}")
+    elif isinstance(value, range):
+        _update(digest, ("range", value.start, value.stop, value.step))
+    elif isinstance(value, np.ndarray):
+        _update(digest, ("array", value.dtype.str, value.shape))
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, np.generic):
+        _update(digest, value.item())
+    elif hasattr(value, "__dict__"):
+        _update(digest, (type(value).__name__,
+                         {k: v for k, v in vars(value).items() if not isinstance(v, logging.Logger)}))
+    else:
+        raise TypeError("Cannot digest value of type {}".format(type(value).__name__))
+
+if __name__ == "__main__":
+    print("Cache of stage artifacts")
@@ -1,11 +1,14 @@
 #!/usr/bin/python3
 
 import logging
+import rdflib
 from readers import rdf
 from readers import pickler as model_reader
+from readers import metadata as metadata_reader
 from writers import fact_set
 from writers import pickler as model_writer
 from algorithms.data_quality_analysing import check
+from algorithms.discretisation import apply_bins
 from ui import fact_evaluator
 
 
@@ -23,6 +26,15 @@ class Inspector():
         # read graphs
         return rdf.read(local_path=abox)
 
+    def load_bins(self, model_path):
+        # bins are written to the metadata next to the model, as <output>.meta besides <output>.pickle
+        path = model_path[:-len(".pickle")] if model_path.endswith(".pickle") else model_path
+        metadata = metadata_reader.read(path+".meta")
+        if "bins" not in metadata.keys():
+            raise ValueError("Model was not mined by an MP directive, whose metadata holds its bins")
+
+        return {rdflib.URIRef(p): cut_points for p, cut_points in metadata["bins"].items()}
+
     def run_program(self, dataset, model):
         self.logger.info("Starting run\nUsing model of size {}".format(model.size()))
 
@@ -35,7 +47,7 @@ class Inspector():
         fact_set.pretty_write(output, path, overwrite)
         model_writer.write(output, path+".pickle", overwrite)
 
-    def run(self, abox, model_path, output_path, interactive):
+    def run(self, abox, model_path, output_path, interactive, discretise=False):
         self.print_header()
         print(" {}\n".format(self.time))
 
@@ -45,6 +57,11 @@ class Inspector():
         print(" Importing Model...")
         model = model_reader.read(model_path)
 
+        if discretise:
+            # the rules hold bin tokens, so numeric literals must fall in the same bins
+            print(" Discretising Data Sets...")
+            dataset = apply_bins(dataset, self.load_bins(model_path))
+
         print(" Initiated Data Quality Analyser")
         output = self.run_program(dataset, model)
 
@@ -0,0 +1,31 @@
+#!/usr/bin/python3
+
+from time import time
+
+
+class Deadline():
+    """ Wall-clock deadline shared by all stages of a run
+
+    Stores an absolute point in time, so instances can be handed to worker
+    processes as they are.
+    """
+    def __init__(self, budget=None, start=None):
+        self.budget = budget
+        self.start = start if start is not None else time()
+        self.end = self.start + budget if budget is not None else None
+
+    def expired(self):
+        return self.end is not None and time() >= self.end
+
+    def remaining(self):
+        if self.end is None:
+            return None
+
+        return max(0.0, self.end - time())
+
+    def fraction(self, share=1.0):
+        """ Return a deadline which expires after a share of this budget """
+        if self.budget is None:
+            return Deadline(None, self.start)
+
+        return Deadline(self.budget * share, self.start)
@@ -0,0 +1,414 @@
+#!/usr/bin/python3
+
+import logging
+import hashlib
+import multiprocessing
+import os
+import pickle
+import queue
+import shutil
+import socket
+import tempfile
+import threading
+import weakref
+from multiprocessing.connection import Client, Connection, AuthenticationError, answer_challenge, deliver_challenge
+from time import sleep
+from timeit import default_timer as timer
+from auxiliarly.resources import memory_in_use
+from auxiliarly.worker_pool import WorkerPool, _init, _resident
+
+
+logger = logging.getLogger(__name__)
+
+# environment variable holding the secret shared by the coordinator and its workers
+AUTHKEY_VARIABLE = "MINOS_AUTHKEY"
+# size in bytes of the pieces in which snapshots are sent to the workers
+CHUNK_SIZE = 16 * 2**20
+# seconds between attempts of a worker to reach its coordinator
+RECONNECT_DELAY = 1.0
+
+class RemoteWorker():
+    """ Worker process connected to the coordinator over TCP, possibly on another machine """
+    host = None
+    pid = None
+    sentinel = None  # not a child process: its loss shows as a closed connection
+
+    def __init__(self, host=None, pid=None):
+        self.host = host
+        self.pid = pid
+
+    def __str__(self):
+        return "{}:{}".format(self.host, self.pid)
+
+class Snapshot():
+    """ Directory of read-only files, such as an encoded graph, copied to every worker
+
+    Snapshots are named by a digest of their content, so a worker which already holds a
+    copy, for example from an earlier run on the same graph, does not receive it again.
+    """
+    directory = None
+    files = None
+    digest = None
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.files = sorted(f for f in os.listdir(directory) if os.path.isfile(os.path.join(directory, f)))
+
+        digest = hashlib.sha1()
+        for name in self.files:
+            digest.update(name.encode())
+            with open(os.path.join(directory, name), 'rb') as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+        self.digest = digest.hexdigest()
+
+    def send(self, connection):
+        """ Send the files over a connection, as (file name, piece) tuples followed by None """
+        for name in self.files:
+            with open(os.path.join(self.directory, name), 'rb') as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    connection.send((name, chunk))
+        connection.send(None)
+
+class DistributedWorkerPool(WorkerPool):
+    """ Pool of worker processes on any number of machines, connected over TCP
+
+    The coordinator listens on an address, to which workers started with serve() connect.
+    On joining, every worker receives the resident inputs; those which name a directory,
+    such as that of the encoded graph, are sent as a snapshot which the worker stores and
+    loads locally. Inputs of a stage are sent to a worker with its first task of that stage,
+    directories again as snapshot.
+
+    The work is handed out as by WorkerPool, one task per worker at a time, and the results
+    are merged by the consumers in the coordinator. A worker whose connection is lost or
+    which exceeds the task timeout is dropped and its work is retried on the others; workers
+    which join later take the place of lost ones. Without any workers left, the coordinator
+    waits for new ones to join.
+
+    Connections are authenticated with a secret shared by the coordinator and the workers,
+    as tasks and results are pickled. Deadlines are absolute, so the clocks of the machines
+    should be synchronised. The memory budget only covers the coordinator.
+    """
+    def __init__(self, address=None, processes=None, resident={}, indexer=None, timeout=None, retries=2,
+                 backoff=1.0, memory_budget=None, authkey=None):
+        """ Listen for workers, and wait until enough have joined
+
+        :param address: (host, port) tuple to listen on; port 0 picks a free port
+        :param processes: number of workers to wait for
+        :param resident: dictionary with inputs that stay resident during the entire run
+        :param indexer: function which derives additional inputs from the resident dictionary (updated in place)
+        :param timeout: seconds after which a task is considered stuck; None to wait indefinitely
+        :param retries: number of times failed work is retried
+        :param backoff: delay in seconds before the first retry, doubled on every next one
+        :param memory_budget: memory in bytes above which no more work is handed out; None for no limit
+        :param authkey: shared secret; defaults to the value of AUTHKEY_VARIABLE
+        """
+        if address is None:
+            raise ValueError("Missing coordinator address.")
+        if processes is None:
+            raise ValueError("Missing number of workers.")
+
+        self.logger = logging.getLogger(__name__)
+        self.scratch = tempfile.mkdtemp(prefix="minos-")
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.scratch, True)
+        self.stage = {}
+        self.version = 0
+        self.processes = processes
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.memory_budget = memory_budget
+        self.failures = []
+
+        self.authkey = authkey if authkey is not None else authkey_of_environment()
+        self.resident = {name: value for name, value in resident.items() if not _is_directory(value)}
+        self.snapshots = {name: Snapshot(value) for name, value in resident.items() if _is_directory(value)}
+        self.indexer = indexer
+
+        self.server = socket.create_server(address)
+        self.server.settimeout(RECONNECT_DELAY)
+        self.address = self.server.getsockname()[:2]
+        self.joined = queue.Queue()
+        self.closing = threading.Event()
+        self.acceptor = threading.Thread(target=self._accept, daemon=True)
+        self.acceptor.start()
+
+        self.logger.info("Waiting for {} workers to join on {}:{}".format(self.processes, *self.address))
+        self.workers = [self.joined.get() for _ in range(self.processes)]
+        self.versions = [{} for _ in range(self.processes)]  # stage input versions sent, per worker
+        self.logger.info("Joined by workers {}".format(", ".join(str(worker) for worker, _ in self.workers)))
+
+    def _accept(self):
+        """ Accept workers until the pool closes; runs in a thread of its own """
+        while not self.closing.is_set():
+            try:
+                sock, _ = self.server.accept()
+            except socket.timeout:
+                continue
+            except OSError:  # server closed
+                return
+
+            sock.setblocking(True)
+            connection = Connection(sock.detach())
+            try:
+                deliver_challenge(connection, self.authkey)
+                answer_challenge(connection, self.authkey)
+                worker = self._welcome(connection)
+            except (AuthenticationError, EOFError, OSError) as e:
+                self.logger.warning("Worker failed to join: {}".format(e))
+                connection.close()
+                continue
+
+            self.joined.put((worker, connection))
+
+    def _welcome(self, connection):
+        """ Hand a joining worker the resident inputs and the snapshots it does not hold yet """
+        worker = RemoteWorker(*connection.recv())
+        connection.send((self.resident, self.indexer,
+                         {name: snapshot.digest for name, snapshot in self.snapshots.items()}))
+        for name in connection.recv():
+            self.logger.info("Sending snapshot {} to worker {}".format(name, worker))
+            self.snapshots[name].send(connection)
+
+        connection.recv()  # attached to the snapshots
+
+        return worker
+
+    def share(self, **inputs):
+        """ Publish the read-only inputs of the next stage to all workers
+
+        :param inputs: inputs by name; those which name a directory are sent as snapshot
+
+        :returns: none
+        """
+        for name, value in inputs.items():
+            if not _is_directory(value):
+                super().share(**{name: value})
+                continue
+
+            self.version += 1
+            self._remove(name)
+            self.stage[name] = (self.version, Snapshot(value))
+
+    def _remove(self, name):
+        if name in self.stage.keys() and not isinstance(self.stage[name][1], Snapshot):
+            super()._remove(name)
+
+    def _admit(self, running):
+        """ Give the slots of lost workers to those which joined since, and wait for one if none are left """
+        for i in range(len(self.workers)):
+            if self.workers[i] is None and not self.joined.empty():
+                self.workers[i] = self.joined.get()
+                self.versions[i] = {}
+                self.logger.info("Worker {} took the place of a lost one".format(self.workers[i][0]))
+
+        if len(running) <= 0 and True not in [worker is not None for worker in self.workers]:
+            self.logger.warning("No workers left; waiting for workers to join on {}:{}".format(*self.address))
+            self.workers[0] = self.joined.get()
+            self.versions[0] = {}
+
+    def _send(self, i, task):
+        """ Send a task, preceded by the stage inputs which the worker has not received yet """
+        func, stage_inputs, work = task
+        connection = self.workers[i][1]
+        try:
+            for name, (version, source) in stage_inputs.items():
+                if self.versions[i].get(name) == version:
+                    continue
+
+                if isinstance(source, Snapshot):
+                    connection.send(("snapshot", name, version, source.digest))
+                    source.send(connection)
+                else:
+                    data = None
+                    if source is not None:
+                        with open(source, 'rb') as f:
+                            data = f.read()
+                    connection.send(("input", name, version, data))
+                self.versions[i][name] = version
+
+            connection.send(("task", func, work))
+        except OSError:  # lost; noticed once its connection is waited on
+            pass
+
+    def _waitables(self, i):
+        return [self.workers[i][1]]
+
+    def _death_of(self, i):
+        return "lost connection to worker {}".format(self.workers[i][0])
+
+    def _replace(self, i):
+        """ Drop a lost or stuck worker; workers which join later take its place """
+        self.workers[i][1].close()
+        self.workers[i] = None
+        self.versions[i] = {}
+
+    def memory_in_use(self):
+        return memory_in_use()
+
+    def close(self):
+        self._shutdown(goodbye=True)
+
+    def __exit__(self, *args):
+        self._shutdown(goodbye=False)
+
+    def _shutdown(self, goodbye=True):
+        self.closing.set()
+        self.acceptor.join()
+        self.server.close()
+
+        connections = [connection for _, connection in [worker for worker in self.workers if worker is not None]]
+        while not self.joined.empty():
+            connections.append(self.joined.get()[1])
+        for connection in connections:
+            try:
+                if goodbye:
+                    connection.send(None)
+            except OSError:  # worker is gone
+                pass
+            connection.close()
+
+        self._finalizer()
+
+
+### Independent Functions ##
+
+def address_of(text):
+    """ Parse an address given as host:port
+
+    :param text: a string such as 'localhost:7000'
+
+    :returns: a (host, port) tuple
+    """
+    host, _, port = text.rpartition(':')
+    if len(host) <= 0 or not port.isdigit():
+        raise ValueError("Address not of the form host:port: {}".format(text))
+
+    return (host, int(port))
+
+def authkey_of_environment():
+    authkey = os.environ.get(AUTHKEY_VARIABLE)
+    if authkey is None or len(authkey) <= 0:
+        raise ValueError("Set {} to a secret shared by the coordinator and its workers.".format(AUTHKEY_VARIABLE))
+
+    return authkey.encode()
+
+def serve(address=None, processes=1, authkey=None, cache=None):
+    """ Run worker processes for the coordinators which listen on an address
+
+    Every worker serves one run after another, and waits for the next coordinator once a
+    run is over; stop the workers by interrupting them.
+
+    :param address: (host, port) tuple of the coordinator
+    :param processes: number of worker processes on this machine
+    :param authkey: shared secret; defaults to the value of AUTHKEY_VARIABLE
+    :param cache: directory to keep snapshots in; defaults to a temporary directory, shared by the worker processes
+
+    :returns: none
+    """
+    if address is None:
+        raise ValueError("Missing coordinator address.")
+
+    authkey = authkey if authkey is not None else authkey_of_environment()
+    scratch = None
+    if cache is None:
+        cache = scratch = tempfile.mkdtemp(prefix="minos-")
+
+    logger.info("Starting {} workers for coordinator {}:{}".format(processes, *address))
+    workers = [multiprocessing.Process(target=_serve, args=(address, authkey, cache)) for _ in range(processes)]
+    try:
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join()
+    finally:
+        for process in workers:
+            if process.is_alive():
+                process.kill()
+                process.join()
+        if scratch is not None:
+            shutil.rmtree(scratch, True)
+
+def _serve(address, authkey, cache):
+    """ Serve runs of coordinators until interrupted """
+    while True:
+        connection = _connect(address, authkey)
+        try:
+            _work(connection, cache)
+        except (EOFError, OSError):  # coordinator is gone
+            logger.warning("Lost connection to coordinator {}:{}".format(*address))
+        finally:
+            connection.close()
+
+def _connect(address, authkey):
+    """ Connect to the coordinator, waiting for it to listen """
+    while True:
+        try:
+            return Client(address, authkey=authkey)
+        except (ConnectionRefusedError, ConnectionResetError, EOFError):
+            sleep(RECONNECT_DELAY)
+
+def _work(connection, cache):
+    """ Join a coordinator and run the tasks it sends until it sends None """
+    connection.send((socket.gethostname(), os.getpid()))
+    resident, indexer, snapshots = connection.recv()
+
+    missing = [name for name, digest in snapshots.items() if not os.path.isdir(os.path.join(cache, digest))]
+    connection.send(missing)
+    for name in missing:
+        _receive_snapshot(connection, os.path.join(cache, snapshots[name]))
+
+    resident = dict(resident)
+    resident.update({name: os.path.join(cache, digest) for name, digest in snapshots.items()})
+    _init(resident, indexer)
+    connection.send(True)
+
+    while True:
+        message = connection.recv()
+        if message is None:
+            return
+
+        if message[0] == "input":
+            _, name, version, data = message
+            if data is None:
+                _resident.pop(name, None)
+            else:
+                _resident[name] = pickle.loads(data)
+            continue
+        if message[0] == "snapshot":
+            _, name, version, digest = message
+            _receive_snapshot(connection, os.path.join(cache, digest))
+            _resident[name] = os.path.join(cache, digest)
+            continue
+
+        _, func, work = message
+        t0 = timer()
+        try:
+            output = func(work)
+        except Exception as e:
+            connection.send((timer() - t0, None, e))
+        else:
+            connection.send((timer() - t0, output, None))
+
+def _receive_snapshot(connection, directory):
+    """ Store the pieces of a snapshot, and move it in place once complete """
+    partial = tempfile.mkdtemp(prefix="partial-", dir=os.path.dirname(directory))
+    while True:
+        piece = connection.recv()
+        if piece is None:
+            break
+
+        name, chunk = piece
+        with open(os.path.join(partial, os.path.basename(name)), 'ab') as f:
+            f.write(chunk)
+
+    try:
+        os.rename(partial, directory)
+    except OSError:  # received by another worker process in the meantime
+        shutil.rmtree(partial, True)
+
+def _is_directory(value):
+    return isinstance(value, str) and os.path.isdir(value)
+
+if __name__ == "__main__":
+    print("Distributed pool of workers")
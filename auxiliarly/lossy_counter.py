@@ -0,0 +1,90 @@
+#!/usr/bin/python3
+
+import logging
+from math import ceil
+
+
+class LossyCounter():
+    """ Approximate counts of keys over an unbounded sequence of transactions, in bounded memory
+
+    Lossy counting (Manku and Motwani, 2002): the transactions are split into buckets of
+    1/error transactions, and at the end of every bucket the keys whose count could not
+    exceed the number of buckets so far are dropped. A key which comes back later starts
+    over, with an allowance for what it may have been counted before.
+
+    After N transactions, every count is at most error * N below the true count, and every
+    key which occurred in more than error * N transactions is kept. The number of keys kept
+    grows with the logarithm of N rather than with N.
+    """
+    error = None
+    width = None
+    n = None
+
+    def __init__(self, error=.001):
+        """ Start counting
+
+        :param error: the largest undercount, as fraction of the number of transactions
+        """
+        if not 0.0 < error < 1.0:
+            raise ValueError("Error must be between 0 and 1 (was {})".format(error))
+
+        self.logger = logging.getLogger(__name__)
+        self.error = error
+        self.width = ceil(1 / error)
+        self.n = 0
+        self.entries = {}  # key -> [count, largest undercount]
+
+    ### Accessors ###
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries.keys()
+
+    def count_of(self, key):
+        """ Return the estimated count of a key, which is at most bound() below the true count """
+        return self.entries[key][0] if key in self.entries.keys() else 0
+
+    def bound(self):
+        """ Return the largest undercount of any key, which is at most error * N """
+        return self.n // self.width
+
+    def bucket(self):
+        """ Return the number of the current bucket, counting from one """
+        return max(1, ceil(self.n / self.width))
+
+    def keys(self):
+        return self.entries.keys()
+
+    ### Operators ###
+
+    def add(self, keys=()):
+        """ Count a transaction
+
+        :param keys: the distinct keys occurring in the transaction
+
+        :returns: none
+        """
+        self.n += 1
+        bucket = self.bucket()
+        for key in keys:
+            if key in self.entries.keys():
+                self.entries[key][0] += 1
+            else:
+                self.entries[key] = [1, bucket - 1]
+
+        if self.n % self.width == 0:
+            self.prune()
+
+    def prune(self):
+        """ Drop the keys which could not have been counted more often than the buckets so far """
+        bucket = self.bucket()
+        for key in [key for key, (count, undercount) in self.entries.items() if count + undercount <= bucket]:
+            del self.entries[key]
+
+        self.logger.debug("Keeping {} keys after {} transactions".format(len(self.entries), self.n))
+
+
+if __name__ == "__main__":
+    print("Approximate counting over unbounded transactions")
@@ -0,0 +1,202 @@
+#!/usr/bin/python3
+
+import logging
+from collections import deque
+
+
+class Batch():
+    """ Items passed from one stage of a pipeline to the next
+
+    Batches are numbered by the position of their first item in the stream of items put
+    into a stage, so that unfinished or failed batches can be accounted for.
+    """
+    start = None
+    items = None
+
+    def __init__(self, start=0, items=None):
+        self.start = start
+        self.items = items if items is not None else []
+
+    @property
+    def stop(self):
+        return self.start + len(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def rest(self, offset=0):
+        """ Return the items from an offset on, as a batch """
+        return Batch(self.start + offset, self.items[offset:])
+
+class Stage():
+    """ Stage of a pipeline run on a pool of workers
+
+    The first stage of a pipeline takes its work from a scheduler; later stages take it
+    from their queue, into which the consumer of the stage before puts its results. A stage
+    with a capacity holds back all stages before it while its queue is full, so that a fast
+    stage cannot pile up results which a slower one has yet to process.
+
+    The results of an ordered stage are handed to its consumer in the order in which the
+    work was handed out, rather than in order of completion, so that what a pipeline
+    produces does not depend on which worker finishes first.
+
+    A stage with a journal records every result it consumes, and replays the results it
+    finds there instead of handing out the work again, so that a run resumes where an
+    earlier one stopped.
+    """
+    name = None
+    func = None
+    consumer = None
+    scheduler = None
+    capacity = None
+    batch_size = None
+    ordered = False
+    journal = None
+
+    def __init__(self, name, func, consumer=None, scheduler=None, capacity=None, batch_size=None, ordered=False,
+                 journal=None):
+        """ Define a stage
+
+        :param name: name under which failed work is recorded
+        :param func: a picklable function of one argument, the work
+        :param consumer: function called in the parent with the work and the result of every finished task
+        :param scheduler: a scheduler instance which hands out the work; None to take work from the queue
+        :param capacity: number of queued batches above which earlier stages are held back; None for no limit
+        :param batch_size: maximum number of items per queued batch; None to queue items as put
+        :param ordered: hand the results to the consumer in the order of the work
+        :param journal: a Journal instance (see auxiliarly.artifact_cache) to record and replay results in; None to do neither
+        """
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.func = func
+        self.consumer = consumer
+        self.scheduler = scheduler
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.ordered = ordered
+        self.journal = journal
+
+        self.queue = deque()
+        self.queued = 0  # number of items put
+        self.handed_out = deque()  # work of an ordered stage of which the results are yet to be consumed
+        self.finished = {}  # id of work -> (work, output), of work finished before earlier work
+
+    def put(self, items):
+        """ Queue items for this stage, in batches of at most batch_size
+
+        :param items: list-like of items
+
+        :returns: none
+        """
+        size = self.batch_size if self.batch_size is not None else max(1, len(items))
+        for i in range(0, len(items), size):
+            batch = Batch(self.queued, items[i:i+size])
+            self.queue.append(batch)
+            self.queued += len(batch)
+
+    def full(self):
+        return self.capacity is not None and len(self.queue) >= self.capacity
+
+    def next_work(self):
+        """ Return the next work of this stage, or None if there is none for now """
+        if self.scheduler is not None:
+            work = self.scheduler.next_chunk()
+        elif len(self.queue) > 0:
+            work = self.queue.popleft()
+        else:
+            work = None
+
+        if self.ordered and work is not None:
+            self.handed_out.append(work)
+
+        return work
+
+    def replay(self):
+        """ Consume the recorded result of the next work of this stage, if the journal holds it
+
+        :returns: True if a result was replayed
+        """
+        if self.journal is None or len(self.journal) <= 0:
+            return False
+
+        if self.scheduler is not None:
+            recorded = self.journal.output_at(self.scheduler.position)
+            if recorded is None:
+                return False
+
+            work, output = recorded
+            self.scheduler.skip(work.stop)
+        elif len(self.queue) > 0:
+            output = self.journal.output_of(self.queue[0])
+            if output is None:
+                return False
+
+            work = self.queue.popleft()
+        else:
+            return False
+
+        if self.ordered:
+            self.handed_out.append(work)
+        self.consume(work, output)
+
+        return True
+
+    def feedback(self, work, duration):
+        if self.scheduler is not None:
+            self.scheduler.feedback(work, duration)
+
+    def consume(self, work, output):
+        """ Hand the result of finished work to the consumer, once all earlier work of an ordered stage is consumed """
+        if not self.ordered:
+            self._consume(work, output)
+            return
+
+        self.finished[id(work)] = (work, output)
+        while len(self.handed_out) > 0 and id(self.handed_out[0]) in self.finished.keys():
+            work, output = self.finished.pop(id(self.handed_out.popleft()))
+            if output is not None:
+                self._consume(work, output)
+
+    def discard(self, work):
+        """ Give up on work which failed, so that the results after it can be consumed """
+        if self.ordered:
+            self.consume(work, None)
+
+    def _consume(self, work, output):
+        if self.consumer is not None:
+            self.consumer(work, output)
+        if self.journal is not None:
+            self.journal.record(work, output)
+
+def next_task_of(stages):
+    """ Return a function which picks the next task of a pipeline
+
+    Later stages go first, as they consume what earlier stages produced. An earlier stage
+    only gets to hand out work if none of the stages after it is full. Results replayed
+    from a journal may queue work for later stages, which then go first again.
+
+    :param stages: list of Stage instances, in order of the pipeline
+
+    :returns: a function which returns a (stage, work) tuple, or None if no stage has work for now
+    """
+    def next_task():
+        k = len(stages) - 1
+        while k >= 0:
+            if True in [stage.full() for stage in stages[k+1:]]:
+                return None
+
+            if stages[k].replay():
+                k = len(stages) - 1
+                continue
+
+            work = stages[k].next_work()
+            if work is not None:
+                return (stages[k], work)
+            k -= 1
+
+        return None
+
+    return next_task
+
+if __name__ == "__main__":
+    print("Stages of a pipeline")
@@ -0,0 +1,173 @@
+#!/usr/bin/python3
+
+import logging
+import os
+from math import floor
+
+
+logger = logging.getLogger(__name__)
+
+CGROUP = "/sys/fs/cgroup"
+
+# memory of an idle worker: interpreter, numpy, and the modules of the algorithms
+WORKER_BASE_MEMORY = 64 * 2**20
+# memory of a worker per byte of encoded graph: the pages of the graph it maps, plus the
+# stage inputs and intermediate arrays it derives from them, which grow with the graph
+WORKER_MEMORY_PER_GRAPH_BYTE = 2.0
+# size of the encoded graph per fact, as estimated before the graph is encoded; the arrays
+# take about half of this on graphs with few predicates
+ENCODED_GRAPH_BYTES_PER_FACT = 32
+# share of the memory limit used by default, leaving room for the page cache and the kernel
+MEMORY_HEADROOM = .8
+
+def cpu_limit():
+    """ Return the number of CPUs this process may use
+
+    Takes the smallest of the CPUs it is allowed to run on and the CPU quota of its cgroup,
+    which containers use to limit CPU time without hiding any CPUs.
+
+    :returns: a float, as quotas need not be whole CPUs
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpus = float(len(os.sched_getaffinity(0)))
+    else:
+        cpus = float(os.cpu_count() or 1)
+
+    quota = _cgroup_cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, quota)
+
+    return cpus
+
+def memory_limit():
+    """ Return the memory in bytes this process and its children may use
+
+    Takes the smallest of the physical memory and the memory limit of its cgroup.
+
+    :returns: an int, or None if neither is known
+    """
+    limits = [limit for limit in (_physical_memory(), _cgroup_memory_limit()) if limit is not None]
+    if len(limits) <= 0:
+        return None
+
+    return min(limits)
+
+def default_memory_budget():
+    """ Return the memory budget of a run if none is given: a share of the memory limit """
+    limit = memory_limit()
+    if limit is None:
+        return None
+
+    return int(limit * MEMORY_HEADROOM)
+
+def memory_in_use(pid=None):
+    """ Return the memory in bytes in use by a process
+
+    Uses the proportional set size where available, which divides pages shared between
+    processes, such as those of a memory-mapped graph, over the processes mapping them,
+    so that the memory of a pool of workers adds up. Falls back to the resident set size.
+
+    :param pid: process ID; defaults to this process
+
+    :returns: an int; 0 if unknown, for example on platforms without /proc
+    """
+    pid = pid if pid is not None else os.getpid()
+    try:
+        with open("/proc/{}/smaps_rollup".format(pid)) as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+
+    try:
+        with open("/proc/{}/statm".format(pid)) as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def worker_memory_of(graph_size=0):
+    """ Estimate the memory of one worker
+
+    :param graph_size: size in bytes of the graph the workers attach to
+
+    :returns: an int, in bytes
+    """
+    return int(WORKER_BASE_MEMORY + WORKER_MEMORY_PER_GRAPH_BYTE * graph_size)
+
+def number_of_workers(worker_memory=0, memory_budget=None):
+    """ Return the number of workers which fit the CPU limit and a memory budget
+
+    :param worker_memory: estimated memory in bytes of one worker
+    :param memory_budget: memory in bytes available to the run, including this process; defaults to default_memory_budget()
+
+    :returns: an int, at least 1
+    """
+    cpus = cpu_limit()
+    workers = max(1, floor(cpus))
+
+    if memory_budget is None:
+        memory_budget = default_memory_budget()
+    if memory_budget is not None and worker_memory > 0:
+        available = memory_budget - memory_in_use()
+        workers = min(workers, floor(available / worker_memory))
+
+    workers = max(1, workers)
+    logger.info("Sizing pool to {} workers ({:.1f} CPUs, {} MiB budget, {} MiB per worker)".format(
+        workers,
+        cpus,
+        memory_budget // 2**20 if memory_budget is not None else "no",
+        worker_memory // 2**20))
+
+    return workers
+
+def _cgroup_cpu_quota():
+    """ Return the CPU quota of the cgroup in CPUs, or None if unlimited """
+    # cgroup v2: "<quota> <period>", or "max <period>"
+    values = _read(os.path.join(CGROUP, "cpu.max"))
+    if values is not None:
+        values = values.split()
+        if len(values) == 2 and values[0] != "max":
+            return int(values[0]) / int(values[1])
+
+        return None
+
+    # cgroup v1: quota of -1 means unlimited
+    quota = _read(os.path.join(CGROUP, "cpu", "cpu.cfs_quota_us"))
+    period = _read(os.path.join(CGROUP, "cpu", "cpu.cfs_period_us"))
+    if quota is not None and period is not None and int(quota) > 0 and int(period) > 0:
+        return int(quota) / int(period)
+
+    return None
+
+def _cgroup_memory_limit():
+    """ Return the memory limit of the cgroup in bytes, or None if unlimited """
+    # cgroup v2: bytes, or "max"
+    limit = _read(os.path.join(CGROUP, "memory.max"))
+    if limit is None:
+        # cgroup v1: unlimited is reported as a number close to 2^63
+        limit = _read(os.path.join(CGROUP, "memory", "memory.limit_in_bytes"))
+    if limit is None or limit == "max":
+        return None
+
+    limit = int(limit)
+    if limit >= 2**62:
+        return None
+
+    return limit
+
+def _physical_memory():
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, OSError, ValueError):
+        return None
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except (OSError, ValueError):
+        return None
+
+if __name__ == "__main__":
+    print("CPU and memory limits")
@@ -0,0 +1,140 @@
+#!/usr/bin/python3
+
+import logging
+from math import ceil, sqrt
+import numpy as np
+
+
+class TriangularScheduler():
+    """ Hands out chunks of a triangular workload on demand
+
+    Row i of a pairwise workload over n items pairs item i with all items after it, and so
+    costs n-i-1 comparisons unless other costs are given. Rather than fixing one range per
+    worker beforehand, rows are handed out in small chunks whenever a worker is ready for
+    more, so that workers which finish early take over the remaining rows of slower ones.
+
+    Chunks are sized on their estimated cost: the first ones on an equal share of the total,
+    later ones on the throughput measured from the finished chunks (see feedback()). Chunks
+    never exceed a worker's share of the remaining cost, so they shrink towards the end of
+    the work and all workers finish at about the same time.
+    """
+    # number of chunks per worker while no throughput has been measured yet
+    INITIAL_CHUNKS_PER_WORKER = 4
+    # weight of the latest measurement in the throughput estimate
+    SMOOTHING = .5
+
+    def __init__(self, n=0, workers=1, costs=None, deadline=None, target_duration=.2):
+        """ Plan a workload
+
+        :param n: number of rows
+        :param workers: number of workers which share the work
+        :param costs: optional array with the estimated cost of each row; defaults to n-i-1
+        :param deadline: a Deadline instance; no more chunks are handed out once it has expired
+        :param target_duration: preferred duration of a chunk in seconds
+        """
+        self.logger = logging.getLogger(__name__)
+        self.n = n
+        self.workers = max(1, workers)
+        self.deadline = deadline
+        self.target_duration = target_duration
+
+        self.cumulative_costs = None
+        if costs is not None:
+            self.cumulative_costs = np.zeros(n + 1)
+            np.cumsum(np.maximum(np.asarray(costs, dtype=np.float64), 0.0), out=self.cumulative_costs[1:])
+        self.total = self.cost_until(n)
+
+        self.position = 0
+        self.throughput = None  # cost per second
+        self.chunks = 0
+
+    ### Accessors ###
+
+    def cost_until(self, row):
+        """ Return the cost of all rows before a row """
+        if self.cumulative_costs is not None:
+            return float(self.cumulative_costs[row])
+
+        return row * (2 * self.n - row - 1) / 2
+
+    def cost_of(self, work):
+        return self.cost_until(work.stop) - self.cost_until(work.start)
+
+    def row_at(self, cost):
+        """ Return the first row before which at least the given cost is reached """
+        if cost >= self.total:
+            return self.n
+        if self.cumulative_costs is not None:
+            return int(np.searchsorted(self.cumulative_costs, cost, side="left"))
+
+        # root of r(2n - r - 1) / 2 = cost
+        b = 2 * self.n - 1
+        return min(self.n, max(0, ceil((b - sqrt(max(0.0, b * b - 8 * cost))) / 2)))
+
+    def partition(self, parts=1):
+        """ Split the whole workload into ranges of equal cost
+
+        :param parts: number of ranges
+
+        :returns: list of ranges
+        """
+        bounds = [0] + [self.row_at(self.total * k / parts) for k in range(1, parts)] + [self.n]
+
+        return [range(bounds[k], bounds[k+1]) for k in range(parts)]
+
+    def remainder(self):
+        """ Return the rows which were never handed out, as list of ranges """
+        if self.position >= self.n:
+            return []
+
+        return [range(self.position, self.n)]
+
+    ### Operators ###
+
+    def next_chunk(self):
+        """ Plan the next chunk
+
+        :returns: a range of rows, or None if the work is done or the deadline has expired
+        """
+        if self.position >= self.n:
+            return None
+        if self.deadline is not None and self.deadline.expired():
+            return None
+
+        if self.throughput is None:
+            cost = self.total / (self.workers * self.INITIAL_CHUNKS_PER_WORKER)
+        else:
+            cost = self.throughput * self.target_duration
+        done = self.cost_until(self.position)
+        cost = min(cost, (self.total - done) / self.workers)
+
+        end = max(self.position + 1, self.row_at(done + cost))
+        work = range(self.position, end)
+        self.position = end
+        self.chunks += 1
+
+        return work
+
+    def skip(self, row):
+        """ Continue handing out rows from a row on, as when the rows before it were done by an earlier run """
+        self.position = min(self.n, max(self.position, row))
+
+    def feedback(self, work, duration):
+        """ Update the throughput estimate with the duration of a finished chunk
+
+        :param work: the range of rows of the chunk
+        :param duration: time it took in seconds
+
+        :returns: none
+        """
+        if duration <= 0:
+            return
+
+        throughput = self.cost_of(work) / duration
+        if self.throughput is None:
+            self.throughput = throughput
+        else:
+            self.throughput = self.SMOOTHING * throughput + (1 - self.SMOOTHING) * self.throughput
+
+if __name__ == "__main__":
+    print("Scheduler for triangular workloads")
@@ -0,0 +1,620 @@
+#!/usr/bin/python3
+
+import logging
+import multiprocessing
+from multiprocessing.connection import wait
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait as wait_for, FIRST_COMPLETED
+from heapq import heappop, heappush
+from itertools import count
+from time import sleep, time
+from timeit import default_timer as timer
+from auxiliarly.resources import memory_in_use
+from auxiliarly.pipeline import Batch, Stage, next_task_of
+
+
+logger = logging.getLogger(__name__)
+
+EXECUTORS = ("process", "thread", "serial", "distributed")
+# seconds for which a reading of the memory in use holds; every reading scans the mappings of all workers
+MEMORY_SAMPLE_INTERVAL = .25
+
+# inputs resident in this worker process: set once by the initializer, or per stage by WorkerPool.share()
+_resident = {}
+_versions = {}
+
+def resident(name):
+    """ Return an input resident in the current worker process
+
+    :param name: name under which the input was made resident or shared
+
+    :returns: the input
+    """
+    return _resident[name]
+
+def gil_enabled():
+    """ Return False only on a free-threaded build of Python running without the GIL """
+    return getattr(sys, "_is_gil_enabled", lambda: True)()
+
+def create_pool(executor="process", processes=None, resident={}, indexer=None, start_method=None, timeout=None,
+                retries=2, memory_budget=None, address=None):
+    """ Start a pool of workers of the given kind
+
+    Threads only run concurrently on free-threaded builds of Python; with the GIL enabled,
+    a pool of processes is started instead. The serial executor runs all work in the
+    calling process, and the distributed executor on workers which join over TCP.
+
+    :param executor: one of EXECUTORS
+    :param processes: number of workers
+    :param resident: dictionary with inputs that stay resident during the entire run
+    :param indexer: function which derives additional inputs from the resident dictionary (updated in place)
+    :param start_method: multiprocessing start method, for processes only
+    :param timeout: seconds after which a task is considered stuck, for processes and distributed only
+    :param retries: number of times failed work is retried, for processes and distributed only
+    :param memory_budget: memory in bytes above which no more work is handed out; None for no limit
+    :param address: host:port on which to wait for workers, for distributed only
+
+    :returns: a WorkerPool, ThreadWorkerPool, SerialWorkerPool, or DistributedWorkerPool instance
+    """
+    if executor not in EXECUTORS:
+        raise ValueError("Unknown executor: {}".format(executor))
+
+    if executor == "distributed":
+        from auxiliarly.distributed import DistributedWorkerPool, address_of
+        if address is None:
+            raise ValueError("Missing coordinator address.")
+        if processes is None:
+            # the resources of this machine say nothing about the workers to wait for
+            raise ValueError("Missing number of workers.")
+
+        return DistributedWorkerPool(address_of(address), processes, resident, indexer, timeout, retries,
+                                     memory_budget=memory_budget)
+
+    if executor == "serial":
+        return SerialWorkerPool(resident, indexer)
+
+    if executor == "thread":
+        if not gil_enabled():
+            return ThreadWorkerPool(processes, resident, indexer, memory_budget)
+
+        logger.warning("GIL is enabled; falling back to process executor")
+
+    return WorkerPool(processes, resident, indexer, start_method, timeout, retries, memory_budget=memory_budget)
+
+class MemorySampler():
+    """ Mixin which reads the memory_in_use() of a pool at most once per MEMORY_SAMPLE_INTERVAL
+
+    The memory is checked before every task which is handed out, and reading it costs more
+    than a small task, so the last reading is kept until it is older than the interval.
+    """
+    sampled = (float("-inf"), 0)  # (time, memory in use) of the last reading
+
+    def sampled_memory_in_use(self):
+        """ Return the memory in bytes in use, as read at most MEMORY_SAMPLE_INTERVAL seconds ago """
+        if time() - self.sampled[0] >= MEMORY_SAMPLE_INTERVAL:
+            self.sampled = (time(), self.memory_in_use())
+
+        return self.sampled[1]
+
+class WorkerPool(MemorySampler):
+    """ Pool of worker processes which lives for a whole run
+
+    Inputs which are needed by all stages, such as the graphs, are handed to the workers
+    once by the initializer, which also derives indexes from them. Inputs of a single stage
+    are published with share(): they are written once to a scratch directory, and loaded
+    by each worker on its first task of that stage. Tasks themselves only carry their work
+    range, which keeps them lightweight.
+
+    Every worker runs one task at a time, so the pool knows which worker owns which work.
+    A worker which dies, for example by the OOM killer, or which exceeds the task timeout
+    is replaced by a fresh one, and its work is retried after a growing delay. Work which
+    keeps failing is skipped and recorded in failures, so that the run can continue with
+    partial results.
+
+    With a memory budget, no more work is handed out while the pool and the process which
+    owns it use more memory than the budget, until running work finishes and frees memory.
+    At least one task keeps running, so the work always progresses. The memory is read at
+    most once per MEMORY_SAMPLE_INTERVAL, as reading it scans the mappings of every worker.
+
+    Works with all start methods (fork, spawn, forkserver).
+    """
+    def __init__(self, processes=None, resident={}, indexer=None, start_method=None, timeout=None, retries=2,
+                 backoff=1.0, memory_budget=None):
+        """ Start the workers
+
+        :param processes: number of worker processes
+        :param resident: dictionary with inputs that stay resident during the entire run
+        :param indexer: function which derives additional inputs from the resident dictionary (updated in place)
+        :param start_method: multiprocessing start method; defaults to that of the platform
+        :param timeout: seconds after which a task is considered stuck; None to wait indefinitely
+        :param retries: number of times failed work is retried
+        :param backoff: delay in seconds before the first retry, doubled on every next one
+        :param memory_budget: memory in bytes above which no more work is handed out; None for no limit
+        """
+        self.logger = logging.getLogger(__name__)
+        self.logger.info("Starting pool of {} workers (start method: {})".format(processes,
+                                                                                 start_method or
+                                                                                 multiprocessing.get_start_method()))
+        self.scratch = tempfile.mkdtemp(prefix="minos-")
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.scratch, True)
+        self.stage = {}
+        self.version = 0
+        self.processes = processes if processes is not None else os.cpu_count()
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.memory_budget = memory_budget
+        self.failures = []
+
+        self.context = multiprocessing.get_context(start_method)
+        self.initargs = (resident, indexer)
+        self.workers = [self._start() for _ in range(self.processes)]
+
+    def share(self, **inputs):
+        """ Publish the read-only inputs of the next stage to all workers
+
+        :param inputs: inputs by name
+
+        :returns: none
+        """
+        for name, value in inputs.items():
+            self.version += 1
+            path = os.path.join(self.scratch, "{}-{}.pickle".format(name, self.version))
+            with open(path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+            self._remove(name)
+            self.stage[name] = (self.version, path)
+
+    def release(self, *names):
+        """ Let the workers drop inputs of a finished stage
+
+        :param names: names of the inputs
+
+        :returns: none
+        """
+        for name in names:
+            self.version += 1
+            self._remove(name)
+            self.stage[name] = (self.version, None)
+
+    def _remove(self, name):
+        if name in self.stage.keys() and self.stage[name][1] is not None:
+            os.remove(self.stage[name][1])
+
+    def imap_unordered(self, func, iterable, stage=None):
+        """ Run func on every item of work on the workers
+
+        :param func: a picklable function of one argument, the work
+        :param iterable: the work
+        :param stage: name under which failed work is recorded
+
+        :returns: an iterator over the results, in order of completion
+        """
+        stage = Stage(stage, func)
+        work = iter(iterable)
+
+        return (output for _, _, output in self._dispatch(lambda: _task_of(stage, next(work, None))))
+
+    def schedule(self, func, scheduler, stage=None):
+        """ Run func on the chunks handed out by a scheduler
+
+        The next chunk is only planned once a worker is free, so the scheduler can size it
+        on the durations of the chunks finished so far.
+
+        :param func: a picklable function of one argument, the work
+        :param scheduler: a scheduler instance, such as a TriangularScheduler
+        :param stage: name under which failed work is recorded
+
+        :returns: an iterator over the results, in order of completion
+        """
+        stage = Stage(stage, func, scheduler=scheduler)
+
+        return (output for _, _, output in self._dispatch(next_task_of([stage])))
+
+    def pipeline(self, stages):
+        """ Run the stages of a pipeline at the same time
+
+        Results are handed to the consumer of their stage as soon as they come in, which
+        may queue work for the next stage. Idle workers take the work of the latest stage
+        which has any, so that results flow through the pipeline rather than pile up.
+
+        :param stages: list of Stage instances, in order of the pipeline
+
+        :returns: none
+        """
+        for stage, work, output in self._dispatch(next_task_of(stages)):
+            stage.consume(work, output)
+
+    def failed(self, stage=None, since=0):
+        """ Return the work of a stage which failed on all attempts
+
+        :param stage: name of the stage
+        :param since: number of failures to skip, to only return those of a later run on the same pool
+
+        :returns: list of work items
+        """
+        return [work for name, work, _ in self.failures[since:] if name == stage]
+
+    def failure_report(self, since=0):
+        """ Return the failed work as a list of dictionaries, fit for the run metadata
+
+        :param since: number of failures to skip, to only report those of a later run on the same pool
+
+        :returns: list of dictionaries
+        """
+        return [{"stage": name, "work": _bounds_of(work), "reason": reason}
+                for name, work, reason in self.failures[since:]]
+
+    def _dispatch(self, next_task):
+        """ Run the tasks picked by next_task on the workers
+
+        :param next_task: function which returns a (stage, work) tuple, or None if there is no work for now
+
+        :returns: an iterator over (stage, work, output) tuples, in order of completion
+        """
+        stage_inputs = dict(self.stage)
+        retries = []  # heap of (not before, sequence number, stage, work, attempt)
+        sequence = count()
+        running = {}  # worker index -> (stage, work, attempt, start time)
+        while True:
+            self._admit(running)
+
+            # hand out work to idle workers, retries first once their delay has passed
+            for i in range(len(self.workers)):
+                if i in running.keys() or self.workers[i] is None:
+                    continue
+                if len(running) > 0 and self.over_budget():
+                    break
+
+                if len(retries) > 0 and retries[0][0] <= time():
+                    _, _, stage, work, attempt = heappop(retries)
+                else:
+                    task = next_task()
+                    if task is None:
+                        break
+                    (stage, work), attempt = task, 0
+
+                self._send(i, (stage.func, stage_inputs, work))
+                running[i] = (stage, work, attempt, time())
+
+            if len(running) <= 0:
+                if len(retries) <= 0:
+                    return
+
+                sleep(max(0.0, retries[0][0] - time()))
+                continue
+
+            ready = wait([waitable for i in running.keys() for waitable in self._waitables(i)],
+                         self._time_to_wait(running, retries))
+
+            for i in list(running.keys()):
+                process, connection = self.workers[i]
+                stage, work, attempt, start = running[i]
+
+                if connection in ready:
+                    try:
+                        duration, output, error = connection.recv()
+                    except (EOFError, OSError):
+                        reason = self._death_of(i)
+                    else:
+                        if error is None:
+                            del running[i]
+                            stage.feedback(work, duration)
+
+                            yield (stage, work, output)
+                            continue
+                        if not isinstance(error, MemoryError):
+                            raise error
+
+                        reason = "out of memory"
+                elif process.sentinel in ready:
+                    reason = self._death_of(i)
+                elif self.timeout is not None and time() - start > self.timeout:
+                    reason = "timed out after {} s".format(self.timeout)
+                else:
+                    continue
+
+                del running[i]
+                self._replace(i)
+                if attempt < self.retries:
+                    delay = self.backoff * 2 ** attempt
+                    self.logger.warning("Work {} of stage {} failed: {}; retrying in {} s".format(_bounds_of(work),
+                                                                                               stage.name,
+                                                                                               reason,
+                                                                                               delay))
+                    heappush(retries, (time() + delay, next(sequence), stage, work, attempt + 1))
+                else:
+                    self.logger.error("Work {} of stage {} failed: {}; skipped after {} attempts".format(_bounds_of(work),
+                                                                                                       stage.name,
+                                                                                                       reason,
+                                                                                                       attempt + 1))
+                    self.failures.append((stage.name, work, reason))
+                    stage.discard(work)
+
+    def memory_in_use(self):
+        """ Return the memory in bytes in use by the workers and the process which owns them """
+        return memory_in_use() + sum(memory_in_use(process.pid) for process, _ in self.workers)
+
+    def over_budget(self):
+        if self.memory_budget is None:
+            return False
+
+        in_use = self.sampled_memory_in_use()
+        if in_use <= self.memory_budget:
+            return False
+
+        self.logger.debug("Memory in use ({} MiB) exceeds budget; holding back work".format(in_use // 2**20))
+        return True
+
+    def _time_to_wait(self, running, retries):
+        """ Return the time until the first task times out or retry is due; None if there are none """
+        deadlines = [retries[0][0]] if len(retries) > 0 else []
+        if self.timeout is not None:
+            deadlines.extend([start + self.timeout for _, _, _, start in running.values()])
+        if len(deadlines) <= 0:
+            return None
+
+        return max(0.0, min(deadlines) - time())
+
+    def _admit(self, running):
+        """ Fill the slots of lost workers before work is handed out; workers of this pool are always replaced at once """
+        pass
+
+    def _send(self, i, task):
+        self.workers[i][1].send(task)
+
+    def _waitables(self, i):
+        process, connection = self.workers[i]
+
+        return [connection, process.sentinel]
+
+    def _death_of(self, i):
+        return _death_of(self.workers[i][0])
+
+    def _start(self):
+        connection, child_connection = self.context.Pipe()
+        process = self.context.Process(target=_work, args=(child_connection,) + self.initargs, daemon=True)
+        process.start()
+        child_connection.close()
+
+        return (process, connection)
+
+    def _replace(self, i):
+        """ Replace a dead or stuck worker by a fresh one """
+        process, connection = self.workers[i]
+        if process.is_alive():
+            process.kill()
+        process.join()
+        connection.close()
+
+        self.workers[i] = self._start()
+
+    def close(self):
+        for process, connection in self.workers:
+            try:
+                connection.send(None)
+            except OSError:  # worker died
+                pass
+        for process, connection in self.workers:
+            process.join()
+            connection.close()
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        for process, connection in self.workers:
+            process.kill()
+            process.join()
+            connection.close()
+        self._finalizer()
+
+class ThreadWorkerPool(MemorySampler):
+    """ Pool of worker threads which lives for a whole run
+
+    Drop-in replacement of WorkerPool for free-threaded builds of Python. The threads share
+    all inputs with the main thread as they are, without pickling or memory mapping: shared
+    inputs are simply made resident. Work is handed out as with WorkerPool, but threads can
+    neither be killed nor retried, so there are no timeouts and failing work raises.
+    """
+    def __init__(self, threads=None, resident={}, indexer=None, memory_budget=None):
+        """ Start the workers
+
+        :param threads: number of worker threads
+        :param resident: dictionary with inputs that stay resident during the entire run
+        :param indexer: function which derives additional inputs from the resident dictionary (updated in place)
+        :param memory_budget: memory in bytes above which no more work is handed out; None for no limit
+        """
+        self.logger = logging.getLogger(__name__)
+        self.logger.info("Starting pool of {} worker threads".format(threads))
+        self.processes = threads if threads is not None else os.cpu_count()
+        self.memory_budget = memory_budget
+        self.failures = []
+
+        _init(resident, indexer)
+        self.executor = ThreadPoolExecutor(max_workers=self.processes)
+
+    def share(self, **inputs):
+        """ Publish the read-only inputs of the next stage to all workers
+
+        :param inputs: inputs by name
+
+        :returns: none
+        """
+        _resident.update(inputs)
+
+    def release(self, *names):
+        """ Let the workers drop inputs of a finished stage
+
+        :param names: names of the inputs
+
+        :returns: none
+        """
+        for name in names:
+            _resident.pop(name, None)
+
+    def imap_unordered(self, func, iterable, stage=None):
+        stage = Stage(stage, func)
+        work = iter(iterable)
+
+        return (output for _, _, output in self._dispatch(lambda: _task_of(stage, next(work, None))))
+
+    def schedule(self, func, scheduler, stage=None):
+        stage = Stage(stage, func, scheduler=scheduler)
+
+        return (output for _, _, output in self._dispatch(next_task_of([stage])))
+
+    def pipeline(self, stages):
+        for stage, work, output in self._dispatch(next_task_of(stages)):
+            stage.consume(work, output)
+
+    def failed(self, stage=None, since=0):
+        return []
+
+    def failure_report(self, since=0):
+        return []
+
+    def _dispatch(self, next_task):
+        running = {}  # future -> stage
+        while True:
+            while len(running) < self.processes:
+                if len(running) > 0 and self.over_budget():
+                    break
+
+                task = next_task()
+                if task is None:
+                    break
+
+                stage, work = task
+                running[self.executor.submit(_run_timed, stage.func, work)] = stage
+
+            if len(running) <= 0:
+                return
+
+            done, _ = wait_for(running.keys(), return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                work, duration, output = future.result()
+                stage.feedback(work, duration)
+
+                yield (stage, work, output)
+
+    def memory_in_use(self):
+        return memory_in_use()
+
+    def over_budget(self):
+        return self.memory_budget is not None and self.sampled_memory_in_use() > self.memory_budget
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.executor.shutdown(cancel_futures=True)
+
+class SerialWorkerPool(ThreadWorkerPool):
+    """ Pool which runs all work in the calling process, one task at a time
+
+    Runs the same tasks as the other pools, without processes, threads, or pickling, which
+    makes it the reference to debug and profile the algorithms with.
+    """
+    def __init__(self, resident={}, indexer=None):
+        """ Make the inputs resident in the calling process
+
+        :param resident: dictionary with inputs that stay resident during the entire run
+        :param indexer: function which derives additional inputs from the resident dictionary (updated in place)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.logger.info("Running work serially")
+        self.processes = 1
+        self.memory_budget = None
+        self.failures = []
+
+        _init(resident, indexer)
+
+    def _dispatch(self, next_task):
+        while True:
+            task = next_task()
+            if task is None:
+                return
+
+            stage, work = task
+            work, duration, output = _run_timed(stage.func, work)
+            stage.feedback(work, duration)
+
+            yield (stage, work, output)
+
+    def close(self):
+        pass
+
+    def __exit__(self, *args):
+        pass
+
+def _run_timed(func, work):
+    t0 = timer()
+    output = func(work)
+
+    return (work, timer() - t0, output)
+
+def _task_of(stage, work):
+    return (stage, work) if work is not None else None
+
+def _death_of(process):
+    process.join(1)  # reap, to learn the exit code
+
+    return "worker died (exit code {})".format(process.exitcode)
+
+def _bounds_of(work):
+    if type(work) in (slice, range, Batch):
+        return [work.start, work.stop]
+
+    return work
+
+def _init(resident, indexer):
+    _resident.clear()
+    _resident.update(resident)
+    if indexer is not None:
+        indexer(_resident)
+
+def _work(connection, resident, indexer):
+    """ Run the tasks received on the connection until None is received """
+    _init(resident, indexer)
+    while True:
+        try:
+            task = connection.recv()
+        except EOFError:  # pool is gone
+            return
+        if task is None:
+            return
+
+        t0 = timer()
+        try:
+            output = _run(task)
+        except Exception as e:
+            connection.send((timer() - t0, None, e))
+        else:
+            connection.send((timer() - t0, output, None))
+
+def _run(task):
+    func, stage, work = task
+    for name, (version, path) in stage.items():
+        if _versions.get(name) == version:
+            continue
+
+        if path is None:
+            _resident.pop(name, None)
+        else:
+            with open(path, 'rb') as f:
+                _resident[name] = pickle.load(f)
+        _versions[name] = version
+
+    return func(work)
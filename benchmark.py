@@ -0,0 +1,106 @@
+#!/usr/bin/python3
+
+import logging
+import argparse
+import os
+import pickle
+import shutil
+import tempfile
+from datetime import datetime
+from timeit import default_timer as timer
+from auxiliarly.worker_pool import EXECUTORS, gil_enabled
+from writers.rule_set import _rule_to_string
+
+
+def run(args, time):
+    directive = args.directive.split('.')
+
+    mod = __import__('.'.join(directive[:-1]), fromlist=[directive[-1:]])
+    klass = getattr(mod, *directive[-1:])
+
+    if not gil_enabled():
+        print(" Free-threaded build without GIL\n")
+    else:
+        print(" GIL is enabled: the thread executor falls back to processes\n")
+
+    results = {}
+    scratch = tempfile.mkdtemp(prefix="minos-")
+    for executor in args.executors:
+        durations = []
+        for i in range(args.repetitions):
+            path = os.path.join(scratch, "{}-{}".format(executor, i))
+
+            overrides = {"executor": executor, "workers": args.workers}
+            if executor == "distributed":
+                overrides["coordinator"] = args.coordinator
+
+            t0 = timer()
+            klass(time).run(args.abox, args.tbox, path, False, **overrides)
+            durations.append(timer() - t0)
+
+        results[executor] = (durations, rules_of(path + ".pickle"))
+    shutil.rmtree(scratch, True)
+
+    print("\n {:<10} {:>10} {:>10} {:>10} {:>8}".format("executor", "min (s)", "mean (s)", "max (s)", "rules"))
+    for executor, (durations, rules) in results.items():
+        print(" {:<10} {:>10.3f} {:>10.3f} {:>10.3f} {:>8}".format(executor,
+                                                                   min(durations),
+                                                                   sum(durations) / len(durations),
+                                                                   max(durations),
+                                                                   len(rules)))
+
+    rule_sets = [rules for _, rules in results.values()]
+    print("\n Identical rules: {}".format(False not in [rules == rule_sets[0] for rules in rule_sets]))
+
+def rules_of(path):
+    """ Read the rules of a run, as strings in the order of the rule base """
+    if not os.path.exists(path):  # no rules were found
+        return []
+
+    with open(path, 'rb') as f:
+        rule_base = pickle.load(f)
+
+    return [_rule_to_string(irule) for irule in rule_base.model]
+
+def print_header():
+    header = 'An Experimental Pipeline for Data Mining on Linked Archaeological Data'
+    print('=' * len(header))
+    print(header)
+    print('=' * len(header))
+
+def set_logging(args, time):
+    logging.basicConfig(filename='./logs/{}.log'.format(time),
+                        format='%(asctime)s %(levelname)s: %(message)s',
+                        level=logging.INFO)
+
+    if args.verbose:
+        logging.getLogger().addHandler(logging.StreamHandler())
+
+if __name__ == "__main__":
+    time = datetime.now().isoformat()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-a", "--abox", help="ABox graph", default=None)
+    parser.add_argument("-c", "--coordinator", help="HOST:PORT on which to wait for workers (distributed executor)",
+                        default=None)
+    parser.add_argument("-d", "--directive", help="MP directive for rule learning", default=None)
+    parser.add_argument("-e", "--executors", help="Executors to compare; all but distributed by default", nargs="+",
+                        choices=EXECUTORS, default=[executor for executor in EXECUTORS if executor != "distributed"])
+    parser.add_argument("-n", "--repetitions", help="Number of runs per executor", type=int, default=3)
+    parser.add_argument("-t", "--tbox", help="TBox graph", default=None)
+    parser.add_argument("-v", "--verbose", help="increase output verbosity", action="store_true")
+    parser.add_argument("-w", "--workers", help="Number of workers of every executor; defaults to the CPU limit, except for the distributed executor",
+                        type=int, default=None)
+    args = parser.parse_args()
+    if "distributed" in args.executors and args.workers is None:
+        parser.error("the distributed executor requires the number of workers to wait for (-w)")
+
+    set_logging(args, time)
+    logger = logging.getLogger(__name__)
+    logger.info("Arguments:\n{}".format(
+        "\n".join(["\t{}: {}".format(arg,getattr(args, arg)) for arg in vars(args)])))
+
+    print_header()
+    run(args, time)
+
+    logging.shutdown()
@@ -0,0 +1,152 @@
+#!/usr/bin/python3
+
+import logging
+from timeit import default_timer as timer
+from .abstract_instruction_set import AbstractInstructionSet
+from readers import rdf
+from writers import rule_set, pickler, metadata
+from ui import rule_evaluator
+from auxiliarly.artifact_cache import ArtifactCache, definition_of
+from algorithms.mining_engine import DEFAULT_PARAMETERS, run_directive
+from algorithms.dataset_mining import mine_datasets
+
+
+class AbstractMPInstructionSet(AbstractInstructionSet):
+    """ Instruction set which mines its dataset on the mining engine
+
+    A directive only defines its header, the sampling of its ABox, and the parameters which
+    set it apart; loading, mining, and writing are the same for all MP directives.
+    """
+    def __init__(self, time=""):
+        self.time = time
+        self.logger = logging.getLogger(self.__module__)
+        self.cache = ArtifactCache()
+
+    def sampling(self, parameters):
+        """ Return the sampling of the ABox as (sampler, patterns, options) tuple; None to mine all of the ABox
+
+        :param parameters: dictionary with the parameters of the directive
+
+        :returns: a tuple of a sampler module, a list of triple patterns which match the individuals to sample, and a
+                  dictionary with the other arguments of the sampler; or None
+        """
+        return None
+
+    def load_dataset(self, abox, tbox, parameters):
+        # read graphs
+        kg_i = rdf.read(local_path=abox)
+        kg_s = rdf.read(local_path=tbox)
+
+        # the incremental miner samples the ABox itself, as it samples later changes to it
+        sampling = self.sampling(parameters)
+        if sampling is None or parameters["state"] is not None:
+            return (kg_i, kg_s, None)
+
+        # sample by pattern
+        sampler, patterns, options = sampling
+        kg_i_sampled = kg_i.sample(sampler, patterns=patterns, **options)
+        if "context" not in options.keys():
+            return (kg_i_sampled, kg_s, None)
+
+        # context paths of the sample, and the individuals they start at, if sampled by definition
+        individuals = frozenset(s for s in sampler.individuals_of(kg_i, patterns) if (s, None, None) in kg_i_sampled.graph)
+        return (kg_i_sampled, kg_s, (options["context"], individuals))
+
+    def run_program(self, dataset, parameters, key=None):
+        """ Mine the dataset with the parameters of the directive
+
+        :param dataset: tuple of the sampled ABox and the TBox as knowledge graphs, and the context paths of the sample and the individuals they start at or None
+        :param parameters: dictionary with the parameters of the directive
+        :param key: key of the dataset in the cache
+
+        :returns: a tuple of a RuleBase instance with the rules, and a (knowledge graph, item sets) tuple with the
+                  graph and item sets they were mined on
+        """
+        self.logger.info("Starting run\nParameters:\n{}".format(
+            "\n".join(["\t{}: {}".format(k,v) for k,v in parameters.items()])))
+
+        # fit model
+        t0 = timer()
+
+        rule_base, mined = run_directive(dataset, parameters, self.cache, key, self.sampling(parameters))
+
+        # time took
+        t1 = timer()
+        dt = t1 - t0
+        self.logger.info("Program completed in {:.3f} ms".format(dt))
+        print("  Program completed in {:.3f} ms".format(dt))
+
+        if not rule_base.metadata["complete"]:
+            self.logger.info("Incomplete run; coverage per stage:\n{}".format(
+                "\n".join(["\t{}: {} / {}".format(k, *v) for k, v in rule_base.metadata["coverage"].items()])))
+            if rule_base.metadata["expired"]:
+                print("  Time budget expired; returning partial results")
+        if len(rule_base.metadata["failed"]) > 0:
+            self.logger.info("Failed work:\n{}".format(
+                "\n".join(["\t{}: {} ({})".format(f["stage"], f["work"], f["reason"])
+                           for f in rule_base.metadata["failed"]])))
+            print("  {} slices failed; returning partial results".format(len(rule_base.metadata["failed"])))
+
+        self.logger.info("Found {} rules".format(rule_base.size()))
+        print("  Found {} rules".format(rule_base.size()))
+        return (rule_base, mined)
+
+    def write_to_file(self, path="./of/latest", output=[]):
+        overwrite = False
+        compress = True
+
+        print(" Writing output to {}...".format(path))
+        rule_set.pretty_write(output, path, overwrite, compress)
+        pickler.write(output, path+".pickle", overwrite)
+        metadata.write(output.metadata, path+".meta", overwrite)
+
+    def run(self, abox, tbox, output_path, interactive=False, **overrides):
+        """ Mine the ABox with the parameters of the directive
+
+        :param abox: path of the ABox graph
+        :param tbox: path of the TBox graph
+        :param output_path: path to write the rules to
+        :param interactive: review the rules before they are written
+        :param overrides: parameters which replace those of the directive, see DEFAULT_PARAMETERS
+
+        :returns: none
+        """
+        self.print_header()
+        print(" {}\n".format(self.time))
+
+        parameters = dict(DEFAULT_PARAMETERS)
+        parameters.update(overrides)
+
+        if parameters["state"] is not None and type(self).load_dataset is not AbstractMPInstructionSet.load_dataset:
+            # changes to the ABox can only be sampled as the ABox is by a sampling()
+            raise ValueError("Incremental mining does not support directives which load their own dataset")
+
+        # every stage is cached under a key of its input files, the sampling definition, and its parameters
+        self.cache = ArtifactCache(parameters["cache"])
+
+        def dataset_of(abox):
+            key = self.cache.key_of("dataset",
+                                    self.cache.digest_of_file(abox),
+                                    self.cache.digest_of_file(tbox),
+                                    definition_of(self.load_dataset),
+                                    definition_of(self.sampling),
+                                    parameters.get("sample_depth"),
+                                    parameters["state"] is not None)
+
+            return (self.cache.computed(key, self.load_dataset, abox, tbox, parameters), key)
+
+        if parameters["datasets"] is not None:
+            # mine every dataset on its own, and merge their counts into rules over all datasets
+            output = mine_datasets(self, dataset_of, parameters["datasets"], output_path, parameters)
+        else:
+            print(" Importing Data Sets...")
+            dataset, key = dataset_of(abox)
+
+            print(" Initiated Pattern Learning...")
+            output, _ = self.run_program(dataset, parameters, key)
+
+        if interactive:
+           output = rule_evaluator.cli(output)
+        else:
+            # also without rules, so that the coverage of the run is kept
+            self.write_to_file(output_path, output)
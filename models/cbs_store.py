@@ -0,0 +1,223 @@
+#!/usr/bin/python3
+
+import logging
+import gzip
+import os
+import shutil
+import tempfile
+import weakref
+import numpy as np
+
+
+# size in bytes of the buffers in which runs are compressed and read back
+BLOCK_SIZE = 4 * 2**20
+
+class CBSStore:
+    """ CBSStore class
+    Encoded Common Behaviour Sets (CBS), held in memory up to a budget and spilled to disk beyond it
+
+    Every CBS is a row of sorted item IDs, padded with -1 up to the width of the store, plus
+    its similarity. Once the buffered rows take more memory than the budget, they are sorted
+    and written to the scratch directory as a compressed run. merge() combines all runs in a
+    streaming k-way merge into a single table, which workers memory map, so that memory is
+    bounded by the budget rather than by the number of CBS.
+
+    The rows are sorted on their item IDs, then on their similarity, which makes the merged
+    table the same for any budget.
+    """
+    directory = None
+    width = None
+    budget = None
+    runs = None
+    size = None
+
+    def __init__(self, directory=None, width=2, budget=None):
+        """ Create an empty store
+
+        :param directory: scratch directory for the runs and merged tables; defaults to a new temporary directory
+        :param width: maximum number of items per CBS
+        :param budget: memory in bytes above which the buffered rows are spilled; None to keep them in memory
+        """
+        self.logger = logging.getLogger(__name__)
+        self.width = width
+        self.budget = budget
+        self.runs = []
+        self.size = 0
+
+        self.directory = directory if directory is not None else tempfile.mkdtemp(prefix="minos-")
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.directory, True)
+        self._buffer = []
+        self._buffered = 0
+
+    def __len__(self):
+        return self.size
+
+    def dtype(self):
+        return row_type(self.width)
+
+    ### Operators ###
+
+    def extend(self, cbs_ids=[], similarities=[]):
+        """ Add CBS to the store
+
+        :param cbs_ids: list of tuples of item IDs
+        :param similarities: list with the similarity of each CBS
+
+        :returns: none
+        """
+        rows = np.zeros(len(cbs_ids), dtype=self.dtype())
+        rows["items"] = -1
+        for k, ids in enumerate(cbs_ids):
+            rows["items"][k, :len(ids)] = sorted(ids)
+        rows["similarity"] = similarities
+
+        self.append(rows)
+
+    def append(self, rows):
+        """ Add rows of encoded CBS, as returned by the workers """
+        if len(rows) <= 0:
+            return
+
+        self._buffer.append(rows)
+        self._buffered += rows.nbytes
+        self.size += len(rows)
+
+        if self.budget is not None and self._buffered >= self.budget:
+            self.spill()
+
+    def spill(self):
+        """ Write the buffered rows to disk as a sorted, compressed run """
+        rows = self._sorted_buffer()
+        if len(rows) <= 0:
+            return
+
+        path = os.path.join(self.directory, "run-{}.gz".format(len(self.runs)))
+        with gzip.open(path, 'wb', compresslevel=1) as f:
+            for start in range(0, len(rows), _rows_per_block(rows.dtype)):
+                f.write(rows[start:start+_rows_per_block(rows.dtype)].tobytes())
+        self.runs.append(path)
+
+        self.logger.debug("Spilled {} CBS to {}".format(len(rows), path))
+
+    def merge(self):
+        """ Merge all rows into a single sorted table on disk, and empty the store
+
+        :returns: the directory of the table, as read by table_of()
+        """
+        directory = tempfile.mkdtemp(prefix="table-", dir=self.directory)
+        table = np.lib.format.open_memmap(os.path.join(directory, "cbs.npy"),
+                                          mode='w+',
+                                          dtype=self.dtype(),
+                                          shape=(self.size,))
+
+        # once spilled, all rows go to disk and every run is read a block at a time, so that
+        # the blocks of all runs together fit the budget
+        if len(self.runs) > 0:
+            self.spill()
+            blocks = [_blocks_of(path, self.dtype(), self._rows_per_run()) for path in self.runs]
+        else:
+            blocks = [iter([rows]) for rows in [self._sorted_buffer()] if len(rows) > 0]
+
+        start = 0
+        for rows in _merged(blocks):
+            table[start:start+len(rows)] = rows
+            start += len(rows)
+        table.flush()
+        del table
+
+        self.logger.info("Merged {} CBS from {} runs into {}".format(self.size, len(self.runs), directory))
+        for path in self.runs:
+            os.remove(path)
+        self.runs = []
+        self.size = 0
+
+        return directory
+
+    def close(self):
+        self._buffer = []
+        self._finalizer()
+
+    def _sorted_buffer(self):
+        rows = np.concatenate(self._buffer) if len(self._buffer) > 0 else np.zeros(0, dtype=self.dtype())
+        self._buffer = []
+        self._buffered = 0
+
+        return rows[_order_of(rows)]
+
+    def _rows_per_run(self):
+        return max(1, self.budget // len(self.runs) // self.dtype().itemsize)
+
+
+### Independent Functions ##
+
+def row_type(width=2):
+    """ Return the record type of an encoded CBS of at most width items """
+    return np.dtype([("items", np.int64, (width,)), ("similarity", np.float64)])
+
+def table_of(directory):
+    """ Memory map a table written by CBSStore.merge() """
+    return np.load(os.path.join(directory, "cbs.npy"), mmap_mode='r')
+
+def items_of(row):
+    """ Return the item IDs of an encoded CBS, without padding """
+    return row["items"][row["items"] >= 0]
+
+def _order_of(rows):
+    """ Return the order of rows on their items, then their similarity """
+    keys = [rows["similarity"]] + [rows["items"][:, c] for c in reversed(range(rows["items"].shape[1]))]
+
+    return np.lexsort(keys)
+
+def _rows_per_block(dtype):
+    return max(1, BLOCK_SIZE // dtype.itemsize)
+
+def _blocks_of(path, dtype, rows_per_block):
+    """ Read a run back in blocks of rows """
+    with gzip.open(path, 'rb') as f:
+        while True:
+            data = f.read(rows_per_block * dtype.itemsize)
+            if len(data) <= 0:
+                return
+
+            yield np.frombuffer(data, dtype=dtype)
+
+def _merged(blocks):
+    """ Merge sorted runs, given as iterators over blocks of rows, into sorted blocks
+
+    The smallest of the last rows of the current blocks bounds what can be passed on: no
+    row yet to be read from any run sorts before it.
+    """
+    heads = [next(run, None) for run in blocks]
+    while True:
+        live = [k for k in range(len(heads)) if heads[k] is not None]
+        if len(live) <= 0:
+            return
+
+        bound = min(_key_of(heads[k][-1]) for k in live)
+        parts = []
+        for k in live:
+            m = int(np.sum(_not_after(heads[k], bound)))
+            parts.append(heads[k][:m])
+            heads[k] = heads[k][m:]
+            if len(heads[k]) <= 0:
+                heads[k] = next(blocks[k], None)
+
+        rows = np.concatenate(parts)
+        yield rows[_order_of(rows)]
+
+def _key_of(row):
+    return tuple(row["items"].tolist()) + (float(row["similarity"]),)
+
+def _not_after(rows, key):
+    """ Return which rows sort before or equal to a key, comparing column by column """
+    columns = [rows["items"][:, c] for c in range(rows["items"].shape[1])] + [rows["similarity"]]
+    before = np.zeros(len(rows), dtype=bool)
+    equal = np.ones(len(rows), dtype=bool)
+    for column, value in zip(columns, key):
+        before |= equal & (column < value)
+        equal &= column == value
+
+    return before | equal
+
+if __name__ == "__main__":
+    print("Store of encoded Common Behaviour Sets")
@@ -0,0 +1,167 @@
+#!/usr/bin/python3
+
+import logging
+import numpy as np
+from rdflib.namespace import RDF
+from models.encoded_graph import term_key, branch_of
+
+
+class DeltaIndex:
+    """ DeltaIndex class
+    A dictionary-encoded index of a knowledge graph which, unlike EncodedGraph, is updated in place
+
+    It answers the same questions as EncodedGraph, so that the functions which generate and
+    evaluate rules on an encoded graph run on it unchanged, but it holds sets rather than
+    flat arrays. Adding or removing a fact only touches the entries of its subject and item,
+    so the cost of an update follows the size of the update rather than that of the graph.
+
+    Every fact (s, p, o) puts s in the item set of (p, o), as generate_semantic_item_sets()
+    does; facts with rdf:type also make s a member of class o. IDs are handed out in order of
+    arrival and are never reused: an item whose item set empties keeps its ID.
+    """
+    ontology_graph = None
+    terms = None
+    items = None
+
+    def __init__(self, ontology_graph=None):
+        """ Create an empty index
+
+        :param ontology_graph: a KnowledgeGraph instance holding the class hierarchy
+        """
+        self.logger = logging.getLogger(__name__)
+        self.ontology_graph = ontology_graph
+        self.terms = []
+        self.items = []
+
+        self.term_ids = {}
+        self.item_ids = {}
+        self._postings = []  # item ID -> set of subject IDs
+        self._subject_items = {}  # subject ID -> set of item IDs
+        self._members = {}  # class ID -> set of subject IDs
+        self._types = {}  # subject ID -> set of class IDs
+        self._branches = {}  # class ID -> frozenset of class IDs
+        self._member_arrays = {}  # class ID -> sorted array of member IDs, as asked for since the last update
+
+    ### Accessors ###
+
+    def number_of_items(self):
+        return len(self.items)
+
+    def number_of_terms(self):
+        return len(self.terms)
+
+    def postings(self, item):
+        """ Return the sorted subject IDs of an item set """
+        return _array_of(self._postings[item])
+
+    def posting_size(self, item):
+        return len(self._postings[item])
+
+    def posting_set(self, item):
+        """ Return the subject IDs of an item set, as the set held by the index; not to be changed """
+        return self._postings[item]
+
+    def items_of_subject(self, subject):
+        """ Return the item IDs of a subject, as the set held by the index; not to be changed """
+        return self._subject_items.get(subject, frozenset())
+
+    def members_of(self, ctype):
+        """ Return the sorted IDs of the members of a class """
+        # every rule of a class counts its members, so these are kept until they change
+        if ctype not in self._member_arrays.keys():
+            self._member_arrays[ctype] = _array_of(self._members.get(ctype, ()))
+
+        return self._member_arrays[ctype]
+
+    def types_of(self, subject):
+        return _array_of(self._types.get(subject, ()))
+
+    def branch_of(self, ctype):
+        """ Return the classes on the upward branch of a class, up to the first multiple inheritance """
+        if ctype not in self._branches.keys():
+            self._branches[ctype] = frozenset(self._id_of(c) for c in branch_of(self.ontology_graph, self.terms[ctype]))
+
+        return self._branches[ctype]
+
+    def order_of(self, i):
+        """ Return the key on which a term is ordered among all terms, as EncodedGraph numbers them """
+        return term_key(self.terms[i])
+
+    def term_of(self, i):
+        return self.terms[i]
+
+    def item_of(self, i):
+        return self.items[i]
+
+    def ids_of_items(self, items):
+        return tuple(self.item_ids[item] for item in items)
+
+    ### Operators ###
+
+    def update(self, added=[], removed=[]):
+        """ Add and remove facts
+
+        Removals go first, so that a fact which is both removed and added stays.
+
+        :param added: iterable of (s, p, o) triples
+        :param removed: iterable of (s, p, o) triples
+
+        :returns: a (items, subjects, classes) tuple with the IDs of the items whose item
+                  set changed, the subjects whose types changed, and the classes whose members changed
+        """
+        items = set()
+        subjects = set()
+        classes = set()
+        for facts, add in ((removed, False), (added, True)):
+            for s, p, o in facts:
+                s = self._id_of(s)
+                i = self._item_id_of((p, o))
+                if (s in self._postings[i]) == add:
+                    continue
+
+                if add:
+                    self._postings[i].add(s)
+                    self._subject_items.setdefault(s, set()).add(i)
+                else:
+                    self._postings[i].discard(s)
+                    self._subject_items[s].discard(i)
+                items.add(i)
+
+                if p == RDF.type:
+                    ctype = self._id_of(o)
+                    if add:
+                        self._members.setdefault(ctype, set()).add(s)
+                        self._types.setdefault(s, set()).add(ctype)
+                    else:
+                        self._members[ctype].discard(s)
+                        self._types[s].discard(ctype)
+                    subjects.add(s)
+                    classes.add(ctype)
+                    self._member_arrays.pop(ctype, None)
+
+        self.logger.debug("Updated {} item sets and the types of {} subjects".format(len(items), len(subjects)))
+        return (items, subjects, classes)
+
+    def _id_of(self, term):
+        if term not in self.term_ids.keys():
+            self.term_ids[term] = len(self.terms)
+            self.terms.append(term)
+
+        return self.term_ids[term]
+
+    def _item_id_of(self, item):
+        if item not in self.item_ids.keys():
+            self.item_ids[item] = len(self.items)
+            self.items.append(item)
+            self._postings.append(set())
+
+        return self.item_ids[item]
+
+
+### Independent Functions ##
+
+def _array_of(ids):
+    return np.array(sorted(ids), dtype=np.int64)
+
+if __name__ == "__main__":
+    print("Updatable index of a Knowledge Graph")
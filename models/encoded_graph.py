@@ -0,0 +1,403 @@
+#!/usr/bin/python3
+
+import logging
+import os
+import shutil
+import tempfile
+import weakref
+import numpy as np
+from rdflib.namespace import RDF, RDFS
+
+
+class EncodedGraph:
+    """ EncodedGraph class
+    A read-only, dictionary-encoded copy of a knowledge graph and its semantic item sets
+
+    All terms are replaced by integer IDs, and the item sets by their position in the list
+    they were encoded from. The data is kept as flat arrays in compressed sparse row form:
+
+        posting_*: item ID -> sorted subject IDs (the item set)
+        subject_item_*: subject ID -> item IDs (the encoded facts)
+        type_*: class ID -> sorted member IDs
+        subject_type_*: subject ID -> class IDs
+        branch_*: class ID -> class IDs on its upward class hierarchy branch
+
+    The arrays are stored as .npy files and memory mapped, so any number of worker processes
+    can attach to them without copying or pickling. The term dictionary only lives in the
+    process which encoded the graph.
+    """
+    ARRAYS = ("posting_offsets", "posting_subjects",
+              "subject_item_offsets", "subject_items",
+              "type_offsets", "type_members",
+              "subject_type_offsets", "subject_types",
+              "branch_offsets", "branch_classes")
+
+    directory = None
+    arrays = None
+    terms = None
+    items = None
+    item_ids = None
+
+    def __init__(self, directory=None, arrays=None, terms=None, items=None):
+        self.logger = logging.getLogger(__name__)
+        self.directory = directory
+        self.arrays = arrays
+        self.terms = terms
+        self.items = items
+        if items is not None:
+            self.item_ids = {item: i for i, item in enumerate(items)}
+
+        self._posting_sizes = None
+        self._branches = {}
+        self._finalizer = None
+
+    ### Accessors ###
+
+    def number_of_items(self):
+        return len(self.arrays["posting_offsets"]) - 1
+
+    def number_of_terms(self):
+        return len(self.arrays["subject_item_offsets"]) - 1
+
+    def nbytes(self):
+        """ Return the size in bytes of all arrays """
+        return sum(self.arrays[name].nbytes for name in self.ARRAYS)
+
+    def postings(self, item):
+        """ Return the sorted subject IDs of an item set """
+        return _row(self.arrays["posting_offsets"], self.arrays["posting_subjects"], item)
+
+    def postings_of(self, items):
+        """ Return the concatenated subject IDs of one or more item sets """
+        return _rows(self.arrays["posting_offsets"], self.arrays["posting_subjects"], items)
+
+    def posting_sizes(self):
+        if self._posting_sizes is None:
+            self._posting_sizes = np.diff(self.arrays["posting_offsets"])
+
+        return self._posting_sizes
+
+    def co_item_counts(self):
+        """ Return, per item set, the total number of items of its elements """
+        items_per_subject = np.diff(self.arrays["subject_item_offsets"])
+        cumulative = np.zeros(len(self.arrays["posting_subjects"]) + 1, dtype=np.int64)
+        np.cumsum(items_per_subject[self.arrays["posting_subjects"]], out=cumulative[1:])
+
+        offsets = self.arrays["posting_offsets"]
+        return cumulative[offsets[1:]] - cumulative[offsets[:-1]]
+
+    def items_of(self, subjects):
+        """ Return the concatenated item IDs of one or more subjects """
+        return _rows(self.arrays["subject_item_offsets"], self.arrays["subject_items"], subjects)
+
+    def members_of(self, ctype):
+        """ Return the sorted IDs of the members of a class """
+        return _row(self.arrays["type_offsets"], self.arrays["type_members"], ctype)
+
+    def types_of(self, subject):
+        return _row(self.arrays["subject_type_offsets"], self.arrays["subject_types"], subject)
+
+    def branch_of(self, ctype):
+        """ Return the classes on the upward branch of a class, up to the first multiple inheritance """
+        if ctype not in self._branches.keys():
+            self._branches[ctype] = frozenset(int(c) for c in _row(self.arrays["branch_offsets"],
+                                                                   self.arrays["branch_classes"],
+                                                                   ctype))
+
+        return self._branches[ctype]
+
+    def order_of(self, i):
+        """ Return the key on which a term is ordered among all terms; terms are numbered in that order """
+        return i
+
+    def term_of(self, i):
+        return self.terms[i]
+
+    def item_of(self, i):
+        return self.items[i]
+
+    def ids_of_items(self, items):
+        return tuple(self.item_ids[item] for item in items)
+
+    ### Operators ###
+
+    def close(self):
+        """ Remove the stored arrays; only to be called by the process which encoded the graph """
+        self.arrays = None
+        if self._finalizer is not None:
+            self._finalizer()
+
+class EncodedFacts:
+    """ EncodedFacts class
+    A read-only, dictionary-encoded copy of the facts of a knowledge graph, by subject
+
+    Terms are numbered in sorted order, as by encode(), and the facts are kept in compressed
+    sparse row form, stored, and memory mapped as the arrays of an EncodedGraph are:
+
+        fact_*: subject ID -> (predicate ID, object ID) pairs, sorted
+
+    Workers which generate item sets attach to the arrays and only read the rows of the
+    subjects they are handed, rather than receiving the whole graph.
+    """
+    ARRAYS = ("fact_offsets", "fact_predicates", "fact_objects")
+
+    directory = None
+    arrays = None
+    terms = None
+    term_ids = None
+
+    def __init__(self, directory=None, arrays=None, terms=None):
+        self.logger = logging.getLogger(__name__)
+        self.directory = directory
+        self.arrays = arrays
+        self.terms = terms
+        if terms is not None:
+            self.term_ids = {term: i for i, term in enumerate(terms)}
+
+        self._finalizer = None
+
+    ### Accessors ###
+
+    def number_of_terms(self):
+        return len(self.arrays["fact_offsets"]) - 1
+
+    def number_of_facts(self):
+        return len(self.arrays["fact_predicates"])
+
+    def nbytes(self):
+        """ Return the size in bytes of all arrays """
+        return sum(self.arrays[name].nbytes for name in self.ARRAYS)
+
+    def facts_of(self, subjects):
+        """ Return the facts of one or more subjects
+
+        :param subjects: array of subject IDs
+
+        :returns: a (positions, predicate IDs, object IDs) tuple of arrays, with the position of the subject of every fact in subjects
+        """
+        offsets = self.arrays["fact_offsets"]
+        subjects = np.asarray(subjects, dtype=np.int64)
+        positions = np.repeat(np.arange(len(subjects)), offsets[subjects + 1] - offsets[subjects])
+
+        return (positions,
+                _rows(offsets, self.arrays["fact_predicates"], subjects),
+                _rows(offsets, self.arrays["fact_objects"], subjects))
+
+    def subject_ranges(self, number=1):
+        """ Split the subject IDs into ranges with about as many facts each
+
+        :param number: number of ranges
+
+        :returns: list of ranges of subject IDs, without empty ranges
+        """
+        offsets = self.arrays["fact_offsets"]
+        bounds = np.searchsorted(offsets, np.linspace(0, offsets[-1], number + 1), side="left")
+        bounds[0], bounds[-1] = 0, self.number_of_terms()
+
+        return [range(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+    def term_of(self, i):
+        return self.terms[i]
+
+    def id_of(self, term):
+        """ Return the ID of a term, or -1 if the term does not occur in the graph """
+        return self.term_ids.get(term, -1)
+
+    ### Operators ###
+
+    def close(self):
+        """ Remove the stored arrays; only to be called by the process which encoded the facts """
+        self.arrays = None
+        if self._finalizer is not None:
+            self._finalizer()
+
+
+### Independent Functions ##
+
+def encode(instance_graph=None, ontology_graph=None, item_sets=[], directory=None):
+    """ Encode a knowledge graph and its semantic item sets into memory-mappable arrays
+
+    :param instance_graph: a KnowledgeGraph instance holding the facts
+    :param ontology_graph: a KnowledgeGraph instance holding the class hierarchy
+    :param item_sets: list of ((p, o), item set) tuples; the position of each tuple becomes its item ID
+    :param directory: directory to store the arrays in; defaults to a new temporary directory
+
+    :returns: an EncodedGraph instance, which removes the directory once closed
+    """
+    if instance_graph is None or ontology_graph is None:
+        raise ValueError("Missing input values.")
+
+    logger = logging.getLogger(__name__)
+    logger.info("Encoding graph and {} Semantic Item Sets".format(len(item_sets)))
+
+    # terms are numbered in sorted order, so that their IDs, and any order derived from them,
+    # do not depend on the hashes of the process or the order of the item sets
+    type_pairs = list(instance_graph.graph.subject_objects(RDF.type))
+    branches = {ctype: branch_of(ontology_graph, ctype) for ctype in {ctype for _, ctype in type_pairs}}
+    terms = set()
+    for _, es in item_sets:
+        terms.update(es)
+    for s, ctype in type_pairs:
+        terms.add(s)
+    for branch in branches.values():
+        terms.update(branch)
+    terms = sorted(terms, key=term_key)
+    term_ids = {term: i for i, term in enumerate(terms)}
+
+    # item sets
+    posting_items = []
+    posting_subjects = []
+    for i, (_, es) in enumerate(item_sets):
+        posting_items.extend([i] * len(es))
+        posting_subjects.extend(term_ids[s] for s in es)
+
+    # class membership
+    type_subjects = [term_ids[s] for s, _ in type_pairs]
+    type_classes = [term_ids[ctype] for _, ctype in type_pairs]
+
+    # upward branches of all classes in use
+    branch_keys = []
+    branch_classes = []
+    for ctype, branch in branches.items():
+        branch_keys.extend([term_ids[ctype]] * len(branch))
+        branch_classes.extend(term_ids[c] for c in branch)
+
+    n = len(terms)
+    arrays = {}
+    posting_items = np.array(posting_items, dtype=np.int64)
+    posting_subjects = np.array(posting_subjects, dtype=np.int64)
+    type_subjects = np.array(type_subjects, dtype=np.int64)
+    type_classes = np.array(type_classes, dtype=np.int64)
+    arrays["posting_offsets"], arrays["posting_subjects"] = _csr(posting_items, posting_subjects, len(item_sets))
+    arrays["subject_item_offsets"], arrays["subject_items"] = _csr(posting_subjects, posting_items, n)
+    arrays["type_offsets"], arrays["type_members"] = _csr(type_classes, type_subjects, n)
+    arrays["subject_type_offsets"], arrays["subject_types"] = _csr(type_subjects, type_classes, n)
+    arrays["branch_offsets"], arrays["branch_classes"] = _csr(np.array(branch_keys, dtype=np.int64),
+                                                              np.array(branch_classes, dtype=np.int64),
+                                                              n)
+
+    if directory is None:
+        directory = tempfile.mkdtemp(prefix="minos-")
+    for name in EncodedGraph.ARRAYS:
+        np.save(os.path.join(directory, name + ".npy"), arrays[name])
+
+    encoded_graph = EncodedGraph(directory, _load(directory), terms, [pa for pa, _ in item_sets])
+    encoded_graph._finalizer = weakref.finalize(encoded_graph, shutil.rmtree, directory, True)
+
+    logger.info("Encoded {} terms and {} facts into {}".format(n, len(posting_subjects), directory))
+    return encoded_graph
+
+def encode_facts(instance_graph=None, directory=None):
+    """ Encode the facts of a knowledge graph into memory-mappable arrays, by subject
+
+    :param instance_graph: a KnowledgeGraph instance holding the facts
+    :param directory: directory to store the arrays in; defaults to a new temporary directory
+
+    :returns: an EncodedFacts instance, which removes the directory once closed
+    """
+    if instance_graph is None:
+        raise ValueError("Missing input values.")
+
+    logger = logging.getLogger(__name__)
+    logger.info("Encoding {} facts".format(len(instance_graph.graph)))
+
+    # terms are numbered in sorted order, as by encode(), so that the order of the items
+    # derived from them does not depend on the process
+    terms = set()
+    for s, p, o in instance_graph.graph:
+        terms.update((s, p, o))
+    terms = sorted(terms, key=term_key)
+    term_ids = {term: i for i, term in enumerate(terms)}
+
+    facts = np.array([(term_ids[s], term_ids[p], term_ids[o]) for s, p, o in instance_graph.graph],
+                     dtype=np.int64).reshape(-1, 3)
+
+    n = len(terms)
+    arrays = {}
+    arrays["fact_offsets"], pairs = _csr(facts[:, 0], facts[:, 1] * n + facts[:, 2], n)
+    arrays["fact_predicates"] = _narrowed(pairs // n)
+    arrays["fact_objects"] = _narrowed(pairs % n)
+
+    if directory is None:
+        directory = tempfile.mkdtemp(prefix="minos-")
+    for name in EncodedFacts.ARRAYS:
+        np.save(os.path.join(directory, name + ".npy"), arrays[name])
+
+    encoded_facts = EncodedFacts(directory, _load(directory, EncodedFacts.ARRAYS), terms)
+    encoded_facts._finalizer = weakref.finalize(encoded_facts, shutil.rmtree, directory, True)
+
+    logger.info("Encoded {} terms and {} facts into {}".format(n, len(facts), directory))
+    return encoded_facts
+
+def attach(directory=None):
+    """ Attach read-only to an encoded graph stored by another process
+
+    :param directory: directory holding the arrays
+
+    :returns: an EncodedGraph instance without term dictionary
+    """
+    return EncodedGraph(directory, _load(directory))
+
+def attach_facts(directory=None):
+    """ Attach read-only to encoded facts stored by another process
+
+    :param directory: directory holding the arrays
+
+    :returns: an EncodedFacts instance without term dictionary
+    """
+    return EncodedFacts(directory, _load(directory, EncodedFacts.ARRAYS))
+
+def _load(directory, names=EncodedGraph.ARRAYS):
+    arrays = {}
+    for name in names:
+        arrays[name] = np.load(os.path.join(directory, name + ".npy"), mmap_mode='r')
+
+    return arrays
+
+def _csr(keys, values, n):
+    """ Group values by key as (offsets, values), with the values of each key sorted """
+    values = _narrowed(values)
+    order = np.lexsort((values, keys))
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n), out=offsets[1:])
+
+    return (offsets, values[order])
+
+def _narrowed(values):
+    return np.asarray(values, dtype=np.int32 if len(values) <= 0 or values.max() < 2**31 else np.int64)
+
+def _row(offsets, values, key):
+    return values[offsets[key]:offsets[key+1]]
+
+def _rows(offsets, values, keys):
+    starts = offsets[keys]
+    lengths = offsets[np.asarray(keys) + 1] - starts
+    if len(lengths) <= 0 or lengths.sum() <= 0:
+        return values[:0]
+
+    # positions of all rows as one array: start of each row plus its running index
+    shifts = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return values[shifts + np.arange(lengths.sum())]
+
+def term_key(term):
+    """ Return the key on which terms are ordered, which does not depend on the process """
+    return (type(term).__name__, str(term))
+
+def branch_of(ontology_graph, ctype):
+    """ Follow single superclasses upwards; multiple inheritence ends the branch
+
+    :param ontology_graph: a KnowledgeGraph instance holding the class hierarchy
+    :param ctype: a class
+
+    :returns: list of classes, from the class itself up to the root of its branch
+    """
+    branch = [ctype]
+    sclasses = list(ontology_graph.graph.objects(ctype, RDFS.subClassOf))
+    while len(sclasses) == 1 and sclasses[0] not in branch:
+        branch.append(sclasses[0])
+        sclasses = list(ontology_graph.graph.objects(sclasses[0], RDFS.subClassOf))
+
+    return branch
+
+if __name__ == "__main__":
+    print("Encoded Knowledge Graph")
@@ -1,6 +1,7 @@
 #!/usr/bin/python3.5
 
 from copy import deepcopy
+from heapq import nlargest
 from rdflib import URIRef
 from rdflib.term import Literal
 from writers.rule_set import _rule_to_string
@@ -27,21 +28,38 @@ class Rule:
 class IRule:
     """ IRule class
     """
+    # measures on which rules can be filtered and ranked
+    MEASURES = ("support", "confidence", "lift", "conviction", "leverage", "p_value")
+    # measures for which a lower value is better
+    ASCENDING_MEASURES = ("p_value",)
+
     rule = None
     support = None
     confidence = None
+    consequent_support = None
+    lift = None
+    conviction = None
+    leverage = None
+    p_value = None
 
-    def __init__(self, rule=None, support=None, confidence=None):
+    def __init__(self, rule=None, support=None, confidence=None, consequent_support=None):
         if type(rule) is not Rule:
             raise TypeError("Expects instance of type Rule (was {})".format(type(rule)))
         else:
             self.rule = rule
             self.support = support
             self.confidence = confidence
+            self.consequent_support = consequent_support
 
     def get(self):
         return (self.rule, self.support, self.confidence)
 
+    def measure(self, name):
+        if name not in self.MEASURES:
+            raise KeyError("Unknown measure: {}".format(name))
+
+        return getattr(self, name)
+
     def pretty_print(self):
         return _rule_to_string(self)
 
@@ -50,15 +68,20 @@ class IRule:
 
     class Measure:
         """ Measure class
+        An estimated measure carries the bounds of its confidence interval
         """
         numerator = 0.0
         denominator = 0.0
         value = 0.0
+        lower = None
+        upper = None
 
-        def __init__(self, value=None, numerator=None, denominator=None):
+        def __init__(self, value=None, numerator=None, denominator=None, lower=None, upper=None):
             self.value = value
             self.numerator = numerator
             self.denominator = denominator
+            self.lower = lower
+            self.upper = upper
 
             if self.value is None:
                 self._update()
@@ -78,13 +101,47 @@ class RuleBase:
     """ RuleBase class
     """
     _original_model = None
-    model = None
+    _model = None
+    table = None
     filters = None
+    metadata = None
 
-    def __init__(self, model=[], filters=None):
+    def __init__(self, model=[], filters=None, metadata=None, table=None):
         self._original_model = deepcopy(model)
-        self.model = deepcopy(self._original_model)
+        self._model = deepcopy(self._original_model)
+        self.table = table
         self.filters = filters if filters is not None else self.Filter()
+        self.metadata = metadata if metadata is not None else {}
+
+    @property
+    def model(self):
+        """ The IRules; those of a pending RuleTable are only built on first access """
+        if self.table is not None:
+            self._model.extend(self.table.irules())
+            self.table = None
+
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+        self.table = None
+
+    def is_pending(self):
+        """ Return True if all rules are still in an unbuilt RuleTable """
+        return self.table is not None and len(self._model) <= 0
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_model"] = self.model
+        state["table"] = None
+
+        return state
+
+    def __setstate__(self, state):
+        if "model" in state.keys():  # pickled before rule tables
+            state["_model"] = state.pop("model")
+        self.__dict__.update(state)
 
     def add(self, irule):
         if type(irule) is not IRule:
@@ -92,6 +149,13 @@ class RuleBase:
         else:
             self.model.append(irule)
 
+    def stream(self):
+        """ Yield all IRules in order; those of a pending RuleTable are built one at a time and not kept """
+        if self.is_pending():
+            yield from self.table
+        else:
+            yield from self.model
+
     def rmv(self, irule):
         self.model.remove(irule)
 
@@ -102,29 +166,88 @@ class RuleBase:
                minimal_support=0.0,
                maximal_support=1.0,
                minimal_confidence=0.0,
-               maximal_confidence=1.0):
+               maximal_confidence=1.0,
+               **bounds):
+        bounds["minimal_support"] = minimal_support
+        bounds["maximal_support"] = maximal_support
+        bounds["minimal_confidence"] = minimal_confidence
+        bounds["maximal_confidence"] = maximal_confidence
         for irule in self.model:
             if (self.filters.filters['class'] is None or irule.rule.ctype is self.filters.filters['class']) and\
                (self.filters.filters['antecedent'] is None or irule.rule.antecedent is self.filters.filters['antecedent']) and\
                (self.filters.filters['consequent'] is None or irule.rule.consequent is self.filters.filters['consequent']) and\
-               (irule.support.value is None or irule.support.value >= minimal_support) and\
-               (irule.support.value is None or irule.support.value <= maximal_support) and\
-               (irule.confidence.value is None or irule.confidence.value >= minimal_confidence) and\
-               (irule.confidence.value is None or irule.confidence.value <= maximal_confidence):
+               self._within_bounds(irule, bounds):
                 yield irule
 
+    def _within_bounds(self, irule, bounds):
+        for name in IRule.MEASURES:
+            measure = irule.measure(name)
+            if measure is None or measure.value is None:
+                continue
+
+            if ("minimal_"+name in bounds and measure.value < bounds["minimal_"+name]) or\
+               ("maximal_"+name in bounds and measure.value > bounds["maximal_"+name]):
+                return False
+
+        return True
+
     def size(self):
+        if self.table is not None:
+            return len(self._model) + len(self.table)
+
         return (len(self.model))
 
-    def sort(self, by_support=False, by_confidence=False, reverse=True):
+    def sort(self, by_support=False, by_confidence=False, reverse=True, by=None):
+        if self.is_pending() and (by is not None or by_support or by_confidence):
+            if by is None:
+                by = ("support", "confidence") if by_support and not by_confidence else ("confidence", "support")
+            self.table = self.table.ranked(by, reverse)
+
+            return
+
         key = None
         if by_support:
             key = lambda r: (r.support.value, r.confidence.value)
         if by_confidence:
             key = lambda r: (r.confidence.value, r.support.value)
+        if by is not None:
+            key = self.rank_key(by)
 
         self.model.sort(key=key, reverse=reverse)
 
+    def top_k(self, k, by=("confidence", "support")):
+        """ Keep only the k best rules, ranked on one or more measures """
+        if self.is_pending():
+            self.table = self.table.ranked(by, k=k)
+
+            return
+
+        self.model = nlargest(k, self.model, key=self.rank_key(by))
+
+    @staticmethod
+    def rank_key(by=("confidence", "support")):
+        """ Return a sort key which ranks rules on one or more measures, best first when reversed """
+        if type(by) is str:
+            by = (by,)
+        for name in by:
+            if name not in IRule.MEASURES:
+                raise KeyError("Unknown measure: {}".format(name))
+
+        def key(irule):
+            values = []
+            for name in by:
+                measure = irule.measure(name)
+                value = measure.value if measure is not None and measure.value is not None else float("nan")
+                if value != value:  # missing measures rank last
+                    value = float("-inf")
+                elif name in IRule.ASCENDING_MEASURES:
+                    value = -value
+                values.append(value)
+
+            return tuple(values)
+
+        return key
+
     def filter(self, filters):
         if len(self.filters.difference()) <= 0:
             self._original_model = deepcopy(self.model)
@@ -141,13 +264,11 @@ class RuleBase:
             self.update()
 
     def update(self):
+        bounds = {k: v for k, v in self.filters.filters.items() if k.startswith("minimal_") or k.startswith("maximal_")}
         self.model = [irule for irule in self.irules(ctype=self.filters.filters['class'],
                                                      antecedent=self.filters.filters['antecedent'],
                                                      consequent=self.filters.filters['consequent'],
-                                                     minimal_support=self.filters.filters['minimal_support'],
-                                                     minimal_confidence=self.filters.filters['minimal_confidence'],
-                                                     maximal_support=self.filters.filters['maximal_support'],
-                                                     maximal_confidence=self.filters.filters['maximal_confidence'])]
+                                                     **bounds)]
 
     class Filter:
         """ Filter for RuleBase class
@@ -158,7 +279,19 @@ class RuleBase:
                             "minimal_support": 0,
                             "maximal_support": 1,
                             "minimal_confidence": 0,
-                            "maximal_confidence": 1}
+                            "maximal_confidence": 1,
+                            "minimal_lift": 0,
+                            "maximal_lift": float("inf"),
+                            "minimal_conviction": 0,
+                            "maximal_conviction": float("inf"),
+                            "minimal_leverage": -1,
+                            "maximal_leverage": 1,
+                            "minimal_p_value": 0,
+                            "maximal_p_value": 1}
+        # admissible (lower, upper) values of measures which are not bound to [0, 1]
+        _ranges = {"lift": (0, float("inf")),
+                   "conviction": (0, float("inf")),
+                   "leverage": (-1, 1)}
         filters = {}
 
         def __init__(self, filters=None):
@@ -206,9 +339,13 @@ class RuleBase:
             if key not in self.filters.keys():
                 raise KeyError("Unknown key: {}".format(key))
                 return False
-            if (key.startswith("minimal_") or key.startswith("maximal_")) and (value < 0 or value > 1):
-                raise ValueError("Value should be between and including 0 and 1 (was {})".format(value))
-                return False
+            if key.startswith("minimal_") or key.startswith("maximal_"):
+                lower, upper = self._ranges.get(key[8:], (0, 1))
+                if value < lower or value > upper:
+                    raise ValueError("Value should be between and including {} and {} (was {})".format(lower,
+                                                                                                       upper,
+                                                                                                       value))
+                    return False
             if key == "class" and (type(value) is not URIRef and value is not None):
                 raise TypeError("Class should be of type URIRef (was {})".format(type(value)))
                 return False
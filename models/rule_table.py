@@ -0,0 +1,301 @@
+#!/usr/bin/python3
+
+import logging
+from heapq import merge
+from itertools import islice
+import numpy as np
+from models.rule_base import IRule, Rule
+
+
+# one record per rule: the rule itself as IDs, with its consequent as a run in the consequents
+# array, and the counts from which its measures follow: support = a / n, confidence = ac / a,
+# and consequent support = c / n
+RECORD = np.dtype([("ctype", np.int64),
+                   ("antecedent", np.int64),
+                   ("consequent_offset", np.int64),
+                   ("consequent_length", np.int64),
+                   ("n", np.int64),
+                   ("a", np.int64),
+                   ("c", np.int64),
+                   ("ac", np.int64)])
+
+# counts of an evaluated rule, by its position in the table
+COUNTS = np.dtype([("index", np.int64),
+                   ("n", np.int64),
+                   ("a", np.int64),
+                   ("c", np.int64),
+                   ("ac", np.int64)])
+
+class RuleTable:
+    """ RuleTable class
+    A columnar store of encoded rules and their counts
+
+    Rules are kept as packed record arrays, which workers can return in a single buffer
+    instead of as separate Rule and IRule objects. Ranking is done on the columns; IRules
+    are only built by irules(), once the rules are written or reviewed.
+
+    If the workers have ranked their own rules, the table holds one run of ranked rows per
+    worker chunk, and a ranking on the same measures is a k-way merge of these runs.
+    """
+    records = None
+    consequents = None
+    terms = None
+    items = None
+    measures = None
+    runs = None
+    ranked_by = None
+
+    def __init__(self, records=None, consequents=None, terms=None, items=None):
+        self.logger = logging.getLogger(__name__)
+        self.records = records if records is not None else np.zeros(0, dtype=RECORD)
+        self.consequents = consequents if consequents is not None else np.zeros(0, dtype=np.int64)
+        self.terms = terms
+        self.items = items
+        self.measures = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, indices):
+        """ Return a table with the rows of a slice or array of indices """
+        return self.take(indices)
+
+    ### Accessors ###
+
+    def rule_of(self, i):
+        """ Return an encoded rule as (class ID, antecedent ID, consequent IDs) """
+        record = self.records[i]
+        offset = record["consequent_offset"]
+
+        return (record["ctype"],
+                record["antecedent"],
+                self.consequents[offset:offset+record["consequent_length"]])
+
+    def values_of(self, name):
+        """ Return the values of a measure for all rules; NaN if not computed """
+        if name == "support":
+            return ratio_of(self.records["a"], self.records["n"])
+        if name == "confidence":
+            return ratio_of(self.records["ac"], self.records["a"])
+        if name in self.measures.keys():
+            return self.measures[name][0]
+        if name not in IRule.MEASURES:
+            raise KeyError("Unknown measure: {}".format(name))
+
+        return np.full(len(self), np.nan)
+
+    ### Operators ###
+
+    def take(self, indices):
+        """ Return a table with the given rows, in the given order """
+        table = RuleTable(self.records[indices], self.consequents, self.terms, self.items)
+        table.measures = {name: tuple(v[indices] for v in values) for name, values in self.measures.items()}
+
+        return table
+
+    def with_counts(self, chunks, ranked_by=None):
+        """ Return a table with only the evaluated rows, carrying their counts
+
+        :param chunks: list of COUNTS arrays, as returned by the workers
+        :param ranked_by: measures on which the workers ranked each chunk, if they did
+
+        :returns: a RuleTable instance, in the order of this table or as runs of ranked rows
+        """
+        counts = np.concatenate(chunks) if len(chunks) > 0 else np.zeros(0, dtype=COUNTS)
+        if ranked_by is None:
+            counts = counts[np.argsort(counts["index"], kind="stable")]
+
+        table = self.take(counts["index"])
+        for name in ("n", "a", "c", "ac"):
+            table.records[name] = counts[name]
+
+        if ranked_by is not None:
+            bounds = np.cumsum([0] + [len(chunk) for chunk in chunks]).tolist()
+            table.runs = [(bounds[k], bounds[k+1]) for k in range(len(chunks)) if bounds[k] < bounds[k+1]]
+            table.ranked_by = _measures_of(ranked_by)
+
+        return table
+
+    def order(self, by=("confidence", "support"), reverse=True):
+        """ Return the row order of a ranking on one or more measures, equal to that of RuleBase.rank_key() """
+        keys = rank_keys(self.values_of, by, reverse)
+
+        # lexsort is stable, so ties keep their order as with list.sort()
+        return np.lexsort(keys[::-1]) if len(keys) > 0 else np.arange(len(self))
+
+    def ranked(self, by=("confidence", "support"), reverse=True, k=None):
+        """ Return a table ranked on one or more measures
+
+        Runs which are already ranked on the same measures are merged with a heap, which
+        holds one row per run; for the best k rows, only these are taken from the runs.
+
+        :param by: measure name or tuple of names
+        :param reverse: best first
+        :param k: keep only the best k rows
+
+        :returns: a RuleTable instance
+        """
+        if self.runs is None or self.ranked_by != _measures_of(by) or not reverse:
+            order = self.order(by, reverse)
+
+            return self.take(order[:k] if k is not None else order)
+
+        keys = [key.tolist() for key in rank_keys(self.values_of, by, reverse)]
+        rows = merge(*[range(start, stop) for start, stop in self.runs],
+                     key=lambda i: tuple(key[i] for key in keys))
+
+        return self.take(np.fromiter(islice(rows, k), dtype=np.int64))
+
+    def irules(self):
+        """ Build the IRules of all rows
+
+        :returns: a list of IRule instances
+        """
+        self.logger.info("Building {} rules".format(len(self)))
+
+        return list(self)
+
+    def __iter__(self):
+        """ Build the IRules of all rows one at a time, in order """
+        measures = {name: [v.tolist() for v in values] for name, values in self.measures.items()}
+
+        consequents = self.consequents.tolist()
+        for i, (ctype, antecedent, offset, length, n, a, c, ac) in enumerate(self.records.tolist()):
+            rule = Rule(self.terms[ctype],
+                        self.items[antecedent],
+                        [self.items[item] for item in consequents[offset:offset+length]])
+
+            irule = IRule(rule,
+                          IRule.Measure(None, a, n),
+                          IRule.Measure(None, ac, a),
+                          IRule.Measure(None, c, n))
+            for name, values in measures.items():
+                setattr(irule, name, IRule.Measure(*[v[i] for v in values]))
+
+            yield irule
+
+### Independent Functions ##
+
+def pack(rules):
+    """ Pack encoded rules into a table
+
+    :param rules: list of (class ID, antecedent ID, consequent IDs) tuples
+
+    :returns: a RuleTable instance without counts
+    """
+    records = np.zeros(len(rules), dtype=RECORD)
+    records["ctype"] = [ctype for ctype, _, _ in rules]
+    records["antecedent"] = [antecedent for _, antecedent, _ in rules]
+    records["consequent_length"] = [len(consequent) for _, _, consequent in rules]
+    records["consequent_offset"][1:] = np.cumsum(records["consequent_length"])[:-1]
+
+    consequents = np.array([item for _, _, consequent in rules for item in consequent], dtype=np.int64)
+
+    return RuleTable(records, consequents)
+
+def concatenate(tables):
+    """ Concatenate tables into one, as returned by the workers in chunks
+
+    Runs of ranked rows are kept if all tables are ranked on the same measures.
+
+    :param tables: list of RuleTable instances, without measures
+
+    :returns: a RuleTable instance
+    """
+    if len(tables) <= 0:
+        return RuleTable()
+
+    records = np.concatenate([table.records for table in tables])
+    runs = []
+    offset = 0
+    start = 0
+    for table in tables:
+        records["consequent_offset"][start:start+len(table)] += offset
+        if table.runs is not None:
+            runs.extend([(start + run_start, start + run_stop) for run_start, run_stop in table.runs])
+        offset += len(table.consequents)
+        start += len(table)
+
+    table = RuleTable(records, np.concatenate([table.consequents for table in tables]))
+    ranked_by = {t.ranked_by for t in tables}
+    if len(ranked_by) == 1 and None not in ranked_by:
+        table.runs = runs
+        table.ranked_by = ranked_by.pop()
+
+    return table
+
+def combine(tables):
+    """ Combine tables with terms and items of their own into one, as mined from different graphs
+
+    The IDs of every table are mapped onto the terms and items of all tables together.
+
+    :param tables: list of RuleTable instances, without measures
+
+    :returns: a RuleTable instance
+    """
+    terms = []
+    term_ids = {}
+    items = []
+    item_ids = {}
+    mapped = []
+    for table in tables:
+        if len(table) <= 0:
+            continue
+
+        # only the terms and items in use are mapped
+        ctypes, ctype_index = np.unique(table.records["ctype"], return_inverse=True)
+        used_items = np.concatenate([table.records["antecedent"], table.consequents])
+        used_items, item_index = np.unique(used_items, return_inverse=True)
+        for term in (table.terms[i] for i in ctypes.tolist()):
+            term_ids.setdefault(term, len(terms))
+            if term_ids[term] == len(terms):
+                terms.append(term)
+        for item in (table.items[i] for i in used_items.tolist()):
+            item_ids.setdefault(item, len(items))
+            if item_ids[item] == len(items):
+                items.append(item)
+
+        ctype_map = np.array([term_ids[table.terms[i]] for i in ctypes.tolist()], dtype=np.int64)
+        item_map = np.array([item_ids[table.items[i]] for i in used_items.tolist()], dtype=np.int64)
+        records = table.records.copy()
+        records["ctype"] = ctype_map[ctype_index]
+        records["antecedent"] = item_map[item_index[:len(records)]]
+        mapped.append(RuleTable(records, item_map[item_index[len(records):]]))
+
+    table = concatenate(mapped)
+    table.terms = terms
+    table.items = items
+
+    return table
+
+def rank_keys(values_of, by=("confidence", "support"), reverse=True):
+    """ Return the sort keys of a ranking on one or more measures
+
+    :param values_of: function which returns the array of values of a measure by name
+    :param by: measure name or tuple of names
+    :param reverse: best first
+
+    :returns: list of arrays to sort on in ascending order, the primary key first
+    """
+    keys = []
+    for name in _measures_of(by):
+        values = np.array(values_of(name), dtype=np.float64)
+        values[np.isnan(values)] = -np.inf  # missing measures rank last
+        if name in IRule.ASCENDING_MEASURES:
+            values = np.where(np.isinf(values), values, -values)
+        keys.append(-values if reverse else values)
+
+    return keys
+
+def ratio_of(numerators, denominators):
+    """ Divide as IRule.Measure does: zero if the denominator is zero """
+    numerators = numerators.astype(np.float64)
+    denominators = denominators.astype(np.float64)
+
+    return np.divide(numerators, denominators, out=np.zeros(len(numerators)), where=denominators != 0)
+
+def _measures_of(by):
+    return (by,) if type(by) is str else tuple(by)
+
+if __name__ == "__main__":
+    print("Columnar Rule Table")
@@ -0,0 +1,24 @@
+#!/usr/bin/python3
+
+import logging
+import json
+
+
+logger = logging.getLogger(__name__)
+
+def read(path="./of/latest.meta"):
+    """ Read run metadata, such as coverage statistics, from JSON
+
+    :param path: file path to read from
+
+    :returns: a dictionary
+    """
+    mode = 'r'
+
+    logger.info("Loading metadata (mode {}) from {}".format(mode, path))
+
+    metadata = None
+    with open(path, mode) as f:
+        metadata = json.load(f)
+
+    return metadata
@@ -1,9 +1,12 @@
 #!/usr/bin/python3.5
 
 import logging
+import os
 
-from rdflib import Graph
+from rdflib import Dataset, Graph
+from rdflib.graph import DATASET_DEFAULT_GRAPH_ID
 from rdflib.util import guess_format
+from rdflib.plugins.parsers.ntriples import W3CNTriplesParser
 #from SPARQLWrapper import SPARQLWrapper
 
 from models.knowledge_graph import KnowledgeGraph
@@ -33,6 +36,50 @@ def read(local_path=None, remote_path=None, format=None):
 
     return KnowledgeGraph(graph)
 
+def split_datasets(local_paths=[], directory=None):
+    """ Lists the datasets in ABox files: a dataset per file, or per named graph for N-Quads and TriG.
+    Named graphs are written to a N-Triples file each in directory, so that they can be read as any ABox.
+    Returns a list of (name, path) tuples
+    """
+
+    if directory is None:
+        raise ValueError("Directory cannot be left undefined")
+
+    datasets = []
+    for path in local_paths:
+        format = guess_format(path)
+        if format not in ("nquads", "trig"):
+            datasets.append((path, path))
+            continue
+
+        logger.info("Splitting named graphs of '{}'".format(path))
+        dataset = Dataset()
+        dataset.parse(path, format=format)
+        for graph in sorted(dataset.graphs(), key=lambda graph: str(graph.identifier)):
+            if len(graph) <= 0:
+                continue
+
+            name = path if graph.identifier == DATASET_DEFAULT_GRAPH_ID else str(graph.identifier)
+            graph_path = os.path.join(directory, "{}.nt".format(len(datasets)))
+            graph.serialize(destination=graph_path, format="nt", encoding="utf-8")
+            datasets.append((name, graph_path))
+
+    logger.info("Found {} datasets".format(len(datasets)))
+
+    return datasets
+
+def stream(f=None, sink=None):
+    """ Parses N-Triples from a file-like object, such as stdin, as they come in.
+    Hands every triple to the triple(s, p, o) method of the sink
+    """
+
+    if f is None or sink is None:
+        raise ValueError("Stream and sink cannot be left undefined")
+    logger.info("Streaming N-Triples")
+
+    # lines are passed on one at a time, rather than after a full block has been read
+    W3CNTriplesParser(sink=sink).parse(_LineReader(f))
+
 def query(query_string="", endpoint=""):
     """ Constructs a Knowledge Graph from a SPARQL endpoint and a CONSTRUCT query.
     Returns a Knowledge Graph
@@ -59,5 +106,15 @@ def query(query_string="", endpoint=""):
 
     return KnowledgeGraph(graph)
 
+class _LineReader():
+    """ File-like object which returns at most one line per read """
+    encoding = "utf-8"
+
+    def __init__(self, f):
+        self.f = f
+
+    def read(self, size=-1):
+        return self.f.readline()
+
 if __name__ == "__main__":
     print("RDF import wrapper")
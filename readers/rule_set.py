@@ -3,6 +3,7 @@
 import logging
 from re import match, DOTALL
 from rdflib import URIRef, Literal
+from rdflib.paths import SequencePath
 from models.rule_base import RuleBase, IRule, Rule
 from auxiliarly.progress_indicator import ProgressIndicator
 
@@ -51,20 +52,35 @@ def _to_object(match):
     ctype = match.group(1)
     antecedent = match.group(2)
     consequent = match.group(3)
-    support = float(match.group(4))
-    confidence = float(match.group(5))
 
-    return IRule(Rule(URIRef(ctype),
-                      _mkCondition(antecedent),
-                      _mkConsequent(consequent)),
-                 IRule.Measure(support),
-                 IRule.Measure(confidence))
+    irule = IRule(Rule(URIRef(ctype),
+                       _mkCondition(antecedent),
+                       _mkConsequent(consequent)),
+                  _mkMeasure(*match.group(4, 5, 6)),
+                  _mkMeasure(*match.group(7, 8, 9)))
+
+    # rules written before these measures existed lack them
+    if match.group(10) is not None:
+        for name, value in zip(("lift", "conviction", "leverage", "p_value"), match.group(10, 11, 12, 13)):
+            setattr(irule, name, IRule.Measure(float(value)))
+
+    return irule
+
+def _mkMeasure(value, lower=None, upper=None):
+    # measures estimated on a sample carry the bounds of their confidence interval
+    if lower is None:
+        return IRule.Measure(float(value))
+
+    return IRule.Measure(float(value), lower=float(lower), upper=float(upper))
 
 def _mkCondition(rule_part):
     pattern = "'(http.*)', (?:\"|')(http.*|(?:.*(?=\[.*\])))(?:\[rdf:(.*)\])*(?:'|\")"
     rmatch = match(pattern, rule_part)
 
-    predicate = URIRef(rmatch.group(1))
+    if " / " in rmatch.group(1):
+        predicate = SequencePath(*[URIRef(p) for p in rmatch.group(1).split(" / ")])
+    else:
+        predicate = URIRef(rmatch.group(1))
     if rmatch.group(2).startswith("http") is False:
         object = Literal(rmatch.group(2))
 
@@ -84,5 +100,13 @@ def _mkConsequent(rule_part):
     return [_mkCondition(consequent) for consequent in rule_parts]
 
 def _isRule(rule):
-    pattern = """\[(.*)\]\n    IF   \((.*)\)\n    THEN \((.*(?:AND.*)*)\)\n    Support:    ((?:0|1)\.[0-9]{3})\n    Confidence: ((?:0|1)\.[0-9]{3})\n"""
+    number = r"(-?(?:[0-9]+\.[0-9]+(?:e[+-][0-9]+)?|inf|nan))"
+    interval = r"(?: \[([0-9]\.[0-9]{3}), ([0-9]\.[0-9]{3})\])?"
+    pattern = r"\[(.*)\]\n    IF   \((.*)\)\n    THEN \((.*(?:AND.*)*)\)\n" +\
+              r"    Support:    ((?:0|1)\.[0-9]{3})" + interval + r"\n" +\
+              r"    Confidence: ((?:0|1)\.[0-9]{3})" + interval + r"\n" +\
+              r"(?:    Lift:       " + number + r"\n" +\
+              r"    Conviction: " + number + r"\n" +\
+              r"    Leverage:   " + number + r"\n" +\
+              r"    P-value:    " + number + r"\n)?"
     return match(pattern, rule, DOTALL)
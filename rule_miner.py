@@ -2,17 +2,84 @@
 
 import logging
 import argparse
+import tempfile
 from datetime import datetime
+from models.rule_base import IRule
+from algorithms.discretisation import STRATEGIES
+from auxiliarly.worker_pool import EXECUTORS
+from auxiliarly.distributed import address_of, serve
+from auxiliarly.resources import number_of_workers
+from algorithms.incremental_mining import update_incrementally
+from readers import rdf
 
 
 def run(args, time):
+    if args.serve is not None:
+        # worker of a distributed run: take work from the coordinator instead of running a directive
+        serve(address_of(args.serve), args.workers or number_of_workers())
+        return
+
     directive = args.directive.split('.')
 
     mod = __import__('.'.join(directive[:-1]), fromlist=[directive[-1:]])
     klass = getattr(mod, *directive[-1:])
 
+    if args.state is not None and (args.added is not None or args.removed is not None):
+        # update the rules of an earlier run rather than mining the ABox
+        rule_base = update_incrementally(args.state,
+                                         rdf.read(local_path=args.added) if args.added is not None else None,
+                                         rdf.read(local_path=args.removed) if args.removed is not None else None)
+        print("  Found {} rules".format(rule_base.size()))
+        klass(time).write_to_file(args.output, rule_base)
+        return
+
+    overrides = {}
+    if args.budget is not None:
+        overrides["time_budget"] = args.budget
+    if args.rank_by is not None:
+        overrides["rank_by"] = tuple(args.rank_by)
+    if args.top_k is not None:
+        overrides["top_k"] = args.top_k
+    if args.discretise is not None:
+        overrides["discretisation"] = args.discretise
+    if args.bins is not None:
+        overrides["number_of_bins"] = args.bins
+    if args.vocab is not None:
+        overrides["vocabulary"] = args.vocab
+    if args.executor is not None:
+        overrides["executor"] = args.executor
+    if args.task_timeout is not None:
+        overrides["task_timeout"] = args.task_timeout
+    if args.workers is not None:
+        overrides["workers"] = args.workers
+    if args.memory_budget is not None:
+        overrides["memory_budget"] = int(args.memory_budget * 2**20)
+    if args.coordinator is not None:
+        overrides["coordinator"] = args.coordinator
+    if args.cbs_budget is not None:
+        overrides["cbs_budget"] = int(args.cbs_budget * 2**20)
+    if args.cache is not None:
+        overrides["cache"] = args.cache
+    if args.state is not None:
+        overrides["state"] = args.state
+    if args.partition_by_class:
+        overrides["partition_by_class"] = True
+    if args.sample_rate is not None:
+        overrides["sample_rate"] = args.sample_rate
+    if args.sample_seed is not None:
+        overrides["sample_seed"] = args.sample_seed
+    if args.verify_sample:
+        overrides["sample_verification"] = True
+
     program = klass(time)
-    program.run(args.abox, args.tbox, args.output, args.interactive)
+    if args.datasets is not None:
+        # named graphs are split into files of their own for as long as they are mined
+        with tempfile.TemporaryDirectory() as directory:
+            overrides["datasets"] = rdf.split_datasets(args.datasets, directory)
+            program.run(None, args.tbox, args.output, args.interactive, **overrides)
+        return
+
+    program.run(args.abox, args.tbox, args.output, args.interactive, **overrides)
 
 def print_header():
     header = 'An Experimental Pipeline for Data Mining on Linked Archaeological Data'
@@ -33,12 +100,50 @@ if __name__ == "__main__":
 
     parser = argparse.ArgumentParser()
     parser.add_argument("-a", "--abox", help="ABox graph", default=None)
+    parser.add_argument("--added", help="Graph with facts added to the ABox of an earlier run kept with --state", default=None)
+    parser.add_argument("--bins", help="Maximum number of bins per numeric predicate", type=int, default=None)
+    parser.add_argument("-b", "--budget", help="Time budget in seconds (anytime mode)", type=float, default=None)
+    parser.add_argument("--cache", help="Directory to keep the results of every stage in, to reuse and resume from (MP directives)",
+                        default=None)
+    parser.add_argument("--cbs-budget", help="Memory budget in MiB for the CBS kept to be extended, beyond which they are spilled to disk (MP directives)",
+                        type=float, default=None)
+    parser.add_argument("-c", "--coordinator", help="HOST:PORT on which to wait for workers (distributed executor)",
+                        default=None)
+    parser.add_argument("--datasets", help="ABox graphs, or N-Quads with a graph per dataset, to mine one by one and merge the counts of (MP directives)",
+                        nargs="+", default=None)
     parser.add_argument("-d", "--directive", help="Directive for rule learning", default=None)
+    parser.add_argument("--discretise", help="Discretise numeric literals", choices=STRATEGIES, default=None)
+    parser.add_argument("-e", "--executor", help="Run MP directives on processes, on threads if the GIL is disabled, serially, or on remote workers",
+                        choices=EXECUTORS, default=None)
     parser.add_argument("-i", "--interactive", help="Interactive mode", action="store_true")
+    parser.add_argument("-k", "--top-k", help="Only keep the k best rules", type=int, default=None)
+    parser.add_argument("-m", "--memory-budget", help="Memory budget in MiB for MP directives; defaults to a share of the memory limit",
+                        type=float, default=None)
     parser.add_argument("-o", "--output", help="output path", default="./of/output-{}".format(time))
+    parser.add_argument("-p", "--partition-by-class", help="Mine the subjects of every class hierarchy branch separately (MP directives)",
+                        action="store_true")
+    parser.add_argument("-r", "--rank-by", help="Measures to rank rules on ({})".format(", ".join(IRule.MEASURES)), nargs="+",
+                        choices=IRule.MEASURES, metavar="RANK_BY", default=None)
+    parser.add_argument("--removed", help="Graph with facts removed from the ABox of an earlier run kept with --state", default=None)
+    parser.add_argument("--sample-rate", help="Only mine this fraction of the individuals of every class, with confidence intervals (MP directives)",
+                        type=float, default=None)
+    parser.add_argument("--sample-seed", help="Seed of the sample drawn with --sample-rate", type=int, default=None)
+    parser.add_argument("-s", "--serve", help="Run as worker of the coordinator at HOST:PORT, with WORKERS processes",
+                        default=None)
+    parser.add_argument("--state", help="File to keep the state of the mining in, to update the rules with --added and --removed later (MP directives)",
+                        default=None)
     parser.add_argument("-t", "--tbox", help="TBox graph", default=None)
+    parser.add_argument("--task-timeout", help="Seconds after which a worker task is retried (MP directives)",
+                        type=float, default=None)
+    parser.add_argument("--verify-sample", help="Count the rules mined with --sample-rate again on all individuals",
+                        action="store_true")
+    parser.add_argument("--vocab", help="Controlled vocabulary graph to generalise objects with", default=None)
     parser.add_argument("-v", "--verbose", help="increase output verbosity", action="store_true")
+    parser.add_argument("-w", "--workers", help="Number of workers for MP directives; defaults to the CPU limit, except for the distributed executor",
+                        type=int, default=None)
     args = parser.parse_args()
+    if args.executor == "distributed" and args.workers is None:
+        parser.error("the distributed executor requires the number of workers to wait for (-w)")
 
     set_logging(args, time)
     logger = logging.getLogger(__name__)
@@ -27,13 +27,23 @@ def sample(knowledge_graph=None, patterns=[(None, None, None)], context=[], stri
 
     logger.info("Sampling user-defined context")
     logger.info("Pattern:\n\t" + "\n\t".join(["{}".format(pattern) for pattern in patterns]))
-    individuals = frozenset(s for pattern in patterns for s, _, _ in knowledge_graph.graph.triples(pattern))
+    individuals = individuals_of(knowledge_graph, patterns)
 
     logger.info("Pattern matches {} individuals".format(len(individuals)))
     logger.info("Context:\n\t" + "\n\t".join(["{}".format(path) for path in context]))
 
     return _sample_context(knowledge_graph, individuals, context, strict_context)
 
+def individuals_of(knowledge_graph=None, patterns=[(None, None, None)]):
+    """ Return the individuals which match one or more patterns, and at which the context of the sample starts
+
+    :param knowledge_graph: a KnowledgeGraph instance to sample
+    :param patterns: a list of triple patterns (None, p, o) to filter sample with
+
+    :returns: a frozenset of individuals
+    """
+    return frozenset(s for pattern in patterns for s, _, _ in knowledge_graph.graph.triples(pattern))
+
 def _sample_context(knowledge_graph, individuals, context, strict_context):
     kg = KnowledgeGraph(rdflib.Graph())
 
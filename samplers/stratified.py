@@ -0,0 +1,52 @@
+#!/usr/bin/python3.5
+
+import logging
+import random
+from math import ceil
+import rdflib
+from models.knowledge_graph import KnowledgeGraph
+from models.encoded_graph import term_key
+
+
+logger = logging.getLogger(__name__)
+
+def sample(knowledge_graph=None, rate=.1, seed=0):
+    """ Return the facts of a stratified subsample of the individuals of every class.
+
+    Individuals with the same classes form a stratum, of which a fraction rate is drawn,
+    rounded up so that no class loses all its members. The same seed draws the same sample.
+
+    :param knowledge_graph: a KnowledgeGraph instance to sample
+    :param rate: the fraction of the individuals of every stratum to draw
+    :param seed: the seed of the draw
+
+    :returns: the sample as a KnowledgeGraph instance
+    """
+    if knowledge_graph is None:
+        raise ValueError("Missing parameter values")
+    if not 0.0 < rate <= 1.0:
+        raise ValueError("Rate must be in (0, 1]")
+
+    logger.info("Sampling {:.1%} of the individuals of every class".format(rate))
+    classes = {}
+    for s, ctype in knowledge_graph.graph.subject_objects(rdflib.RDF.type):
+        classes.setdefault(s, set()).add(ctype)
+
+    strata = {}
+    for s, ctypes in classes.items():
+        strata.setdefault(tuple(sorted(ctypes, key=term_key)), []).append(s)
+
+    # strata and their members are drawn from in a fixed order, so that the seed decides the sample
+    rng = random.Random(seed)
+    kg = KnowledgeGraph(rdflib.Graph())
+    for stratum in sorted(strata.keys(), key=lambda stratum: [term_key(ctype) for ctype in stratum]):
+        members = sorted(strata[stratum], key=term_key)
+        for s in rng.sample(members, ceil(rate * len(members))):
+            for p, o in knowledge_graph.graph.predicate_objects(s):
+                kg.graph.add((s, p, o))
+
+    logger.info("Sample contains {} facts of {} strata".format(len(kg.graph), len(strata)))
+    return kg
+
+if __name__ == "__main__":
+    print("Sample a stratified fraction of the individuals of every class")
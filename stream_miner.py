@@ -0,0 +1,95 @@
+#!/usr/bin/python3
+
+import logging
+import argparse
+import sys
+from datetime import datetime
+from models.rule_base import IRule
+from readers import rdf
+from writers import rule_set, pickler, metadata
+from algorithms.interestingness import evaluate_measures
+from algorithms.stream_mining import StreamMiner
+
+
+def run(args, time):
+    rank_by = tuple(args.rank_by) if args.rank_by is not None else ("confidence", "support")
+
+    def emit(rule_base):
+        # every emission replaces the one before
+        evaluate_measures(rule_base, "holm")
+        if args.top_k is not None:
+            rule_base.top_k(args.top_k, rank_by)
+        else:
+            rule_base.sort(by=rank_by)
+
+        print("  {} transactions: {} rules (counts at most {} too low)".format(rule_base.metadata["transactions"],
+                                                                               rule_base.size(),
+                                                                               rule_base.metadata["error_bound"]))
+        rule_set.pretty_write(rule_base, args.output, True, True)
+        pickler.write(rule_base, args.output+".pickle", True)
+        metadata.write(rule_base.metadata, args.output+".meta", True)
+
+    miner = StreamMiner(error=args.error,
+                        window=args.window,
+                        minimal_support=args.minimal_support,
+                        minimal_confidence=args.minimal_confidence,
+                        interval=args.interval,
+                        emit=emit)
+
+    print(" Mining stream...")
+    if args.abox is None or args.abox == "-":
+        rdf.stream(sys.stdin, miner)
+    else:
+        with open(args.abox, 'r') as f:
+            rdf.stream(f, miner)
+
+    miner.flush()
+    if miner.emitted != miner.number_of_transactions():
+        # unless the last transaction closed on an interval, and its rules were emitted already
+        emit(miner.rule_base())
+
+def print_header():
+    header = 'An Experimental Pipeline for Data Mining on Linked Archaeological Data'
+    print('=' * len(header))
+    print(header)
+    print('=' * len(header))
+
+def set_logging(args, time):
+    logging.basicConfig(filename='./logs/{}.log'.format(time),
+                        format='%(asctime)s %(levelname)s: %(message)s',
+                        level=logging.INFO)
+
+    if args.verbose:
+        logging.getLogger().addHandler(logging.StreamHandler())
+
+if __name__ == "__main__":
+    time = datetime.now().isoformat()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-a", "--abox", help="ABox graph as N-Triples; defaults to stdin", default=None)
+    parser.add_argument("-c", "--minimal-confidence", help="Only emit rules which may have a higher confidence",
+                        type=float, default=0.0)
+    parser.add_argument("-e", "--error", help="Largest undercount of the counts, as fraction of the number of subjects",
+                        type=float, default=.001)
+    parser.add_argument("-k", "--top-k", help="Only keep the k best rules", type=int, default=None)
+    parser.add_argument("-n", "--interval", help="Number of subjects after which the rules are emitted",
+                        type=int, default=None)
+    parser.add_argument("-o", "--output", help="output path", default="./of/output-{}".format(time))
+    parser.add_argument("-r", "--rank-by", help="Measures to rank rules on ({})".format(", ".join(IRule.MEASURES)), nargs="+",
+                        choices=IRule.MEASURES, metavar="RANK_BY", default=None)
+    parser.add_argument("-s", "--minimal-support", help="Only emit rules which may have a higher support",
+                        type=float, default=0.0)
+    parser.add_argument("-v", "--verbose", help="increase output verbosity", action="store_true")
+    parser.add_argument("-w", "--window", help="Number of subjects whose facts are kept until they are counted",
+                        type=int, default=1000)
+    args = parser.parse_args()
+
+    set_logging(args, time)
+    logger = logging.getLogger(__name__)
+    logger.info("Arguments:\n{}".format(
+        "\n".join(["\t{}: {}".format(arg,getattr(args, arg)) for arg in vars(args)])))
+
+    print_header()
+    run(args, time)
+
+    logging.shutdown()
@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+
+import contextlib
+import io
+import os
+import tempfile
+import rdflib
+from readers import pickler
+
+
+"""
+Small graph of finds and the contexts they were found in, shared by the tests.
+
+Contexts are members of crmeh:EHE0007_Context, as pakbonLD_A1_MP samples them, and some
+of ex:Pit too; most finds are contained in a context, the last ones in none, so that a
+directive which samples the contexts leaves these out.
+"""
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+ABOX = os.path.join(DATA, "abox.nt")
+TBOX = os.path.join(DATA, "tbox.nt")
+
+def mined(directive, abox=ABOX, tbox=TBOX, **overrides):
+    """ Run a directive on a graph, and read back the rules it wrote
+
+    :param directive: an MP directive class
+    :param abox: path of the ABox graph
+    :param tbox: path of the TBox graph
+    :param overrides: parameters which replace those of the directive
+
+    :returns: a RuleBase instance
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "rules")
+        with contextlib.redirect_stdout(io.StringIO()):
+            directive().run(abox, tbox, path, False, **overrides)
+
+        return pickler.read(path+".pickle")
+
+def rules_of(rule_base):
+    """ Return the rules with their counts, in the order of the rule base
+
+    :param rule_base: a RuleBase instance
+
+    :returns: a list of (class, antecedent, consequent, support, confidence) tuples, with the
+              support and confidence as (numerator, denominator) tuples
+    """
+    return [(irule.rule.ctype,
+             irule.rule.antecedent,
+             tuple(sorted(irule.rule.consequent)),
+             (irule.support.numerator, irule.support.denominator),
+             (irule.confidence.numerator, irule.confidence.denominator))
+            for irule in rule_base.model]
+
+def facts_of(path=ABOX):
+    """ Return the facts of a graph, in a fixed order
+
+    :param path: path of the graph
+
+    :returns: a list of (s, p, o) tuples
+    """
+    graph = rdflib.Graph()
+    graph.parse(path, format="nt")
+
+    return sorted(graph)
+
+def write_graph(facts, path):
+    """ Write facts as N-Triples
+
+    :param facts: iterable over (s, p, o) tuples
+    :param path: path to write to
+
+    :returns: none
+    """
+    graph = rdflib.Graph()
+    for fact in facts:
+        graph.add(fact)
+    graph.serialize(path, format="nt", encoding="utf-8")
@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+
+import os
+import tempfile
+import unittest
+from auxiliarly.artifact_cache import ArtifactCache, Journal, digest_of
+from directives.pakbonLD_G4_MP import PakbonLD
+from fixture import mined, rules_of
+
+
+class TestJournal(unittest.TestCase):
+    """ Results recorded in a journal are handed out once on reopening, up to a torn record """
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "stage.journal")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_reopen(self):
+        journal = Journal(self.path)
+        journal.record(range(0, 10), "rows")
+        journal.record(("a", "b"), "queued")
+        journal.record(range(0, 10), "again")
+        journal.close()
+
+        journal = Journal(self.path)
+        self.assertEqual(len(journal), 2)
+        self.assertEqual(journal.output_at(0), (range(0, 10), "rows"))
+        self.assertEqual(journal.output_of(("a", "b")), "queued")
+        self.assertIsNone(journal.output_at(0))
+        self.assertIsNone(journal.output_of(("a", "b")))
+        journal.close()
+
+    def test_torn(self):
+        journal = Journal(self.path)
+        journal.record(range(0, 10), "rows")
+        journal.close()
+        size = os.path.getsize(self.path)
+
+        journal = Journal(self.path)
+        journal.record(range(10, 20), "torn")
+        journal.close()
+        os.truncate(self.path, os.path.getsize(self.path) - 3)
+
+        # the torn record is dropped, and records after it are read back
+        journal = Journal(self.path)
+        self.assertEqual(os.path.getsize(self.path), size)
+        journal.record(range(10, 20), "rows")
+        journal.close()
+
+        journal = Journal(self.path)
+        self.assertEqual(journal.output_at(10), (range(10, 20), "rows"))
+        journal.close()
+
+    def test_digest(self):
+        self.assertEqual(digest_of({"a": {1, 2}, "b": [3]}), digest_of({"b": [3], "a": {2, 1}}))
+        self.assertNotEqual(digest_of((1, 2)), digest_of((2, 1)))
+
+class TestResume(unittest.TestCase):
+    """ Runs which resume from a cache, whole or interrupted, yield the rules of a run without """
+    parameters = {"executor": "serial", "similarity_threshold": .3, "max_cbs_size": 4}
+
+    def test_computed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ArtifactCache(directory)
+            calls = []
+            key = cache.key_of("stage", 1)
+            for _ in range(2):
+                self.assertEqual(cache.computed(key, lambda: calls.append(1) or "artifact"), "artifact")
+            self.assertEqual(len(calls), 1)
+
+        self.assertIsNone(ArtifactCache().key_of("stage", 1))
+
+    def test_resume(self):
+        expected = rules_of(mined(PakbonLD, **self.parameters))
+        self.assertGreater(len(expected), 0)
+
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertEqual(rules_of(mined(PakbonLD, cache=directory, **self.parameters)), expected)
+            with self.assertLogs("auxiliarly.artifact_cache", level="INFO") as logs:
+                self.assertEqual(rules_of(mined(PakbonLD, cache=directory, **self.parameters)), expected)
+            self.assertTrue(any("Resuming" in line for line in logs.output))
+
+            # a run which crashed halfway through every stage left torn journals behind
+            journals = os.path.join(directory, "journals")
+            for name in os.listdir(journals):
+                path = os.path.join(journals, name)
+                os.truncate(path, os.path.getsize(path) // 2)
+            self.assertEqual(rules_of(mined(PakbonLD, cache=directory, **self.parameters)), expected)
+
+            # a later stage with other parameters reuses the earlier ones
+            parameters = dict(self.parameters, minimal_confidence=.5)
+            self.assertEqual(rules_of(mined(PakbonLD, cache=directory, **parameters)),
+                             rules_of(mined(PakbonLD, **parameters)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+#!/usr/bin/python3
+
+import unittest
+import numpy as np
+from models.cbs_store import CBSStore, row_type, table_of, items_of
+
+
+def cbs_of(number, width=3, seed=0):
+    """ Return random CBS of two up to width items, with many duplicates and ties """
+    rng = np.random.default_rng(seed)
+    cbs_ids = [tuple(rng.choice(6, size=rng.integers(2, width+1), replace=False).tolist()) for _ in range(number)]
+    similarities = (rng.integers(1, 4, size=number) / 4).tolist()
+
+    return (cbs_ids, similarities)
+
+def rows_of(table):
+    """ Return the rows of a table as (items, similarity) tuples """
+    return [(tuple(row["items"].tolist()), float(row["similarity"])) for row in table]
+
+class TestSpilledStore(unittest.TestCase):
+    """ The merged table is the same for any budget, and sorted on the items, then the similarity """
+    width = 3
+
+    def merged(self, cbs_ids, similarities, budget=None, batch=10):
+        store = CBSStore(width=self.width, budget=budget)
+        for start in range(0, len(cbs_ids), batch):
+            store.extend(cbs_ids[start:start+batch], similarities[start:start+batch])
+        runs = len(store.runs)
+        table = np.array(table_of(store.merge()))
+        store.close()
+
+        return (table, runs)
+
+    def test_budgets(self):
+        cbs_ids, similarities = cbs_of(200)
+        table, runs = self.merged(cbs_ids, similarities)
+        self.assertEqual(runs, 0)
+        self.assertEqual(len(table), 200)
+
+        expected = sorted((tuple(sorted(ids)) + (-1,) * (self.width - len(ids)), s)
+                          for ids, s in zip(cbs_ids, similarities))
+        self.assertEqual(rows_of(table), expected)
+
+        # a budget of a few rows spills on every batch, and merges runs read back a few rows at a time
+        itemsize = row_type(self.width).itemsize
+        for budget in (1, 3 * itemsize, 25 * itemsize, 10**6):
+            with self.subTest(budget=budget):
+                spilled, runs = self.merged(cbs_ids, similarities, budget)
+                self.assertEqual(rows_of(spilled), rows_of(table))
+                self.assertEqual(runs > 0, budget < 10**6)
+
+    def test_items(self):
+        store = CBSStore(width=self.width)
+        store.extend([(4, 2), (3, 1, 2)], [.5, .75])
+        table = table_of(store.merge())
+
+        self.assertEqual([items_of(row).tolist() for row in table], [[1, 2, 3], [2, 4]])
+        store.close()
+
+if __name__ == "__main__":
+    unittest.main()
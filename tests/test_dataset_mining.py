@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+
+import os
+import tempfile
+import unittest
+import rdflib
+from rdflib.namespace import RDF
+from directives.pakbonLD_G4_MP import PakbonLD
+from fixture import ABOX, mined, rules_of, facts_of, write_graph
+
+
+class TestDatasetMining(unittest.TestCase):
+    """ Rules over datasets are those of each dataset, with counts summed over all of them """
+    parameters = {"similarity_threshold": .3}
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+        # every subject in one dataset, with all its facts
+        self.datasets = []
+        facts = facts_of()
+        subjects = sorted({s for s, _, _ in facts})
+        for k in range(3):
+            path = os.path.join(self.directory.name, "{}.nt".format(k))
+            part = set(subjects[k::3])
+            write_graph((fact for fact in facts if fact[0] in part), path)
+            self.datasets.append(("part{}".format(k), path))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_counts(self):
+        rule_base = mined(PakbonLD, executor="serial", datasets=self.datasets, **self.parameters)
+        rules = rules_of(rule_base)
+        self.assertEqual(len(rule_base.metadata["datasets"]), 3)
+
+        # the rules of every dataset on its own, of which none is lost
+        expected = set()
+        for _, path in self.datasets:
+            expected.update(rule[:3] for rule in rules_of(mined(PakbonLD, path, executor="serial", **self.parameters)))
+        self.assertGreater(len(expected), 0)
+        self.assertEqual({rule[:3] for rule in rules}, expected)
+
+        # the datasets share no subject, so their summed counts are those of the whole graph
+        graph = rdflib.Graph()
+        graph.parse(ABOX, format="nt")
+        for ctype, antecedent, consequent, support, confidence in rules:
+            members = set(graph.subjects(RDF.type, ctype))
+            with_antecedent = {s for s in members if (s,) + antecedent in graph}
+            with_both = {s for s in with_antecedent if all((s,) + item in graph for item in consequent)}
+
+            self.assertEqual(support, (len(with_antecedent), len(members)))
+            self.assertEqual(confidence, (len(with_both), len(with_antecedent)))
+
+    def test_executors(self):
+        rules = rules_of(mined(PakbonLD, executor="serial", datasets=self.datasets, **self.parameters))
+        for executor in ("process", "thread"):
+            with self.subTest(executor=executor):
+                self.assertEqual(rules_of(mined(PakbonLD, executor=executor, workers=2, batch_size=4,
+                                                datasets=self.datasets, **self.parameters)),
+                                 rules)
+
+    def test_unsupported(self):
+        with self.assertRaises(ValueError):
+            mined(PakbonLD, executor="serial", datasets=self.datasets, sample_rate=.5, **self.parameters)
+
+if __name__ == "__main__":
+    unittest.main()
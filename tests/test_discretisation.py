@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+
+import unittest
+import numpy as np
+import rdflib
+from rdflib.namespace import XSD
+from models.knowledge_graph import KnowledgeGraph
+from algorithms import discretisation
+from algorithms.discretisation import discretise, apply_bins, bin_token
+
+EX = rdflib.Namespace("http://example.org/")
+
+
+def graph_of(values, predicate=EX.depth, datatype=XSD.decimal):
+    """ Return a knowledge graph with one subject per value """
+    graph = rdflib.Graph()
+    for i, value in enumerate(values):
+        graph.add((EX["s{}".format(i)], predicate, rdflib.Literal(value, datatype=datatype)))
+
+    return KnowledgeGraph(graph)
+
+class TestStrategies(unittest.TestCase):
+    """ Every strategy places the cut points as it defines, and replaces values by their bin """
+    def test_equal_width(self):
+        values = np.array([0., 1., 2., 3., 10.])
+        self.assertEqual(discretisation.equal_width_cut_points(values, 5).tolist(), [2., 4., 6., 8.])
+
+    def test_equal_frequency(self):
+        values = np.arange(1., 11.)
+        cut_points = discretisation.equal_frequency_cut_points(values, 2)
+        self.assertEqual(cut_points.tolist(), [5.5])
+
+        # a cut point at the minimum would leave the lowest bin empty
+        values = np.array([1., 1., 1., 1., 2.])
+        self.assertTrue(all(discretisation.equal_frequency_cut_points(values, 4) > 1.))
+
+    def test_mdl(self):
+        # the classes separate at 3.5, and within both sides no cut gains anything
+        values = np.array([1., 2., 3., 4., 5., 6.] * 4)
+        labels = ["low" if v < 3.5 else "high" for v in values]
+        self.assertEqual(discretisation.mdl_cut_points(values, labels).tolist(), [3.5])
+
+        # without classes to separate, there is nothing to cut
+        self.assertEqual(len(discretisation.mdl_cut_points(values, ["one"] * len(values))), 0)
+
+    def test_discretise(self):
+        values = [float(v) for v in range(12)]
+        kg, bins = discretise(graph_of(values), strategy="equal_width", number_of_bins=3)
+
+        self.assertEqual(list(bins.keys()), [EX.depth])
+        tokens = {s: o for s, _, o in kg.graph}
+        self.assertEqual(tokens[EX.s0], bin_token(bins[EX.depth], 0.))
+        self.assertEqual(len(set(tokens.values())), 3)
+
+        # the same bins, applied to another graph, yield the same tokens
+        self.assertEqual(set(o for _, _, o in apply_bins(graph_of(values), bins).graph), set(tokens.values()))
+
+    def test_few_values(self):
+        # predicates with no more distinct values than bins are kept as they are
+        kg, bins = discretise(graph_of([1., 2., 1., 2.]), number_of_bins=5)
+        self.assertEqual(bins, {})
+        self.assertEqual(len(kg.graph), 4)
+
+class TestTokens(unittest.TestCase):
+    """ Tokens tell bins apart, and only finite numbers fall in one """
+    def test_distinct_cut_points(self):
+        cut_points = [1234567., 1234568.]
+        self.assertNotEqual(bin_token(cut_points, 1.), bin_token(cut_points, 1234567.5))
+        self.assertNotEqual(bin_token(cut_points, 1234567.5), bin_token(cut_points, 1e9))
+
+    def test_bounds(self):
+        self.assertEqual(str(bin_token([1.5], 0.)), "[-inf, 1.5)")
+        self.assertEqual(str(bin_token([1.5], 1.5)), "[1.5, inf)")
+
+    def test_non_finite(self):
+        for literal in ("nan", "inf", "-Infinity"):
+            with self.subTest(literal=literal):
+                self.assertIsNone(discretisation._numeric_value_of(rdflib.Literal(literal)))
+        self.assertIsNone(discretisation._numeric_value_of(rdflib.Literal("NaN", datatype=XSD.double)))
+        self.assertEqual(discretisation._numeric_value_of(rdflib.Literal("2.5")), 2.5)
+
+        # values which are not numbers are left as they are
+        values = [float(v) for v in range(8)] + ["nan"]
+        kg, bins = discretise(graph_of(values, datatype=None), strategy="equal_frequency", number_of_bins=2)
+        self.assertTrue(all(np.isfinite(bins[EX.depth])))
+        self.assertIn(rdflib.Literal("nan"), set(kg.graph.objects(EX.s8, EX.depth)))
+
+if __name__ == "__main__":
+    unittest.main()
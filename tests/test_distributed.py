@@ -0,0 +1,70 @@
+#!/usr/bin/python3
+
+import multiprocessing
+import os
+import socket
+import tempfile
+import unittest
+from unittest import mock
+from auxiliarly import distributed
+from auxiliarly.distributed import AUTHKEY_VARIABLE, address_of
+from directives.pakbonLD_G4_MP import PakbonLD
+from fixture import mined, rules_of
+
+AUTHKEY = "secret"
+
+
+def free_port():
+    """ Return a port on localhost which nothing listens on """
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+class TestDistributed(unittest.TestCase):
+    """ Workers which join a coordinator over TCP yield the rules of a serial run """
+    parameters = {"similarity_threshold": .3}
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.coordinator = "localhost:{}".format(free_port())
+
+        # workers keep trying to reach their coordinator until it listens
+        self.workers = [multiprocessing.Process(target=distributed._serve,
+                                                args=(address_of(self.coordinator),
+                                                      AUTHKEY.encode(),
+                                                      self.directory.name),
+                                                daemon=True)
+                        for _ in range(2)]
+        for process in self.workers:
+            process.start()
+
+    def tearDown(self):
+        for process in self.workers:
+            process.kill()
+            process.join()
+        self.directory.cleanup()
+
+    def test_rules(self):
+        serial = rules_of(mined(PakbonLD, executor="serial", **self.parameters))
+        self.assertGreater(len(serial), 0)
+
+        with mock.patch.dict(os.environ, {AUTHKEY_VARIABLE: AUTHKEY}):
+            # a second run reuses the snapshots the workers keep of the first
+            for _ in range(2):
+                rules = rules_of(mined(PakbonLD, executor="distributed", workers=2, batch_size=4,
+                                       coordinator=self.coordinator, task_timeout=60., **self.parameters))
+                self.assertEqual(rules, serial)
+
+    def test_address(self):
+        self.assertEqual(address_of("localhost:7000"), ("localhost", 7000))
+        for text in ("localhost", ":7000", "localhost:port"):
+            with self.subTest(text=text):
+                with self.assertRaises(ValueError):
+                    address_of(text)
+
+        with mock.patch.dict(os.environ, {AUTHKEY_VARIABLE: ""}):
+            with self.assertRaises(ValueError):
+                mined(PakbonLD, executor="distributed", workers=2, coordinator=self.coordinator, **self.parameters)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+#!/usr/bin/python3
+
+import os
+import unittest
+from rdflib.namespace import RDF
+from readers import rdf
+from models.encoded_graph import encode, attach, branch_of
+from algorithms.semantic_rule_learning import generate_semantic_item_sets
+from fixture import ABOX, TBOX
+
+
+class TestEncodedGraph(unittest.TestCase):
+    """ An attached copy of an encoded graph holds the item sets, classes, and branches of the graph """
+    def setUp(self):
+        self.kg_i = rdf.read(local_path=ABOX)
+        self.kg_s = rdf.read(local_path=TBOX)
+        self.item_sets = sorted(generate_semantic_item_sets(self.kg_i).items(), key=str)
+        self.encoded_graph = encode(self.kg_i, self.kg_s, self.item_sets)
+
+    def tearDown(self):
+        self.encoded_graph.close()
+
+    def test_attached(self):
+        terms = self.encoded_graph.terms
+        attached = attach(self.encoded_graph.directory)
+        self.assertEqual(attached.number_of_items(), len(self.item_sets))
+
+        for i, (pa, es) in enumerate(self.item_sets):
+            self.assertEqual(self.encoded_graph.item_of(i), pa)
+            self.assertEqual({terms[s] for s in attached.postings(i).tolist()}, set(es))
+            for s in attached.postings(i).tolist():
+                self.assertIn(i, attached.items_of([s]).tolist())
+
+        for ctype in set(self.kg_i.graph.objects(None, RDF.type)):
+            c = terms.index(ctype)
+            members = attached.members_of(c).tolist()
+            self.assertEqual({terms[s] for s in members}, set(self.kg_i.graph.subjects(RDF.type, ctype)))
+            self.assertTrue(all(c in attached.types_of(s).tolist() for s in members))
+            self.assertEqual({terms[k] for k in attached.branch_of(c)}, set(branch_of(self.kg_s, ctype)))
+
+    def test_order(self):
+        # terms are numbered in sorted order, whatever the order of the facts or the process
+        terms = self.encoded_graph.terms
+        self.assertEqual(terms, sorted(terms, key=lambda term: (type(term).__name__, str(term))))
+
+    def test_close(self):
+        directory = self.encoded_graph.directory
+        self.encoded_graph.close()
+        self.assertFalse(os.path.exists(directory))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+
+import unittest
+import rdflib
+from rdflib.namespace import SKOS
+from models.knowledge_graph import KnowledgeGraph
+from algorithms.generalisation import concept_closure, generalise_item_sets, suppress_cross_level
+
+EX = rdflib.Namespace("http://example.org/")
+
+
+def vocabulary():
+    """ Return a vocabulary in which bronze and iron are metals, and metals and stone are materials """
+    graph = rdflib.Graph()
+    graph.add((EX.bronze, SKOS.broader, EX.metal))
+    graph.add((EX.iron, SKOS.broaderTransitive, EX.metal))
+    graph.add((EX.material, SKOS.narrower, EX.metal))
+    graph.add((EX.material, SKOS.narrower, EX.stone))
+
+    return KnowledgeGraph(graph)
+
+class TestClosure(unittest.TestCase):
+    """ Every concept is closed over its broader concepts, whichever way the links go """
+    def test_closure(self):
+        closure = concept_closure(vocabulary())
+
+        self.assertEqual(closure[EX.bronze], frozenset({EX.metal, EX.material}))
+        self.assertEqual(closure[EX.iron], frozenset({EX.metal, EX.material}))
+        self.assertEqual(closure[EX.stone], frozenset({EX.material}))
+        self.assertEqual(closure.get(EX.material, frozenset()), frozenset())
+
+    def test_cycle(self):
+        graph = rdflib.Graph()
+        graph.add((EX.a, SKOS.broader, EX.b))
+        graph.add((EX.b, SKOS.broader, EX.a))
+        closure = concept_closure(KnowledgeGraph(graph))
+
+        self.assertEqual(closure[EX.a], frozenset({EX.b}))
+        self.assertEqual(closure[EX.b], frozenset({EX.a}))
+
+class TestGeneralisation(unittest.TestCase):
+    """ Generalised items hold the members of all their narrower items, unless no more than one of them """
+    def setUp(self):
+        self.closure = concept_closure(vocabulary())
+        self.kg = KnowledgeGraph(rdflib.Graph())
+        self.item_sets = {(EX.material, EX.bronze): {EX.f0, EX.f1},
+                          (EX.material, EX.iron): {EX.f2}}
+        for (p, o), subjects in self.item_sets.items():
+            for s in subjects:
+                self.kg.graph.add((s, p, o))
+
+    def test_roll_up(self):
+        item_sets = generalise_item_sets(self.kg, self.item_sets, self.closure)
+        self.assertEqual(item_sets[(EX.material, EX.metal)], {EX.f0, EX.f1, EX.f2})
+
+        # all materials are metals, so the broadest item adds nothing
+        self.assertNotIn((EX.material, EX.material), item_sets)
+        self.assertEqual(len(item_sets), 3)
+
+        # the generalised facts are added to the graph, for rule evaluation
+        self.assertEqual(set(self.kg.graph.subjects(EX.material, EX.metal)), {EX.f0, EX.f1, EX.f2})
+        self.assertEqual(len(list(self.kg.graph.subjects(EX.material, EX.material))), 0)
+
+    def test_single_leaf(self):
+        # a generalisation of only one item covers no more than that item
+        item_sets = generalise_item_sets(self.kg, {(EX.material, EX.iron): {EX.f2}}, self.closure)
+        self.assertEqual(item_sets, {(EX.material, EX.iron): {EX.f2}})
+
+    def test_cross_level(self):
+        es = frozenset({EX.f0})
+        cbs_list = [(frozenset({(es, (EX.material, EX.bronze)), (es, (EX.material, EX.metal))}), 1.),
+                    (frozenset({(es, (EX.material, EX.bronze)), (es, (EX.period, EX.roman))}), 1.)]
+        self.assertEqual(suppress_cross_level(cbs_list, self.closure), cbs_list[1:])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+#!/usr/bin/python3
+
+import os
+import random
+import tempfile
+import unittest
+from directives import pakbonLD_A1_MP, pakbonLD_G4_MP
+from readers import rdf
+from algorithms.incremental_mining import update_incrementally
+from fixture import TBOX, mined, rules_of, facts_of, write_graph
+
+
+class TestIncrementalMining(unittest.TestCase):
+    """ Updating the rules of an earlier run yields the rules of a full run on the updated ABox """
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.facts = facts_of()
+        random.Random(1).shuffle(self.facts)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path_of(self, name, facts=None):
+        path = os.path.join(self.directory.name, name)
+        if facts is not None:
+            write_graph(facts, path)
+
+        return path
+
+    def assertUpdates(self, directive, **parameters):
+        # mine most of the facts, then add the others, and remove some of those mined first
+        cut = int(.8 * len(self.facts))
+        initial, added, removed = self.facts[:cut], self.facts[cut:], self.facts[:cut//8]
+        state = self.path_of("state.pickle")
+        mined(directive, self.path_of("initial.nt", initial), TBOX, executor="serial", state=state, **parameters)
+
+        rule_base = update_incrementally(state, rdf.read(local_path=self.path_of("added.nt", added)), None)
+        full = mined(directive, self.path_of("all.nt", self.facts), TBOX, executor="serial", **parameters)
+        self.assertGreater(full.size(), 0)
+        self.assertEqual(sorted(rules_of(rule_base)), sorted(rules_of(full)))
+
+        rule_base = update_incrementally(state, None, rdf.read(local_path=self.path_of("removed.nt", removed)))
+        full = mined(directive, self.path_of("rest.nt", self.facts[cut//8:]), TBOX, executor="serial", **parameters)
+        self.assertEqual(sorted(rules_of(rule_base)), sorted(rules_of(full)))
+
+    def test_unsampled(self):
+        self.assertUpdates(pakbonLD_G4_MP.PakbonLD, similarity_threshold=.3)
+
+    def test_sampled(self):
+        # the contexts are sampled with the finds they contain, so a find added to a
+        # context changes the sample of that context, and finds in none are left out
+        self.assertUpdates(pakbonLD_A1_MP.PakbonLD)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+
+import math
+import unittest
+from statistics import NormalDist
+import numpy as np
+from algorithms.interestingness import measures_from_counts, intervals_from_counts, adjust_p_values
+
+
+class TestMeasures(unittest.TestCase):
+    """ Measures computed from the counts equal those of the contingency table """
+    def test_dependent(self):
+        # 100 members, 50 with the antecedent, 50 with the consequent, 40 with both
+        counts = (np.array([100.]), np.array([50.]), np.array([50.]), np.array([40.]))
+        lift, conviction, leverage, p_values = measures_from_counts(*counts)
+
+        self.assertAlmostEqual(lift[0][0], 1.6)
+        self.assertAlmostEqual(conviction[0][0], 2.5)
+        self.assertAlmostEqual(leverage[0][0], .15)
+
+        # chi-square is 36, and with one degree of freedom its p-value is that of a normal |z| >= 6
+        self.assertAlmostEqual(p_values[0] / (2 * NormalDist().cdf(-6.)), 1., places=6)
+
+    def test_independent(self):
+        counts = (np.array([100.]), np.array([50.]), np.array([20.]), np.array([10.]))
+        lift, conviction, leverage, p_values = measures_from_counts(*counts)
+
+        self.assertAlmostEqual(lift[0][0], 1.)
+        self.assertAlmostEqual(conviction[0][0], 1.)
+        self.assertAlmostEqual(leverage[0][0], 0.)
+        self.assertEqual(p_values[0], 1.)
+
+    def test_degenerate(self):
+        # a rule which never fails has an infinite conviction
+        counts = (np.array([10.]), np.array([5.]), np.array([8.]), np.array([5.]))
+        self.assertEqual(measures_from_counts(*counts)[1][0][0], math.inf)
+
+        # every member satisfies the consequent: nothing can be tested
+        counts = (np.array([10.]), np.array([5.]), np.array([10.]), np.array([5.]))
+        lift, conviction, leverage, p_values = measures_from_counts(*counts)
+
+        self.assertEqual(conviction[0][0], 1.)
+        self.assertEqual(p_values[0], 1.)
+
+class TestIntervals(unittest.TestCase):
+    """ Intervals contain the estimate, and narrow to it as the sample covers the population """
+    def test_intervals(self):
+        lower, upper = intervals_from_counts([5., 5., 0.], [10., 20., 0.], [100., 20., 100.])
+
+        self.assertLess(lower[0], .5)
+        self.assertGreater(upper[0], .5)
+        self.assertAlmostEqual(lower[1], .25)
+        self.assertAlmostEqual(upper[1], .25)
+        self.assertEqual((lower[2], upper[2]), (0., 1.))
+
+class TestCorrections(unittest.TestCase):
+    """ Corrected p-values follow their definitions, in the order of the input """
+    p_values = np.array([.01, .04, .03])
+
+    def test_none(self):
+        self.assertEqual(adjust_p_values(self.p_values, "none").tolist(), self.p_values.tolist())
+
+    def test_bonferroni(self):
+        np.testing.assert_allclose(adjust_p_values(self.p_values, "bonferroni"), [.03, .12, .09])
+        np.testing.assert_allclose(adjust_p_values(np.array([.5, .6]), "bonferroni"), [1., 1.])
+
+    def test_holm(self):
+        # .01 * 3, .03 * 2, and .04 * 1 raised to the .06 before it
+        np.testing.assert_allclose(adjust_p_values(self.p_values, "holm"), [.03, .06, .06])
+
+    def test_fdr_bh(self):
+        # .01 * 3/1, .03 * 3/2 lowered to the .04 after it, and .04 * 3/3
+        np.testing.assert_allclose(adjust_p_values(self.p_values, "fdr_bh"), [.03, .04, .04])
+
+if __name__ == "__main__":
+    unittest.main()
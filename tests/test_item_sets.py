@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+
+import unittest
+import rdflib
+from models.knowledge_graph import KnowledgeGraph
+from readers import rdf
+from algorithms.mining_engine import DEFAULT_PARAMETERS, generate_item_sets, _item_sets_of
+from algorithms.semantic_rule_learning import generate_semantic_item_sets
+from fixture import ABOX
+
+EX = rdflib.Namespace("http://example.org/")
+
+
+class TestShardedItemSets(unittest.TestCase):
+    """ Item sets generated in shards of the subjects equal those of the whole graph """
+    def test_executors(self):
+        kg = rdf.read(local_path=ABOX)
+        expected = {k: frozenset(v) for k, v in generate_semantic_item_sets(kg).items()}
+
+        item_sets = generate_item_sets(kg, dict(DEFAULT_PARAMETERS, executor="serial", workers=1))
+        self.assertEqual(item_sets, expected)
+
+        # the order does not depend on the executor or the number of shards
+        for executor, workers in (("serial", 3), ("process", 3), ("process", 7), ("thread", 2)):
+            with self.subTest(executor=executor, workers=workers):
+                parameters = dict(DEFAULT_PARAMETERS, executor=executor, workers=workers)
+                self.assertEqual(list(generate_item_sets(kg, parameters).items()), list(item_sets.items()))
+
+class TestPathItemSets(unittest.TestCase):
+    """ Every sampled individual gets one (path, o) item per object at the end of a context path """
+    def setUp(self):
+        # context a contains context b, and both are sampled
+        graph = rdflib.Graph()
+        for s, p, o in (("a", "soil", "clay"), ("a", "contains", "b"), ("a", "contains", "g"),
+                        ("b", "soil", "sand"), ("b", "contains", "f"),
+                        ("f", "material", "bronze"), ("g", "material", "iron")):
+            graph.add((EX[s], EX[p], EX[o]))
+        self.kg = KnowledgeGraph(graph)
+
+        self.context = [EX.soil, (EX.contains, EX.material), (EX.contains, EX.soil)]
+        self.individuals = frozenset({EX.a, EX.b})
+
+    def test_paths(self):
+        expected = {(EX.soil, EX.clay): {EX.a},
+                    (EX.soil, EX.sand): {EX.b},
+                    (EX.contains/EX.material, EX.iron): {EX.a},
+                    (EX.contains/EX.material, EX.bronze): {EX.b},
+                    (EX.contains/EX.soil, EX.sand): {EX.a}}
+
+        for executor, workers in (("serial", 1), ("process", 2)):
+            with self.subTest(executor=executor, workers=workers):
+                parameters = dict(DEFAULT_PARAMETERS, executor=executor, workers=workers)
+                item_sets = generate_item_sets(self.kg, parameters, paths=(self.context, self.individuals))
+                self.assertEqual(item_sets, expected)
+
+    def test_without_sample(self):
+        parameters = dict(DEFAULT_PARAMETERS, executor="serial", path_item_sets=True)
+        with self.assertRaises(ValueError):
+            _item_sets_of(self.kg, None, parameters, None)
+
+if __name__ == "__main__":
+    unittest.main()
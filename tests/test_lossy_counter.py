@@ -0,0 +1,50 @@
+#!/usr/bin/python3
+
+import math
+import random
+import unittest
+from collections import Counter
+from auxiliarly.lossy_counter import LossyCounter
+
+
+class TestBounds(unittest.TestCase):
+    """ Counts are at most error * N below the truth, and no frequent key is dropped """
+    def test_bounds(self):
+        rng = random.Random(1)
+        for error in (.1, .02, .005):
+            with self.subTest(error=error):
+                counter = LossyCounter(error)
+                counts = Counter()
+                for _ in range(5000):
+                    # few keys are frequent, most are rare
+                    keys = {int(rng.paretovariate(1.)) for _ in range(rng.randint(1, 4))}
+                    counter.add(keys)
+                    counts.update(keys)
+
+                self.assertLessEqual(counter.bound(), error * counter.n)
+                for key, count in counts.items():
+                    self.assertLessEqual(counter.count_of(key), count)
+                    self.assertGreaterEqual(counter.count_of(key), count - counter.bound())
+                    if count > error * counter.n:
+                        self.assertIn(key, counter)
+
+                # the keys kept grow with the logarithm of the transactions only
+                self.assertLess(len(counter), len(counts))
+                self.assertLessEqual(len(counter), math.ceil(1 / error) * math.log(error * counter.n + 1) + 1 / error)
+
+    def test_exact(self):
+        # within the first bucket, nothing is dropped and the counts are exact
+        counter = LossyCounter(.01)
+        for keys in ({"a", "b"}, {"a"}, {"c"}):
+            counter.add(keys)
+        self.assertEqual({key: counter.count_of(key) for key in counter.keys()}, {"a": 2, "b": 1, "c": 1})
+        self.assertEqual(counter.bound(), 0)
+
+    def test_error(self):
+        for error in (0., 1., -.5):
+            with self.subTest(error=error):
+                with self.assertRaises(ValueError):
+                    LossyCounter(error)
+
+if __name__ == "__main__":
+    unittest.main()
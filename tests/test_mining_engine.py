@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+
+import unittest
+from directives.pakbonLD_G4_MP import PakbonLD
+from fixture import mined, rules_of
+
+
+class TestExecutors(unittest.TestCase):
+    """ All executors run the same stages, so yield the same rules in the same order """
+    parameters = {"similarity_threshold": .3}
+
+    def test_executors(self):
+        serial = rules_of(mined(PakbonLD, executor="serial", **self.parameters))
+        self.assertGreater(len(serial), 0)
+
+        for executor in ("process", "thread"):
+            with self.subTest(executor=executor):
+                rules = rules_of(mined(PakbonLD, executor=executor, workers=2, batch_size=4, **self.parameters))
+                self.assertEqual(rules, serial)
+
+    def test_spilled(self):
+        unspilled = rules_of(mined(PakbonLD, executor="serial", max_cbs_size=4, **self.parameters))
+        self.assertGreater(len(unspilled), 0)
+
+        for executor in ("serial", "process"):
+            with self.subTest(executor=executor):
+                # with a budget of one byte, every CBS kept to be extended is spilled
+                with self.assertLogs("models.cbs_store", level="INFO") as logs:
+                    rules = rules_of(mined(PakbonLD, executor=executor, workers=2, max_cbs_size=4, cbs_budget=1,
+                                           **self.parameters))
+                self.assertTrue(any("runs" in line for line in logs.output))
+
+                # rules which rank equal may come in another order
+                self.assertEqual(sorted(rules), sorted(unspilled))
+
+class TestPipeline(unittest.TestCase):
+    """ Stages held back by a full queue yield the rules of stages which are not """
+    parameters = {"similarity_threshold": .3, "max_cbs_size": 4}
+
+    def test_capacity(self):
+        rules = rules_of(mined(PakbonLD, executor="serial", **self.parameters))
+        self.assertGreater(len(rules), 0)
+
+        for executor in ("serial", "process", "thread"):
+            for capacity in (1, 64):
+                with self.subTest(executor=executor, capacity=capacity):
+                    self.assertEqual(rules_of(mined(PakbonLD, executor=executor, workers=2, batch_size=2,
+                                                    pipeline_capacity=capacity, **self.parameters)),
+                                     rules)
+
+class TestTimeBudget(unittest.TestCase):
+    """ Runs within their budget yield all rules, and runs beyond it some of them """
+    parameters = {"executor": "serial", "similarity_threshold": .3}
+
+    def test_budgets(self):
+        rules = sorted(rules_of(mined(PakbonLD, **self.parameters)))
+
+        rule_base = mined(PakbonLD, time_budget=3600., **self.parameters)
+        self.assertEqual(sorted(rules_of(rule_base)), rules)
+        self.assertTrue(rule_base.metadata["complete"])
+        self.assertFalse(rule_base.metadata["expired"])
+
+        rule_base = mined(PakbonLD, time_budget=1e-9, **self.parameters)
+        self.assertLessEqual(set(rules_of(rule_base)), set(rules))
+        self.assertFalse(rule_base.metadata["complete"])
+        self.assertTrue(rule_base.metadata["expired"])
+
+if __name__ == "__main__":
+    unittest.main()
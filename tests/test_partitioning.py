@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+
+import os
+import tempfile
+import unittest
+import rdflib
+from rdflib.namespace import RDF, RDFS
+from models.knowledge_graph import KnowledgeGraph
+from algorithms.partitioning import partitions_of, partition_item_sets
+from directives.pakbonLD_G4_MP import PakbonLD
+from fixture import ABOX, TBOX, mined, rules_of, write_graph
+
+EX = rdflib.Namespace("http://example.org/")
+CRMEH = rdflib.Namespace("http://purl.org/crmeh#")
+
+
+class TestPartitions(unittest.TestCase):
+    """ Subjects fall in the partition of the root of each class they have """
+    def test_partitions(self):
+        instance_graph = rdflib.Graph()
+        for s, ctype in ((EX.f0, EX.Pot), (EX.f1, EX.Coin), (EX.f1, EX.Pit), (EX.c0, EX.Pit), (EX.x, EX.Other)):
+            instance_graph.add((s, RDF.type, ctype))
+        ontology_graph = rdflib.Graph()
+        for ctype, sclass in ((EX.Pot, EX.Find), (EX.Coin, EX.Find), (EX.Pit, EX.Context)):
+            ontology_graph.add((ctype, RDFS.subClassOf, sclass))
+
+        partitions = partitions_of(KnowledgeGraph(instance_graph), KnowledgeGraph(ontology_graph))
+        self.assertEqual({root: sorted(members) for root, members in partitions.items()},
+                         {EX.Find: [(EX.f0, EX.Pot), (EX.f1, EX.Coin)],
+                          EX.Context: [(EX.c0, EX.Pit), (EX.f1, EX.Pit)],
+                          EX.Other: [(EX.x, EX.Other)]})
+
+    def test_item_sets(self):
+        item_sets = [((EX.p, EX.a), frozenset({EX.f0, EX.c0})),
+                     ((EX.p, EX.b), frozenset({EX.c0})),
+                     ((EX.p, EX.c), frozenset({EX.f1, EX.f0}))]
+        self.assertEqual(partition_item_sets(item_sets, [(EX.f0, EX.Pot), (EX.f1, EX.Coin)]),
+                         [((EX.p, EX.a), frozenset({EX.f0})), ((EX.p, EX.c), frozenset({EX.f1, EX.f0}))])
+
+class TestPartitionedMining(unittest.TestCase):
+    """ Rules of partitioned runs are counted over all members of their class, on any executor """
+    parameters = {"similarity_threshold": .3, "partition_by_class": True}
+
+    def test_counts(self):
+        # finds and contexts on branches of their own, rather than below one root
+        with tempfile.TemporaryDirectory() as directory:
+            tbox = os.path.join(directory, "tbox.nt")
+            ontology_graph = rdflib.Graph()
+            ontology_graph.parse(TBOX, format="nt")
+            write_graph((fact for fact in ontology_graph if fact[2] != EX.Thing), tbox)
+
+            rule_base = mined(PakbonLD, tbox=tbox, executor="serial", **self.parameters)
+            rules = rules_of(rule_base)
+            self.assertEqual(rule_base.metadata["partitions"], 2)
+
+            # both partitions yield rules
+            ctypes = {ctype for ctype, _, _, _, _ in rules}
+            self.assertTrue(ctypes & {EX.Pot, EX.Coin, EX.Bone})
+            self.assertTrue(ctypes & {EX.Pit, CRMEH.EHE0007_Context})
+
+            for executor in ("process", "thread"):
+                with self.subTest(executor=executor):
+                    self.assertEqual(rules_of(mined(PakbonLD, tbox=tbox, executor=executor, workers=2,
+                                                    **self.parameters)),
+                                     rules)
+
+        graph = rdflib.Graph()
+        graph.parse(ABOX, format="nt")
+        for ctype, antecedent, consequent, support, confidence in rules:
+            members = set(graph.subjects(RDF.type, ctype))
+            with_antecedent = {s for s in members if (s,) + antecedent in graph}
+            with_both = {s for s in with_antecedent if all((s,) + item in graph for item in consequent)}
+
+            self.assertEqual(support, (len(with_antecedent), len(members)))
+            self.assertEqual(confidence, (len(with_both), len(with_antecedent)))
+
+if __name__ == "__main__":
+    unittest.main()
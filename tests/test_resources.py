@@ -0,0 +1,28 @@
+#!/usr/bin/python3
+
+import unittest
+from math import floor
+from auxiliarly.resources import cpu_limit, memory_in_use, number_of_workers, worker_memory_of
+
+
+class TestNumberOfWorkers(unittest.TestCase):
+    """ Pools are no larger than the CPUs and the memory budget allow, and have at least one worker """
+    def test_cpus(self):
+        self.assertGreaterEqual(cpu_limit(), 1.)
+        self.assertEqual(number_of_workers(), max(1, floor(cpu_limit())))
+        self.assertEqual(number_of_workers(worker_memory=2**30, memory_budget=2**60), max(1, floor(cpu_limit())))
+
+    def test_memory(self):
+        # room for two and a half workers of a GiB next to this process
+        worker_memory = 2**30
+        memory_budget = memory_in_use() + 5 * worker_memory // 2
+        self.assertEqual(number_of_workers(worker_memory, memory_budget), min(2, max(1, floor(cpu_limit()))))
+
+        # no room at all
+        self.assertEqual(number_of_workers(worker_memory, memory_budget=0), 1)
+
+    def test_worker_memory(self):
+        self.assertLess(worker_memory_of(0), worker_memory_of(2**20))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+#!/usr/bin/python3
+
+import os
+import tempfile
+import unittest
+from directives.pakbonLD_G4_MP import PakbonLD
+from readers import rule_set as rule_set_reader
+from writers import rule_set as rule_set_writer
+from fixture import mined
+
+
+class TestRoundTrip(unittest.TestCase):
+    """ Rules read back from a pretty printed rule set equal those written """
+    parameters = {"executor": "serial", "similarity_threshold": .3}
+
+    def assertRoundTrip(self, rule_base):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "rules")
+            rule_set_writer.pretty_write(rule_base, path)
+            read = rule_set_reader.read(path)
+
+        written = rule_base.model
+        self.assertGreater(len(written), 0)
+        self.assertEqual(len(read.model), len(written))
+        for irule, expected in zip(read.model, written):
+            self.assertEqual((irule.rule.ctype, irule.rule.antecedent, irule.rule.consequent),
+                             (expected.rule.ctype, expected.rule.antecedent, expected.rule.consequent))
+            for name in ("support", "confidence", "lift", "leverage"):
+                self.assertEqual(irule.measure(name).value, written_as(expected.measure(name).value))
+
+        return read
+
+    def test_rules(self):
+        read = self.assertRoundTrip(mined(PakbonLD, **self.parameters))
+        self.assertTrue(all(irule.support.lower is None for irule in read.model))
+
+    def test_sampled_rules(self):
+        # estimates on a sample are written with their confidence intervals
+        rule_base = mined(PakbonLD, sample_rate=.5, **self.parameters)
+        read = self.assertRoundTrip(rule_base)
+
+        for irule, expected in zip(read.model, rule_base.model):
+            for name in ("support", "confidence"):
+                self.assertEqual(irule.measure(name).lower, written_as(expected.measure(name).lower))
+                self.assertEqual(irule.measure(name).upper, written_as(expected.measure(name).upper))
+
+def written_as(value):
+    # measures are written with three decimals
+    return float("{:.3f}".format(value))
+
+if __name__ == "__main__":
+    unittest.main()
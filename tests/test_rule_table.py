@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+
+import unittest
+import numpy as np
+from models.rule_table import COUNTS, pack, concatenate
+from models.rule_base import RuleBase
+
+
+def table_of(number, seed=0):
+    """ Return a table of random rules, with counts which often tie """
+    rng = np.random.default_rng(seed)
+    rules = [(int(rng.integers(2)), int(rng.integers(5)), tuple(int(i) for i in rng.integers(5, size=rng.integers(1, 4))))
+             for _ in range(number)]
+    table = pack(rules)
+    table.terms = ["class{}".format(i) for i in range(2)]
+    table.items = [("p", "o{}".format(i)) for i in range(5)]
+
+    n = rng.integers(1, 5, size=number) * 4
+    a = n // rng.integers(1, 3, size=number)
+    table.records["n"], table.records["a"] = n, a
+    table.records["ac"] = a // rng.integers(1, 3, size=number)
+    table.records["c"] = table.records["ac"]
+
+    return (table, rules)
+
+class TestRecords(unittest.TestCase):
+    """ Packed rules read back as they were packed, also once concatenated """
+    def test_pack(self):
+        table, rules = table_of(20)
+        for i, (ctype, antecedent, consequent) in enumerate(rules):
+            self.assertEqual((ctype, antecedent, tuple(table.rule_of(i)[2].tolist())), rules[i])
+
+    def test_concatenate(self):
+        (first, rules), (second, more_rules) = table_of(7), table_of(5, seed=1)
+        table = concatenate([first, second])
+        self.assertEqual([(c, a, tuple(q.tolist())) for c, a, q in (table.rule_of(i) for i in range(len(table)))],
+                         rules + more_rules)
+
+    def test_with_counts(self):
+        table, _ = table_of(6)
+        chunks = [np.array([(4, 8, 4, 2, 1), (1, 8, 2, 2, 2)], dtype=COUNTS),
+                  np.array([(3, 4, 4, 4, 4)], dtype=COUNTS)]
+        evaluated = table.with_counts(chunks)
+
+        # only evaluated rules are kept, in the order of the table
+        self.assertEqual(evaluated.records["antecedent"].tolist(), table.records["antecedent"][[1, 3, 4]].tolist())
+        self.assertEqual(evaluated.values_of("support").tolist(), [.25, 1., .5])
+        self.assertEqual(evaluated.values_of("confidence").tolist(), [1., 1., .25])
+
+    def test_irules(self):
+        table, rules = table_of(4)
+        for irule, record, (ctype, antecedent, consequent) in zip(table, table.records, rules):
+            self.assertEqual(irule.rule.ctype, table.terms[ctype])
+            self.assertEqual(irule.rule.antecedent, table.items[antecedent])
+            self.assertEqual((irule.support.numerator, irule.support.denominator), (record["a"], record["n"]))
+            self.assertEqual((irule.confidence.numerator, irule.confidence.denominator), (record["ac"], record["a"]))
+
+class TestRanking(unittest.TestCase):
+    """ Tables rank as a RuleBase does, and runs ranked by the workers merge into the same ranking """
+    by = ("confidence", "support")
+
+    def test_order(self):
+        table, _ = table_of(50)
+        rule_base = RuleBase()
+        for irule in table:
+            rule_base.add(irule)
+        rule_base.sort(by=self.by)
+
+        ranked = table.ranked(self.by)
+        self.assertEqual([(irule.rule.ctype, irule.rule.antecedent, irule.support.numerator, irule.confidence.numerator)
+                          for irule in ranked],
+                         [(irule.rule.ctype, irule.rule.antecedent, irule.support.numerator, irule.confidence.numerator)
+                          for irule in rule_base.model])
+
+    def test_merge(self):
+        table, _ = table_of(50)
+        expected = table.ranked(self.by).records.tolist()
+
+        # every worker ranks its own chunk of the evaluated rules
+        chunks = []
+        for start, stop in ((0, 12), (12, 13), (13, 40), (40, 50)):
+            counts = np.zeros(stop - start, dtype=COUNTS)
+            counts["index"] = np.arange(start, stop)
+            for name in ("n", "a", "c", "ac"):
+                counts[name] = table.records[name][start:stop]
+            chunks.append(counts[table[start:stop].order(self.by)])
+        runs = table.with_counts(chunks, self.by)
+        self.assertEqual(len(runs.runs), 4)
+
+        self.assertEqual(runs.ranked(self.by).records.tolist(), expected)
+        self.assertEqual(runs.ranked(self.by, k=7).records.tolist(), expected[:7])
+
+        # another ranking sorts all rows again; ties keep the order of the runs
+        self.assertEqual(runs.ranked("support").values_of("support").tolist(),
+                         sorted(table.values_of("support").tolist(), reverse=True))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+#!/usr/bin/python3
+
+import unittest
+import rdflib
+from rdflib.namespace import RDF
+from directives.pakbonLD_G4_MP import PakbonLD
+from fixture import ABOX, mined, rules_of
+
+
+class TestSampledMining(unittest.TestCase):
+    """ Rules of a verified sample carry the counts of the full graph """
+    parameters = {"executor": "serial", "similarity_threshold": .3}
+
+    def test_full_sample(self):
+        rules = rules_of(mined(PakbonLD, sample_rate=1.0, sample_verification=True, **self.parameters))
+        self.assertEqual(sorted(rules), sorted(rules_of(mined(PakbonLD, **self.parameters))))
+
+    def test_verified_sample(self):
+        rules = rules_of(mined(PakbonLD, sample_rate=.5, sample_verification=True, **self.parameters))
+        self.assertGreater(len(rules), 0)
+
+        # the rules differ from those of the full graph, as the CBS do, but their counts are those of all members
+        graph = rdflib.Graph()
+        graph.parse(ABOX, format="nt")
+        for ctype, antecedent, consequent, support, confidence in rules:
+            members = set(graph.subjects(RDF.type, ctype))
+            with_antecedent = {s for s in members if (s,) + antecedent in graph}
+            with_both = {s for s in with_antecedent if all((s,) + item in graph for item in consequent)}
+
+            self.assertEqual(support, (len(with_antecedent), len(members)))
+            self.assertEqual(confidence, (len(with_both), len(with_antecedent)))
+
+    def test_executors(self):
+        rules = rules_of(mined(PakbonLD, sample_rate=.7, sample_verification=True, **self.parameters))
+
+        # rules which rank equal do not come in the order of the batches of the workers
+        for executor, batch_size in (("serial", 1), ("process", 3), ("thread", 3)):
+            with self.subTest(executor=executor, batch_size=batch_size):
+                parameters = dict(self.parameters, executor=executor, workers=3, batch_size=batch_size)
+                self.assertEqual(rules_of(mined(PakbonLD, sample_rate=.7, sample_verification=True, **parameters)),
+                                 rules)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+
+import unittest
+import numpy as np
+from auxiliarly.deadline import Deadline
+from auxiliarly.scheduler import TriangularScheduler
+
+
+def chunks_of(scheduler):
+    """ Return all chunks a scheduler hands out """
+    chunks = []
+    work = scheduler.next_chunk()
+    while work is not None:
+        chunks.append(work)
+        work = scheduler.next_chunk()
+
+    return chunks
+
+class TestCosts(unittest.TestCase):
+    """ Costs of rows follow the triangle, or those given """
+    def test_triangle(self):
+        scheduler = TriangularScheduler(100)
+        costs = np.cumsum([0] + [100 - i - 1 for i in range(100)])
+        self.assertEqual([scheduler.cost_until(row) for row in range(101)], costs.tolist())
+
+        # the first row to reach a cost is that of the cumulative costs
+        for cost in np.linspace(0, costs[-1], 57)[:-1].tolist():
+            self.assertEqual(scheduler.row_at(cost), int(np.searchsorted(costs, cost, side="left")))
+
+    def test_partition(self):
+        costs = [1.] * 10 + [10.] * 10
+        ranges = TriangularScheduler(20, costs=costs).partition(4)
+
+        # every range ends at the first row to reach its share of the total of 110
+        self.assertEqual(ranges, [range(0, 12), range(12, 15), range(15, 18), range(18, 20)])
+
+class TestChunks(unittest.TestCase):
+    """ Chunks cover every row once and in order, and shrink towards the end of the work """
+    def test_cover(self):
+        for n, workers in ((1, 4), (10, 3), (1000, 8)):
+            with self.subTest(n=n, workers=workers):
+                scheduler = TriangularScheduler(n, workers)
+                chunks = chunks_of(scheduler)
+
+                self.assertEqual([row for work in chunks for row in work], list(range(n)))
+                self.assertEqual(scheduler.remainder(), [])
+
+    def test_shrink(self):
+        scheduler = TriangularScheduler(1000, workers=4)
+        for work in chunks_of(scheduler):
+            # only the last row of a chunk may take it past a worker's share of what is left
+            left = scheduler.total - scheduler.cost_until(work.start)
+            self.assertLessEqual(scheduler.cost_of(range(work.start, work.stop - 1)), left / 4)
+
+    def test_feedback(self):
+        scheduler = TriangularScheduler(10000, workers=2, target_duration=.1)
+        work = scheduler.next_chunk()
+        scheduler.feedback(work, 10.)
+
+        # chunks are sized on the measured throughput, while less than the share of what is left
+        work = scheduler.next_chunk()
+        expected = scheduler.throughput * .1
+        self.assertLessEqual(scheduler.cost_of(work), expected + scheduler.n)
+        self.assertGreaterEqual(scheduler.cost_of(work), expected)
+
+    def test_deadline(self):
+        scheduler = TriangularScheduler(100, deadline=Deadline(0.))
+        self.assertIsNone(scheduler.next_chunk())
+        self.assertEqual(scheduler.remainder(), [range(0, 100)])
+
+    def test_skip(self):
+        scheduler = TriangularScheduler(100, workers=2)
+        scheduler.skip(60)
+        self.assertEqual([row for work in chunks_of(scheduler) for row in work], list(range(60, 100)))
+
+if __name__ == "__main__":
+    unittest.main()
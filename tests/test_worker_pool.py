@@ -0,0 +1,126 @@
+#!/usr/bin/python3
+
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+from auxiliarly import worker_pool
+from auxiliarly.worker_pool import WorkerPool, ThreadWorkerPool, SerialWorkerPool, create_pool, resident
+
+
+def doubled(work):
+    """ Return twice the work, but die on 3, run out of memory on 5, and get stuck on 7 """
+    if work == 3:
+        os._exit(1)
+    if work == 5:
+        raise MemoryError()
+    if work == 7:
+        time.sleep(60)
+
+    return 2 * work
+
+def died_once(work):
+    """ Die on the first attempt only, as marked by a file """
+    marker, value = work
+    if not os.path.exists(marker):
+        open(marker, 'w').close()
+        os._exit(1)
+
+    return value
+
+def failing(work):
+    """ Fail on all work """
+    raise ValueError(work)
+
+def indexed(resident):
+    """ Derive an index from the resident inputs """
+    resident["index"] = {value: i for i, value in enumerate(resident["values"])}
+
+def located(work):
+    """ Return the position of the work in the resident index, and the worker which found it """
+    return (resident("index")[work], os.getpid())
+
+def shifted(work):
+    """ Return the work plus the shared offset """
+    return work + resident("offset")
+
+class TestRetries(unittest.TestCase):
+    """ Work of dead, stuck, or starved workers is retried, and skipped once it keeps failing """
+    def setUp(self):
+        self.pool = WorkerPool(processes=2, timeout=1., retries=1, backoff=.01)
+
+    def tearDown(self):
+        self.pool.__exit__()
+
+    def test_skipped(self):
+        outputs = list(self.pool.imap_unordered(doubled, range(9), stage="doubled"))
+
+        # all other work is done, and the failed work recorded
+        self.assertEqual(sorted(outputs), [0, 2, 4, 8, 12, 16])
+        self.assertEqual(sorted(self.pool.failed("doubled")), [3, 5, 7])
+        reasons = {failure["work"]: failure["reason"] for failure in self.pool.failure_report()}
+        self.assertTrue(reasons[3].startswith("worker died"))
+        self.assertEqual(reasons[5], "out of memory")
+        self.assertEqual(reasons[7], "timed out after 1.0 s")
+
+        # the workers were replaced, and failures of a later run are told apart
+        since = len(self.pool.failure_report())
+        self.assertEqual(sorted(self.pool.imap_unordered(doubled, [1, 3], stage="doubled")), [2])
+        self.assertEqual(self.pool.failed("doubled", since), [3])
+
+    def test_retried(self):
+        with tempfile.TemporaryDirectory() as directory:
+            work = [(os.path.join(directory, str(i)), i) for i in range(4)]
+            outputs = list(self.pool.imap_unordered(died_once, work, stage="died_once"))
+
+        self.assertEqual(sorted(outputs), [0, 1, 2, 3])
+        self.assertEqual(self.pool.failure_report(), [])
+
+    def test_errors(self):
+        # errors in the work itself are not retried
+        with self.assertRaises(ValueError):
+            list(self.pool.imap_unordered(failing, range(2)))
+
+class TestResident(unittest.TestCase):
+    """ Workers keep their resident inputs and indexes across stages """
+    def test_stages(self):
+        with WorkerPool(processes=2, resident={"values": ["a", "b", "c"]}, indexer=indexed) as pool:
+            workers = set()
+            for stage in range(3):
+                pool.share(stage=stage)
+                outputs = list(pool.imap_unordered(located, ["c", "a", "b", "a"], stage="located"))
+                self.assertEqual(sorted(i for i, _ in outputs), [0, 0, 1, 2])
+                workers.update(pid for _, pid in outputs)
+
+            # no worker was started again
+            self.assertLessEqual(len(workers), 2)
+            self.assertEqual(pool.failure_report(), [])
+
+class TestThreads(unittest.TestCase):
+    """ Threads share inputs as they are, and are only started where they run concurrently """
+    def test_shared(self):
+        for pool in (ThreadWorkerPool(3), SerialWorkerPool()):
+            with self.subTest(pool=type(pool).__name__), pool:
+                pool.share(offset=10)
+                self.assertEqual(sorted(pool.imap_unordered(shifted, range(6))), list(range(10, 16)))
+
+                pool.release("offset")
+                with self.assertRaises(KeyError):
+                    list(pool.imap_unordered(shifted, range(1)))
+
+    def test_fallback(self):
+        with mock.patch.object(worker_pool, "gil_enabled", return_value=True):
+            with self.assertLogs("auxiliarly.worker_pool", level="WARNING"):
+                pool = create_pool("thread", processes=1)
+        with pool:
+            self.assertIs(type(pool), WorkerPool)
+
+        with mock.patch.object(worker_pool, "gil_enabled", return_value=False):
+            pool = create_pool("thread", processes=2)
+        with pool:
+            self.assertIs(type(pool), ThreadWorkerPool)
+            self.assertEqual(pool.processes, 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,7 +2,7 @@
 
 import logging
 from time import time
-from models.rule_base import RuleBase
+from models.rule_base import RuleBase, IRule
 from readers import rdf
 from writers.rule_set import pretty_write, pretty_label_write, natural_write, _rule_to_string, _rule_to_label_string, _rule_to_natural_text
 from writers.pickler import write as dump
@@ -150,7 +150,8 @@ def _add_filters(rule_base, filters, font):
 def _add_filter(rule_base, filters, operation, font, key=None):
     if key is None:
         clear_term()
-        print("Select Filter:\n\ta) class\n\tb) antecedent\n\tc) consequent\n\td) support\n\te) confidence\n")
+        print("Select Filter:\n\ta) class\n\tb) antecedent\n\tc) consequent\n\td) support\n\te) confidence\n" +
+              "\tf) lift\n\tg) conviction\n\th) leverage\n\ti) p-value\n")
         answer = input(": ")
 
         key = None
@@ -164,11 +165,19 @@ def _add_filter(rule_base, filters, operation, font, key=None):
             key = "support"
         elif answer == "e":
             key = "confidence"
+        elif answer == "f":
+            key = "lift"
+        elif answer == "g":
+            key = "conviction"
+        elif answer == "h":
+            key = "leverage"
+        elif answer == "i":
+            key = "p_value"
         else:
             return (filters, None)
 
     if operation.startswith("a"):
-        if key == "support" or key == "confidence":
+        if key in IRule.MEASURES:
             minv = input("set minimal value [{}]: ".format(rule_base.filters.filters["minimal_"+key]))\
                     or rule_base.filters.filters["minimal_"+key]
             maxv = input("set maximal value [{}]: ".format(rule_base.filters.filters["maximal_"+key]))\
@@ -183,7 +192,7 @@ def _add_filter(rule_base, filters, operation, font, key=None):
 
             filters.set(key, value)
     else:  # rmv operation
-        if key == "support" or key == "confidence":
+        if key in IRule.MEASURES:
             filters.set("minimal_"+key, filters._default_filters["minimal_"+key])
             filters.set("maximal_"+key, filters._default_filters["maximal_"+key])
         else:
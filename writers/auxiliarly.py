@@ -4,6 +4,7 @@ import logging
 import tarfile
 import io
 import re
+from rdflib.paths import SequencePath
 
 
 logger = logging.getLogger(__name__)
@@ -17,6 +18,9 @@ def get_label(node, knowledge_graphs=[], lang=LANG_DEFAULT, fallback=True):
 
     :returns: a string
     """
+    if type(node) is SequencePath:
+        return "/".join([get_label(p, knowledge_graphs, lang, fallback) for p in node.args])
+
     labels = []
     if len(knowledge_graphs) >= 0:
         for knowledge_graph in knowledge_graphs:
@@ -49,10 +53,7 @@ def write(output=[], path="./of/latest", overwrite=True, compress=False, printer
 
     :returns: none
     """
-    buff = ""
-    for item in output:
-        buff += printer(item, abox, tbox, vocab, lang) + "\n"
-    buff += "<EOF>"
+    buff = "".join([printer(item, abox, tbox, vocab, lang) + "\n" for item in output]) + "<EOF>"
 
     mode = 'w' if overwrite else 'x'
     logger.info("Writing (mode {}, compress = {}) to {}".format(mode, compress, path))
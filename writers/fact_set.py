@@ -19,7 +19,7 @@ def pretty_write(output=[], path="./of/latest", overwrite=True, compress=False):
 
     write(output, path, overwrite, compress, _fact_to_string)
 
-def _fact_to_string(fact):
+def _fact_to_string(fact, *args):
     """ Wrap a fact into a pretty string
 
     :param fact: a (subject, predicate, [object(s)]) tuple
@@ -0,0 +1,23 @@
+#!/usr/bin/python3
+
+import logging
+import json
+
+
+logger = logging.getLogger(__name__)
+
+def write(metadata, path="./of/latest.meta", overwrite=True):
+    """ Write run metadata, such as coverage statistics, as JSON
+
+    :param metadata: a dictionary
+    :param path: file path to write to
+    :param overwrite: overwrite file at path if exists
+
+    :returns: none
+    """
+    mode = 'w' if overwrite else 'x'
+
+    logger.info("Writing metadata (mode {}) to {}".format(mode, path))
+
+    with open(path, mode) as f:
+        json.dump(metadata, f, indent=4, sort_keys=True, default=str)
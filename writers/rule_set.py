@@ -2,6 +2,7 @@
 
 import logging
 from rdflib.term import Literal
+from rdflib.paths import SequencePath
 from writers.auxiliarly import write, get_label
 from writers.transcribers import transcriber
 from writers.transcribers.language import dutch, english
@@ -20,7 +21,7 @@ def pretty_write(output, path="./of/latest", overwrite=True, compress=False, *ar
     :returns: none
     """
 
-    write(output.model, path, overwrite, compress, _rule_to_string)
+    write(output.stream(), path, overwrite, compress, _rule_to_string)
 
 def pretty_label_write(output, path="./of/latest", overwrite=True, compress=False, abox=None, tbox=None, vocab=None,
                        lang="en"):
@@ -37,7 +38,7 @@ def pretty_label_write(output, path="./of/latest", overwrite=True, compress=Fals
     :returns: none
     """
 
-    write(output.model, path, overwrite, compress, _rule_to_label_string, abox, tbox, vocab, lang)
+    write(output.stream(), path, overwrite, compress, _rule_to_label_string, abox, tbox, vocab, lang)
 
 def natural_write(output, path="./of/latest", overwrite=True, compress=False, abox=None, tbox=None, vocab=None,
                   lang="en"):
@@ -54,7 +55,7 @@ def natural_write(output, path="./of/latest", overwrite=True, compress=False, ab
     :returns: none
     """
 
-    write(output.model, path, overwrite, compress, _rule_to_natural_text, abox, tbox, vocab, lang)
+    write(output.stream(), path, overwrite, compress, _rule_to_natural_text, abox, tbox, vocab, lang)
 
 def _rule_to_natural_text(irule, abox=None, tbox=None, vocab=None, lang="en"):
     """ Wrap a rule into a transcribed string
@@ -100,8 +101,8 @@ def _rule_to_label_string(irule, abox=None, tbox=None, vocab=None, lang="en"):
     string = """[{}]
     IF   {}
     THEN {}
-    Support:    {:.3f}
-    Confidence: {:.3f}\n""".format(get_label(irule.rule.ctype, [tbox], lang),
+    Support:    {:.3f}{}
+    Confidence: {:.3f}{}\n""".format(get_label(irule.rule.ctype, [tbox], lang),
                               _statement_to_label_string(irule.rule.antecedent,
                                                         abox,
                                                         tbox,
@@ -109,9 +110,11 @@ def _rule_to_label_string(irule, abox=None, tbox=None, vocab=None, lang="en"):
                                                         lang),
                               consequent,
                               irule.support.value,
-                              irule.confidence.value)
+                              _interval_to_string(irule.support),
+                              irule.confidence.value,
+                              _interval_to_string(irule.confidence))
 
-    return string
+    return string + _measures_to_string(irule)
 
 def _rule_to_string(irule, *args):
     """ Wrap a rule into a string
@@ -129,14 +132,47 @@ def _rule_to_string(irule, *args):
     string = """[{}]
     IF   {}
     THEN {}
-    Support:    {:.3f}
-    Confidence: {:.3f}\n""".format(irule.rule.ctype,
+    Support:    {:.3f}{}
+    Confidence: {:.3f}{}\n""".format(irule.rule.ctype,
                               _statement_to_string(irule.rule.antecedent),
                               consequent,
                               irule.support.value,
-                              irule.confidence.value)
+                              _interval_to_string(irule.support),
+                              irule.confidence.value,
+                              _interval_to_string(irule.confidence))
 
-    return string
+    return string + _measures_to_string(irule)
+
+def _measures_to_string(irule):
+    """ Wrap the additional interestingness measures of a rule into a string
+
+    :param irule: a (rule, support, confidence) tuple
+
+    :returns: a string, empty if the measures have not been computed
+    """
+    # rules unpickled from before these measures existed lack the attributes
+    if getattr(irule, "lift", None) is None:
+        return ""
+
+    return """    Lift:       {:.3f}
+    Conviction: {:.3f}
+    Leverage:   {:.3f}
+    P-value:    {:.3e}\n""".format(irule.lift.value,
+                              irule.conviction.value,
+                              irule.leverage.value,
+                              irule.p_value.value)
+
+def _interval_to_string(measure):
+    """ Wrap the confidence interval of an estimated measure into a string
+
+    :param measure: an IRule.Measure instance
+
+    :returns: a string, empty if the measure is not estimated
+    """
+    if getattr(measure, "lower", None) is None:
+        return ""
+
+    return " [{:.3f}, {:.3f}]".format(measure.lower, measure.upper)
 
 def _statement_to_label_string(statement, abox, tbox, vocab, lang):
     left = get_label(statement[0], [tbox], lang)
@@ -149,8 +185,11 @@ def _statement_to_label_string(statement, abox, tbox, vocab, lang):
     return (left, right)
 
 def _statement_to_string(statement):
-    left = statement[0].toPython()
-    right = statement[1].toPython()
+    if type(statement[0]) is SequencePath:
+        left = " / ".join([p.toPython() for p in statement[0].args])
+    else:
+        left = statement[0].toPython()
+    right = str(statement[1].toPython())
 
     if type(statement[1]) is Literal:
         if statement[1].language is not None: